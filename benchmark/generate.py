@@ -0,0 +1,161 @@
+"""
+Deterministic generator of synthetic chat logs, in the format of
+example/sample_conversation.txt, one file per month. The same
+parameters and seed always generate the same logs.
+
+Usage: python benchmark/generate.py <directory> [options]
+"""
+
+import argparse
+import datetime
+import os.path
+import random
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src import data
+
+START_DATE = datetime.datetime(2015, 1, 1)
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "de", "po", "an", "el", "or", "us", "ti", "be"]
+DOMAINS = ["example.com", "example.org", "news.example.net", "img.example.io", "video.example.tv"]
+
+
+def make_vocabulary(size, rng):
+    """
+    Returns size distinct made up words
+
+    :param size: Number of words
+    :param rng: random.Random
+    :return: String array
+    """
+    words = set()
+    vocabulary = []
+    while len(vocabulary) < size:
+        word = "".join(rng.choice(SYLLABLES) for i in range(rng.randint(1, 4)))
+        if word not in words:
+            words.add(word)
+            vocabulary.append(word)
+    return vocabulary
+
+
+def zipf_weights(count):
+    """
+    Cumulative weights of a Zipf distribution, the i-th
+    item being (i + 1) times less frequent than the first
+
+    :param count: Number of items
+    :return: Array of floats, for random.choices(cum_weights=...)
+    """
+    total = 0
+    weights = []
+    for i in range(count):
+        total += 1 / (i + 1)
+        weights.append(total)
+    return weights
+
+
+def generate_lines(day, users, messages_per_day, url_rate, vocabulary, rng):
+    """
+    Generates the log lines of a day
+
+    :param day: datetime of midnight of the day
+    :param users: String array of usernames, most active first
+    :param messages_per_day: Average number of messages
+    :param url_rate: Probability of a message containing a url
+    :param vocabulary: String array of words, most frequent first
+    :param rng: random.Random
+    :return: String array of lines
+    """
+    count = max(0, int(round(rng.gauss(messages_per_day, messages_per_day * 0.3))))
+    seconds = sorted(rng.randrange(24 * 60 * 60) for i in range(count))
+    authors = rng.choices(users, cum_weights=zipf_weights(len(users)), k=count)
+    word_weights = zipf_weights(len(vocabulary))
+
+    lines = []
+    for second, author in zip(seconds, authors):
+        roll = rng.random()
+        if roll < 0.05:
+            content = rng.choice(data.RESPONSES)
+        else:
+            words = rng.choices(vocabulary, cum_weights=word_weights, k=rng.randint(1, 15))
+            if roll < 0.08:
+                words.insert(rng.randrange(len(words) + 1), rng.choice(data.SWEARS))
+            if rng.random() < url_rate:
+                words.append("https://{}/{}".format(rng.choice(DOMAINS), rng.randrange(10000)))
+            content = " ".join(words)
+            if rng.random() < 0.1:
+                content += "?"
+
+        timestamp = day + datetime.timedelta(seconds=second)
+        lines.append("{} <{}> {}".format(timestamp.strftime("%Y-%m-%dT%H:%M:%S"), author, content))
+    return lines
+
+
+def generate(directory, users=20, messages_per_day=200, years=1, url_rate=0.05, vocabulary=5000, seed=0):
+    """
+    Generates synthetic logs, one file per month named chat-yyyy-mm.txt,
+    each starting with a "-- LOG --" line like the example
+
+    :param directory: Directory of the logs, created if needed
+    :param users: Number of users, with a Zipf distribution of activity
+    :param messages_per_day: Average number of messages per day
+    :param years: Number of years of logs, may be a fraction
+    :param url_rate: Probability of a message containing a url
+    :param vocabulary: Number of distinct words, with a Zipf distribution
+    :param seed: Random seed
+    :return: String array of the paths of the files, in order
+    """
+    rng = random.Random(seed)
+    usernames = ["user{}".format(i) for i in range(users)]
+    words = make_vocabulary(vocabulary, rng)
+    os.makedirs(directory, exist_ok=True)
+
+    paths = []
+    f_obj = None
+    for i in range(int(round(years * 365))):
+        day = START_DATE + datetime.timedelta(days=i)
+        path = os.path.join(directory, day.strftime("chat-%Y-%m.txt"))
+        if not paths or paths[-1] != path:
+            if f_obj is not None:
+                f_obj.close()
+            paths.append(path)
+            f_obj = open(path, "w", encoding="utf8")
+            f_obj.write("-- LOG --")
+
+        for line in generate_lines(day, usernames, messages_per_day, url_rate, words, rng):
+            f_obj.write("\n" + line)
+
+    if f_obj is not None:
+        f_obj.close()
+    return paths
+
+
+def add_arguments(parser):
+    """Adds the options of generate to an argparse parser"""
+    parser.add_argument("--users", type=int, default=20, help="number of users")
+    parser.add_argument("--messages-per-day", type=int, default=200, help="average number of messages per day")
+    parser.add_argument("--years", type=float, default=1, help="number of years of logs")
+    parser.add_argument("--url-rate", type=float, default=0.05, help="probability of a message containing a url")
+    parser.add_argument("--vocabulary", type=int, default=5000, help="number of distinct words")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+
+
+def generator_options(args):
+    """Returns the keyword arguments of generate from parsed arguments"""
+    return {
+        "users": args.users,
+        "messages_per_day": args.messages_per_day,
+        "years": args.years,
+        "url_rate": args.url_rate,
+        "vocabulary": args.vocabulary,
+        "seed": args.seed
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic chat logs")
+    parser.add_argument("directory", help="directory of the generated logs")
+    add_arguments(parser)
+    args = parser.parse_args()
+    paths = generate(args.directory, **generator_options(args))
+    print("Generated {} files in {}".format(len(paths), args.directory))
@@ -0,0 +1,174 @@
+"""
+Benchmark of each stage of the analysis of a conversation (load,
+sort, analyse, BasicAnalyser, Person, HTML render, JSON dump) on
+synthetic logs generated by benchmark/generate.py. The time,
+throughput and peak memory of each stage are saved as JSON, and
+can be compared against the results of a previous run.
+
+Usage: python benchmark/run.py [options]
+For example:
+    python benchmark/run.py --years 2 --output new.json --baseline old.json
+"""
+
+import argparse
+import json
+import os
+import os.path
+import platform
+import sys
+import tempfile
+import tracemalloc
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import generate
+from src import analyser
+from src import conversation
+from src import html_render
+from src import person
+from src import profiler
+
+STAGES = ["load", "sort", "analyse", "analyser", "persons", "html", "json"]
+
+
+def extract(line):
+    """extract function of the generated logs, see Conversation"""
+    if line.startswith("--") or not line:
+        return False
+    return [line.split("<")[1].split(">")[0], line.split("> ")[1], line.split(" ")[0], line]
+
+
+def run_once(path, options):
+    """
+    Runs every stage once
+
+    :param path: Glob of the log files
+    :param options: Keyword arguments of Conversation
+    :return: (dict of stage -> result dict, number of messages)
+    """
+    # The load, sort, analyse and json stages are recorded by the
+    # conversation. The extract callbacks are not timed, which would
+    # slow the load stage down
+    profile = profiler.Profiler(memory=tracemalloc.is_tracing(), callbacks=False)
+    c = conversation.Conversation(path, extract, sort_files=sorted, profiler=profile, **options)
+
+    with profile.stage("analyser"):
+        analyser.BasicAnalyser(c.messages)
+
+    with profile.stage("persons"):
+        for user in c.persons.values():
+            person.Person(user.name, list(user.messages))
+
+    with open(os.devnull, "w", encoding="utf-8") as f_obj:
+        with profile.stage("html"):
+            html_render.render_to(c, f_obj)
+        c.write_json(f_obj)
+
+    results = {}
+    for name, stage in profile.to_dict().items():
+        if name in STAGES:
+            results[name] = {"seconds": stage["wall"]}
+            if "peak_bytes" in stage:
+                results[name]["peak_bytes"] = stage["peak_bytes"]
+    return results, len(c.messages)
+
+
+def run(path, options, repeat=1, memory=True):
+    """
+    Runs the benchmark, keeping the fastest time of each stage
+
+    :param path: Glob of the log files
+    :param options: Keyword arguments of Conversation
+    :param repeat: Number of timed runs
+    :param memory: If True, an extra run measures the peak memory
+        of each stage with tracemalloc, which is too slow to be
+        enabled during the timed runs
+    :return: dict of stage -> result dict, number of messages
+    """
+    stages = {}
+    for i in range(repeat):
+        results, count = run_once(path, options)
+        for name, result in results.items():
+            if name not in stages or result["seconds"] < stages[name]["seconds"]:
+                stages[name] = result
+
+    for name, result in stages.items():
+        result["messages_per_second"] = count / result["seconds"] if result["seconds"] > 0 else None
+
+    if memory:
+        tracemalloc.start()
+        try:
+            results, count = run_once(path, options)
+        finally:
+            tracemalloc.stop()
+        for name, result in results.items():
+            stages[name]["peak_bytes"] = result["peak_bytes"]
+    return stages, count
+
+
+def compare(results, baseline):
+    """
+    Prints the results of each stage next to a baseline
+
+    :param results: Results dict of this run
+    :param baseline: Results dict of a previous run, or None
+    """
+    print("{:<10} {:>10} {:>14} {:>12} {:>10}".format("stage", "seconds", "messages/s", "peak MB", "vs base"))
+    for name in STAGES:
+        result = results["stages"].get(name)
+        if result is None:
+            continue
+        ratio = ""
+        base = (baseline or {}).get("stages", {}).get(name)
+        if base is not None and result["seconds"] > 0:
+            ratio = "{:.2f}x".format(base["seconds"] / result["seconds"])
+        peak = result.get("peak_bytes")
+        print("{:<10} {:>10.3f} {:>14.0f} {:>12} {:>10}".format(
+            name, result["seconds"], result["messages_per_second"] or 0,
+            "" if peak is None else "{:.1f}".format(peak / 1e6), ratio))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the stages of the analysis of synthetic logs")
+    generate.add_arguments(parser)
+    parser.add_argument("--logs", help="directory of the generated logs, a temporary directory by default")
+    parser.add_argument("--repeat", type=int, default=1, help="number of timed runs, the fastest is kept")
+    parser.add_argument("--no-memory", action="store_true", help="do not measure the peak memory")
+    parser.add_argument("--backend", default="auto", help="backend option of Conversation")
+    parser.add_argument("--output", help="file to save the results to, as JSON")
+    parser.add_argument("--baseline", help="results of a previous run to compare against")
+    args = parser.parse_args()
+
+    config = generate.generator_options(args)
+    with tempfile.TemporaryDirectory() as directory:
+        directory = args.logs or directory
+        paths = generate.generate(directory, **config)
+        size = sum(os.path.getsize(path) for path in paths)
+
+        stages, count = run(os.path.join(directory, "chat-*.txt"), {"backend": args.backend},
+                            args.repeat, not args.no_memory)
+
+    results = {
+        "config": config,
+        "backend": args.backend,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "messages": count,
+        "input_bytes": size,
+        "stages": stages
+    }
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f_obj:
+            baseline = json.load(f_obj)
+        if baseline.get("config") != config:
+            print("Warning: the baseline was run with other generator options")
+
+    compare(results, baseline)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f_obj:
+            json.dump(results, f_obj, indent=4, sort_keys=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+
+from src import cli
+
+sys.exit(cli.main())
@@ -4,8 +4,93 @@ See BasicAnalayser help for
 more information.
 """
 
-import re
-from src import data
+import gzip
+import heapq
+import json
+from array import array
+from operator import itemgetter
+
+from src import timestamps
+from src import tokenizer
+from src import urlstats
+from src import wordstats
+
+
+# Version of the format written by BasicAnalyser.to_state
+STATE_VERSION = 2
+
+
+def delta_encode(values):
+    """
+    Returns the differences between consecutive values of a
+    sorted int array, which are small and compress well
+
+    :param values: Sorted array of ints
+    :return: Array of ints, the first one being values[0]
+    """
+    return [values[i] - values[i - 1] if i > 0 else values[0] for i in range(len(values))]
+
+
+def delta_decode(deltas):
+    """
+    Inverse of delta_encode
+
+    :param deltas: Array of ints, as returned by delta_encode
+    :return: array('q') of the original values
+    """
+    values = array("q")
+    total = 0
+    for delta in deltas:
+        total += delta
+        values.append(total)
+    return values
+
+
+def message_to_state(message):
+    """
+    Returns a JSON serializable dict of a Message, for
+    BasicAnalyser.to_state
+
+    :param message: Message object, or None
+    :return: dict, or None
+    """
+    if message is None:
+        return None
+    return {
+        "username": message.username,
+        "content": message.content,
+        "timestamp": message.timestamp.isoformat(),
+        "raw": message.raw
+    }
+
+
+def message_from_state(state):
+    """
+    Inverse of message_to_state
+
+    :param state: dict, or None
+    :return: Message object, or None
+    """
+    # Imported here as the conversation module imports this one
+    from src import conversation
+
+    if state is None:
+        return None
+    return conversation.Message(state["username"], state["content"], state["timestamp"], state["raw"])
+
+
+def new_url_stats(sample_size, urls=()):
+    """
+    Returns the url statistics of an analyser
+
+    :param sample_size: url_sample_size of the analyser
+    :param urls: Optional iterable of urls to add
+    :return: urlstats.UrlStats
+    """
+    url_stats = urlstats.UrlStats(sample_size or urlstats.DEFAULT_SAMPLE_SIZE)
+    for url in urls:
+        url_stats.add(url)
+    return url_stats
 
 
 class BasicAnalyser(object):
@@ -15,27 +100,47 @@ class BasicAnalyser(object):
     Only does the basic analysis, ie word count, etc...
     Statistics produced by this class are shared by
     the global chat and individual users
+
+    Every daily series (days_in_range, active_days_all_time,
+    messages_said_all_time) counts calendar days, from the date
+    of the first message to the date of the last one
     """
 
-    def __init__(self, messages):
+    def __init__(self, messages=None, time_statistics=True, word_capacity=None, url_sample_size=None):
         """
         Construct a BasicAnalyser, which generates some simple
         statistics based on an array of messages.
 
-        :param messages: Array of Message objects to analyse. It is
-            required that this parameter have a length > 0
+        Messages can also be added one by one with add(), in
+        which case finish() must be called after the last one.
+
+        :param messages: Optional array of Message objects to analyse,
+            sorted from earliest to latest. If given, it is required
+            that this parameter have a length > 0
+        :param time_statistics: If False, the time histograms and daily
+            statistics are not updated by add(), they must be computed
+            in bulk and set with set_time_statistics (see histograms)
+        :param word_capacity: Optional. If set, words are counted
+            approximately in bounded memory, only the word_capacity
+            most frequent words being tracked (see wordstats.SpaceSaving)
+        :param url_sample_size: Optional. If set, only the first
+            url_sample_size urls are kept in self.urls, the other url
+            statistics being kept in bounded memory in self.url_stats
         """
+        self.time_statistics = time_statistics
+        self.word_capacity = word_capacity
+        self.url_sample_size = url_sample_size
 
-        # Time range of the sample
-        self.first_message_timestamp = messages[0].timestamp
-        self.last_message_timestamp = messages[-1].timestamp
-        self.days_in_range = (self.last_message_timestamp - self.first_message_timestamp).days + 1
-        self.active_days = 1
+        # Time range of the sample, as epochs (see timestamps)
+        self.first_epoch = None
+        self.last_epoch = None
+        self.days_in_range = 0
+        self.active_days = 0
 
         # Message statistics
-        self.total_messages = len(messages)
-        self.first_message = messages[0]
-        self.last_message = messages[-1]
+        self.total_messages = 0
+        self.first_message = None
+        self.last_message = None
 
         self.total_words = 0
         self.total_characters = 0
@@ -45,80 +150,459 @@ class BasicAnalyser(object):
         self.active_hours = [0] * 24
         self.active_days_of_week = [0] * 7
         self.active_weekly_hours = [0] * (7 * 24)
-        self.active_days_all_time = [0] * self.days_in_range
+        self.active_days_all_time = []
 
-        # Word statistics
-        self.word_count = {}
+        # Word statistics. In approximate mode, word_count is the
+        # counts of word_sketch
+        self.word_sketch = None if word_capacity is None else wordstats.SpaceSaving(word_capacity)
+        self.word_count = {} if word_capacity is None else self.word_sketch.counts
+        self._word_freq_sorted = None
         self.swears = 0
         self.questions = 0
         self.urls = []
+        self.url_stats = None if url_sample_size is None else new_url_stats(url_sample_size)
 
-        # Loop through all messages once
-        # Updating any needed variables on the way
-        self.most_active_day = self.first_message_timestamp
+        # Extra state needed to merge analysers: the epoch of the first
+        # message and the number of messages of every active day, the
+        # epoch of every url, and the epoch each word was first seen at
+        self.day_epochs = array("q")
+        self.day_counts = array("q")
+        self.url_timeline = array("q")
+        self.word_first_seen = {}
+
+        # Daily statistics, updated as messages are added
+        self.most_active_epoch = None
         self.most_messages_said = 0
         self.messages_said_all_time = []
 
-        messages_said = 0
-        current_timestamp = self.first_message_timestamp
+        self._messages_said = 0
+        self._current_epoch = None
+
+        if messages is not None:
+            for message in messages:
+                self.add(message)
+            self.finish()
+
+    def add(self, message, tokens=None):
+        """
+        Update the statistics with a new message. Messages
+        must be added from earliest to latest
+
+        :param message: Message object to add
+        :param tokens: Optional tokenizer.Tokens of the message, if
+            they were already computed for another analyser
+        """
+        if tokens is None:
+            tokens = tokenizer.tokenize(message.content)
+        epoch = message.epoch
+        day = epoch // timestamps.SECONDS_PER_DAY
+        if len(self.day_epochs) > 0 and self.day_epochs[-1] // timestamps.SECONDS_PER_DAY == day:
+            self.day_counts[-1] += 1
+        else:
+            self.day_epochs.append(epoch)
+            self.day_counts.append(1)
+
+        if self.first_message is None:
+            self.first_epoch = epoch
+            self.first_message = message
+            self.most_active_epoch = epoch
+            self.active_days = 1
+            self._current_epoch = epoch
+
+        self.last_epoch = epoch
+        self.last_message = message
+        self.days_in_range = day - self.first_epoch // timestamps.SECONDS_PER_DAY + 1
+        self.total_messages += 1
+
+        self.total_words += len(tokens.words)
+        self.total_characters += tokens.total_characters
+        self.total_characters_without_spaces += tokens.total_characters_without_spaces
+
+        if self.time_statistics:
+            self.add_time_statistics(epoch)
+
+        if tokens.question:
+            self.questions += 1
+        if tokens.swear:
+            self.swears += 1
+        if len(tokens.urls) > 0:
+            urls = tokens.urls
+            if self.url_sample_size is not None:
+                for url in urls:
+                    self.url_stats.add(url)
+                urls = urls[:self.url_sample_size - len(self.urls)]
+            self.urls += urls
+            self.url_timeline.extend([epoch] * len(urls))
+
+        # Count word types
+        if self.word_sketch is None:
+            for word in tokens.word_types:
+                count = self.word_count.get(word)
+                if count is None:
+                    self.word_first_seen[word] = epoch
+                    count = 0
+                self.word_count[word] = count + 1
+        else:
+            for word in tokens.word_types:
+                if word not in self.word_count:
+                    self.word_first_seen[word] = epoch
+                evicted = self.word_sketch.add(word)
+                if evicted is not None:
+                    del self.word_first_seen[evicted]
+
+    def add_time_statistics(self, epoch):
+        """
+        Update the time histograms and daily statistics with
+        the epoch of a new message, see add()
+
+        :param epoch: Epoch of the message
+        """
+        day = epoch // timestamps.SECONDS_PER_DAY
+        if day != self._current_epoch // timestamps.SECONDS_PER_DAY:
+            number_missing_days = day - self._current_epoch // timestamps.SECONDS_PER_DAY
+            for i in range(number_missing_days - 1):
+                self.messages_said_all_time.append(0)
+            self.messages_said_all_time.append(self._messages_said)
+
+            self._current_epoch = epoch
+            self.active_days += 1
+
+            if self.most_messages_said < self._messages_said:
+                self.most_active_epoch = epoch
+                self.most_messages_said = self._messages_said
+            self._messages_said = 0
+
+        self._messages_said += 1
+
+        # Grow the all time array up to the current day
+        if len(self.active_days_all_time) < self.days_in_range:
+            self.active_days_all_time += [0] * (self.days_in_range - len(self.active_days_all_time))
+
+        hour = epoch % timestamps.SECONDS_PER_DAY // timestamps.SECONDS_PER_HOUR
+        weekday = (day + timestamps.EPOCH_WEEKDAY) % 7
+
+        self.active_days_all_time[self.days_in_range - 1] += 1
+        self.active_hours[hour] += 1
+        self.active_days_of_week[weekday] += 1
+        self.active_weekly_hours[weekday * 24 + hour] += 1
+
+    def finish(self):
+        """
+        Compute the statistics that are only needed once all
+        messages were added. Can be called again after
+        adding more messages
+        """
+        self._word_freq_sorted = None
+
+    @property
+    def word_freq_sorted(self):
+        """Array of (word, count) tuples of every word, from most to
+           least frequent. Sorting the whole vocabulary is slow, use
+           top_words if only the most frequent words are needed"""
+        if self._word_freq_sorted is None:
+            self._word_freq_sorted = sorted(self.word_count.items(), key=lambda x: x[1], reverse=True)
+        return self._word_freq_sorted
 
-        for message in messages:
-            self.total_words += len(message.content.split(" "))
-            self.total_characters += len(message.content)
-            self.total_characters_without_spaces += len(message.content.replace(" ", ""))
+    def top_words(self, k, exclude=None, min_length=0):
+        """
+        Returns the k most frequent words, in the same order
+        as word_freq_sorted, see wordstats.top_k
 
-            if current_timestamp is None or message.timestamp.date() != current_timestamp.date():
-                number_missing_days = (message.timestamp - current_timestamp).days
-                for i in range(number_missing_days - 1):
-                    self.messages_said_all_time.append(0)
-                self.messages_said_all_time.append(messages_said)
+        :param k: Number of words
+        :param exclude: Optional set of words to skip, such as data.STOPWORD_SET
+        :param min_length: Skip words shorter than this
+        :return: Array of (word, count) tuples
+        """
+        return wordstats.top_k(self.word_count, k, exclude, min_length)
 
-                current_timestamp = message.timestamp
-                self.active_days += 1
+    def set_time_statistics(self, statistics):
+        """
+        Set the time histograms and daily statistics computed in
+        bulk for the messages added so far. Messages added after
+        this update the statistics incrementally
 
-                if self.most_messages_said < messages_said:
-                    self.most_active_day = current_timestamp
-                    self.most_messages_said = messages_said
-                messages_said = 0
+        :param statistics: histograms.TimeStatistics
+        """
+        self.active_hours = statistics.active_hours
+        self.active_days_of_week = statistics.active_days_of_week
+        self.active_weekly_hours = statistics.active_weekly_hours
+        self.active_days_all_time = statistics.active_days_all_time
+        self.active_days = statistics.active_days
+        self.messages_said_all_time = statistics.messages_said_all_time
+        self.most_active_epoch = statistics.most_active_epoch
+        self.most_messages_said = statistics.most_messages_said
+        self._current_epoch = statistics.current_epoch
+        self._messages_said = statistics.messages_said
+        self.time_statistics = True
 
-            messages_said += 1
+    @property
+    def url_count(self):
+        """Total number of urls, including those not kept in self.urls"""
+        return len(self.urls) if self.url_stats is None else self.url_stats.total
 
-            self.active_days_all_time[(message.timestamp - self.first_message_timestamp).days] += 1
-            self.active_hours[message.timestamp.hour] += 1
-            self.active_days_of_week[message.timestamp.weekday()] += 1
-            self.active_weekly_hours[message.timestamp.weekday() * 24 + message.timestamp.hour] += 1
+    @property
+    def first_message_timestamp(self):
+        """datetime of the first message, or None"""
+        return None if self.first_epoch is None else timestamps.from_epoch(self.first_epoch)
 
-            if "?" in message.content:
-                self.questions += 1
-            if any(" " + swear + " " in " " + message.content + " " for swear in data.SWEARS):
-                self.swears += 1
+    @property
+    def last_message_timestamp(self):
+        """datetime of the last message, or None"""
+        return None if self.last_epoch is None else timestamps.from_epoch(self.last_epoch)
 
-            urls = re.findall('http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+', message.content)
-            if len(urls) > 0:
-                self.urls += urls
+    @property
+    def most_active_day(self):
+        """datetime of the first message of the most active day, or None"""
+        return None if self.most_active_epoch is None else timestamps.from_epoch(self.most_active_epoch)
 
-            # Count word types
-            words = message.content.split(" ")
-            for word in words:
-                word = word.lower()
+    def merge(self, other):
+        """
+        Merge the statistics of another analyser into this one. Both
+        analysers must have been computed on disjoint sets of messages,
+        for example on the logs of different months or of different
+        machines. The result is the same as a single analyser computed
+        on the union of both sets of messages.
 
-                if "http://" in word or "https://" in word:
-                    continue
-                word = re.sub("[^a-zA-Z]+", "", word)
-                if len(word) == 0:
-                    continue
+        Messages with the same timestamp in both analysers are treated
+        as if the messages of this analyser came first, otherwise the
+        result does not depend on the order analysers are merged in.
 
-                self.word_count[word] = self.word_count.get(word, 0) + 1
+        :param other: BasicAnalyser to merge, it is not modified
+        :return: self
+        """
+        if other.total_messages == 0:
+            return self
 
-        # Word counts
-        self.word_freq_sorted = sorted(self.word_count.items(), key=lambda x: x[1], reverse=True)
+        self.total_messages += other.total_messages
+        self.total_words += other.total_words
+        self.total_characters += other.total_characters
+        self.total_characters_without_spaces += other.total_characters_without_spaces
+        self.swears += other.swears
+        self.questions += other.questions
+
+        self.active_hours = [a + b for a, b in zip(self.active_hours, other.active_hours)]
+        self.active_days_of_week = [a + b for a, b in zip(self.active_days_of_week, other.active_days_of_week)]
+        self.active_weekly_hours = [a + b for a, b in zip(self.active_weekly_hours, other.active_weekly_hours)]
+
+        if self.first_message is None or other.first_epoch < self.first_epoch:
+            self.first_message = other.first_message
+            self.first_epoch = other.first_epoch
+        if self.last_message is None or other.last_epoch >= self.last_epoch:
+            self.last_message = other.last_message
+            self.last_epoch = other.last_epoch
+
+        # Word counts keep the order the words were first seen in,
+        # as sorting by frequency keeps that order for equal counts.
+        # Both orders are sorted by epoch, they are merged so words
+        # first seen at the same epoch keep their order
+        first_seen = {}
+        for word, epoch in heapq.merge(self.word_first_seen.items(), other.word_first_seen.items(),
+                                       key=itemgetter(1)):
+            if word not in first_seen:
+                first_seen[word] = epoch
+
+        self.word_first_seen = first_seen
+        self.word_count = {word: self.word_count.get(word, 0) + other.word_count.get(word, 0)
+                           for word in first_seen}
+
+        if self.word_sketch is not None or other.word_sketch is not None:
+            # Merged approximate counts keep the most frequent words,
+            # with the error bounds of both counters added up
+            errors = {}
+            for sketch in [self.word_sketch, other.word_sketch]:
+                for word, error in (sketch.errors.items() if sketch is not None else ()):
+                    errors[word] = errors.get(word, 0) + error
+
+            self.word_capacity = self.word_capacity or other.word_capacity
+            self.word_sketch = wordstats.SpaceSaving.from_counts(self.word_count, self.word_capacity, errors)
+            self.word_count = self.word_sketch.counts
+            self.word_first_seen = {word: self.word_first_seen[word] for word in self.word_count}
+
+        if self.url_sample_size is None and other.url_sample_size is not None:
+            self.url_sample_size = other.url_sample_size
+        if self.url_sample_size is not None:
+            # An analyser without url_stats keeps all of its urls
+            if self.url_stats is None:
+                self.url_stats = new_url_stats(self.url_sample_size, self.urls)
+            self.url_stats.merge(other.url_stats or new_url_stats(self.url_sample_size, other.urls))
+
+        urls = list(heapq.merge(zip(self.url_timeline, self.urls),
+                                zip(other.url_timeline, other.urls), key=lambda x: x[0]))
+        if self.url_sample_size is not None:
+            urls = urls[:self.url_sample_size]
+        self.url_timeline = array("q", [x[0] for x in urls])
+        self.urls = [x[1] for x in urls]
+
+        self.merge_days(other)
+        self.update_daily_statistics()
+        self.finish()
+        return self
+
+    def merge_days(self, other):
+        """
+        Merge the first epoch and number of messages of the
+        active days of another analyser into this one
+
+        :param other: BasicAnalyser
+        """
+        if len(other.day_epochs) == 0:
+            return
+        if len(self.day_epochs) == 0 or \
+                other.day_epochs[0] // timestamps.SECONDS_PER_DAY > self.day_epochs[-1] // timestamps.SECONDS_PER_DAY:
+            self.day_epochs.extend(other.day_epochs)
+            self.day_counts.extend(other.day_counts)
+            return
+
+        days = {}
+        for analysis in [self, other]:
+            for epoch, count in zip(analysis.day_epochs, analysis.day_counts):
+                day = epoch // timestamps.SECONDS_PER_DAY
+                current = days.get(day)
+                days[day] = (epoch, count) if current is None else (min(current[0], epoch), current[1] + count)
+
+        order = sorted(days)
+        self.day_epochs = array("q", [days[day][0] for day in order])
+        self.day_counts = array("q", [days[day][1] for day in order])
+
+    def update_daily_statistics(self):
+        """
+        Recompute the time range and the daily statistics
+        (active days, most active day, messages said all time)
+        from self.day_epochs and self.day_counts, which only
+        costs a pass over the active days
+        """
+        day_epochs = self.day_epochs
+        day_counts = self.day_counts
+        if len(day_epochs) == 0:
+            return
+
+        first_day = day_epochs[0] // timestamps.SECONDS_PER_DAY
+        self.days_in_range = day_epochs[-1] // timestamps.SECONDS_PER_DAY - first_day + 1
+        self.active_days_all_time = [0] * self.days_in_range
+        for epoch, count in zip(day_epochs, day_counts):
+            self.active_days_all_time[epoch // timestamps.SECONDS_PER_DAY - first_day] = count
+
+        # Same logic as add()
+        self.active_days = len(day_epochs)
+        self.most_active_epoch = day_epochs[0]
+        self.most_messages_said = 0
+        self.messages_said_all_time = []
+        for i in range(1, len(day_epochs)):
+            number_missing_days = day_epochs[i] // timestamps.SECONDS_PER_DAY \
+                - day_epochs[i - 1] // timestamps.SECONDS_PER_DAY
+            self.messages_said_all_time += [0] * (number_missing_days - 1)
+            self.messages_said_all_time.append(day_counts[i - 1])
+
+            if self.most_messages_said < day_counts[i - 1]:
+                self.most_active_epoch = day_epochs[i]
+                self.most_messages_said = day_counts[i - 1]
+
+        self._current_epoch = day_epochs[-1]
+        self._messages_said = day_counts[-1]
+
+    def to_state(self):
+        """
+        Returns the state of the analyser as a JSON serializable
+        dict, from which it can be rebuilt with from_state and
+        merged with other analysers
+
+        :return: dict
+        """
+        return {
+            "version": STATE_VERSION,
+            "total_messages": self.total_messages,
+            "total_words": self.total_words,
+            "total_characters": self.total_characters,
+            "total_characters_without_spaces": self.total_characters_without_spaces,
+            "swears": self.swears,
+            "questions": self.questions,
+            "active_hours": self.active_hours,
+            "active_days_of_week": self.active_days_of_week,
+            "active_weekly_hours": self.active_weekly_hours,
+            "first_message": message_to_state(self.first_message),
+            "last_message": message_to_state(self.last_message),
+            "word_capacity": self.word_capacity,
+            "word_errors": None if self.word_sketch is None else list(self.word_sketch.errors.values()),
+            "words": list(self.word_count.keys()),
+            "word_counts": list(self.word_count.values()),
+            "word_first_seen": [self.word_first_seen[word] for word in self.word_count],
+            "urls": self.urls,
+            "url_sample_size": self.url_sample_size,
+            "url_stats": None if self.url_stats is None else self.url_stats.to_state(),
+            "url_timeline": delta_encode(self.url_timeline),
+            "day_epochs": delta_encode(self.day_epochs),
+            "day_counts": list(self.day_counts)
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Rebuild an analyser from the dict returned by to_state
+
+        :param state: dict
+        :return: BasicAnalyser
+        """
+        if state.get("version") != STATE_VERSION:
+            raise ValueError("Unsupported analyser state version: {}".format(state.get("version")))
+
+        analysis = cls(word_capacity=state.get("word_capacity"), url_sample_size=state.get("url_sample_size"))
+        for key in ["total_messages", "total_words", "total_characters",
+                    "total_characters_without_spaces", "swears", "questions",
+                    "active_hours", "active_days_of_week", "active_weekly_hours", "urls"]:
+            setattr(analysis, key, state[key])
+
+        analysis.first_message = message_from_state(state["first_message"])
+        analysis.last_message = message_from_state(state["last_message"])
+        if analysis.first_message is not None:
+            analysis.first_epoch = analysis.first_message.epoch
+            analysis.last_epoch = analysis.last_message.epoch
+
+        analysis.word_count = dict(zip(state["words"], state["word_counts"]))
+        if analysis.word_capacity is not None:
+            analysis.word_sketch = wordstats.SpaceSaving.from_counts(
+                analysis.word_count, analysis.word_capacity, dict(zip(state["words"], state["word_errors"])))
+            analysis.word_count = analysis.word_sketch.counts
+        analysis.word_first_seen = dict(zip(state["words"], state["word_first_seen"]))
+        analysis.url_timeline = delta_decode(state["url_timeline"])
+        if state.get("url_stats") is not None:
+            analysis.url_stats = urlstats.UrlStats.from_state(state["url_stats"])
+        analysis.day_epochs = delta_decode(state["day_epochs"])
+        analysis.day_counts = array("q", state["day_counts"])
+
+        analysis.update_daily_statistics()
+        analysis.finish()
+        return analysis
+
+    def save(self, path):
+        """
+        Write the state of the analyser to a gzip compressed
+        JSON file, which can be read back with load
+
+        :param path: Path of the file
+        """
+        f = gzip.open(path, "wt", encoding="utf8")
+        json.dump(self.to_state(), f, separators=(",", ":"))
+        f.close()
+
+    @classmethod
+    def load(cls, path):
+        """
+        Read an analyser written by save
+
+        :param path: Path of the file
+        :return: BasicAnalyser
+        """
+        f = gzip.open(path, "rt", encoding="utf8")
+        state = json.load(f)
+        f.close()
+        return cls.from_state(state)
 
     def to_dict(self):
         """
         Returns a dict representation of the object
         :return: dict representation
         """
-        return {
+        result = {
             "first_message_timestamp": str(self.first_message_timestamp),
             "last_message_timestamp": str(self.last_message_timestamp),
             "days_in_range": self.days_in_range,
@@ -139,3 +623,20 @@ class BasicAnalyser(object):
             "most_messages_said": self.most_messages_said,
             "messages_said_all_time": self.messages_said_all_time
         }
+        if self.url_sample_size is not None:
+            result["url_stats"] = self.url_stats.to_dict()
+        return result
+
+
+def merge(analysers):
+    """
+    Merge analysers computed on disjoint sets of messages
+    into a new analyser, see BasicAnalyser.merge
+
+    :param analysers: Iterable of BasicAnalyser objects
+    :return: BasicAnalyser
+    """
+    merged = BasicAnalyser()
+    for analysis in analysers:
+        merged.merge(analysis)
+    return merged
@@ -0,0 +1,246 @@
+"""
+MessageCache class, an on disk cache of the messages
+parsed from each log file. See MessageCache help for
+more information.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+from src import store
+
+MAGIC = b"CHATSTATS-CACHE"
+CACHE_VERSION = 1
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def code_hash(digest, code):
+    """
+    Add the code of a function to a hash, including the code of
+    the functions, lambdas and comprehensions defined in it
+
+    :param digest: hashlib hash object
+    :param code: Code object
+    """
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode("utf8"))
+    for const in code.co_consts:
+        digest.update(stable_repr(const).encode("utf8"))
+
+
+def stable_repr(value):
+    """
+    Returns the repr of a value that is the same in every process.
+    The items of sets are sorted, as their order depends on the hash
+    seed of the process (a set literal such as {"-", "#"} in a function
+    is a frozenset constant), and code objects, whose repr contains a
+    memory address, are replaced by the hash of their code
+
+    :param value: Any value
+    :return: String
+    """
+    if hasattr(value, "co_code"):
+        digest = hashlib.sha1()
+        code_hash(digest, value)
+        return "<code {}>".format(digest.hexdigest())
+    if isinstance(value, (set, frozenset)):
+        return "{}({{{}}})".format(type(value).__name__, ", ".join(sorted(stable_repr(item) for item in value)))
+    if isinstance(value, tuple):
+        return "({}{})".format(", ".join(stable_repr(item) for item in value), "," if len(value) == 1 else "")
+    if isinstance(value, list):
+        return "[{}]".format(", ".join(stable_repr(item) for item in value))
+    if isinstance(value, dict):
+        return "{{{}}}".format(", ".join("{}: {}".format(stable_repr(key), stable_repr(item))
+                                         for key, item in value.items()))
+    return repr(value)
+
+
+def value_identity(value, seen):
+    """
+    Returns a string identifying a default argument or
+    a variable captured by a function, see function_identity
+
+    :param value: Any value
+    :param seen: Set of the ids of the functions being identified,
+        to stop at recursive functions
+    :return: String
+    """
+    if callable(value) and (hasattr(value, "__code__") or hasattr(value, "cache_identity")):
+        return function_identity(value, seen)
+    return stable_repr(value)
+
+
+def function_identity(func, seen=None):
+    """
+    Returns a string identifying a function, used to invalidate
+    the cache when the function that parses the files changes.
+    The identity is the qualified name of the function and a hash
+    of its code, default arguments and the variables it captures
+    from enclosing functions, so editing the function or creating
+    it with different arguments invalidates the cache. Values are
+    identified by their repr (see stable_repr, and functions by their
+    own identity), so a value without a stable repr only makes the
+    cache miss.
+    Objects with a cache_identity attribute use it instead.
+
+    :param func: Function or callable object
+    :param seen: Used internally, see value_identity
+    :return: String
+    """
+    identity = getattr(func, "cache_identity", None)
+    if identity is not None:
+        return str(identity)
+
+    name = "{}.{}".format(getattr(func, "__module__", None),
+                          getattr(func, "__qualname__", type(func).__qualname__))
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return name
+
+    seen = seen or set()
+    if id(func) in seen:
+        return name
+    seen = seen | {id(func)}
+
+    digest = hashlib.sha1()
+    code_hash(digest, code)
+    for value in getattr(func, "__defaults__", None) or ():
+        digest.update(value_identity(value, seen).encode("utf8"))
+    for key, value in sorted((getattr(func, "__kwdefaults__", None) or {}).items()):
+        digest.update("{}={}".format(key, value_identity(value, seen)).encode("utf8"))
+    for variable, cell in zip(code.co_freevars, getattr(func, "__closure__", None) or ()):
+        try:
+            value = value_identity(cell.cell_contents, seen)
+        except ValueError:
+            # Variable not assigned yet
+            value = ""
+        digest.update("{}={}".format(variable, value).encode("utf8"))
+    return "{}:{}".format(name, digest.hexdigest())
+
+
+def file_hash(path):
+    """
+    Returns the sha256 hash of the content of a file
+
+    :param path: Path to the file
+    :return: Hex string
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f_obj:
+        for block in iter(lambda: f_obj.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class MessageCache(object):
+    """
+    MessageCache
+
+    Stores the MessageStore parsed from each log file in a
+    directory, in the binary format of MessageStore.write.
+    An entry is only used if the file has the same path, size
+    and modification time (and content hash, if hash_content
+    is set) and was parsed with the same parser identity as
+    when the entry was written, so unchanged files are loaded
+    without running extract again.
+    """
+
+    def __init__(self, directory, hash_content=False):
+        """
+        Create a MessageCache
+
+        :param directory: Directory of the cache files, created if needed
+        :param hash_content: If True, the content of the files is hashed
+            and compared as well, in case files are modified without
+            changing their size or modification time
+        """
+        self.directory = directory
+        self.hash_content = hash_content
+        os.makedirs(directory, exist_ok=True)
+
+    def fingerprint(self, path):
+        """
+        Returns the fingerprint of a file
+
+        :param path: Path to the file
+        :return: Dict
+        """
+        stat = os.stat(path)
+        fingerprint = {
+            "path": os.path.abspath(path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns
+        }
+        if self.hash_content:
+            fingerprint["sha256"] = file_hash(path)
+        return fingerprint
+
+    def entry_path(self, path, identity):
+        """
+        Returns the path of the cache file of a log file
+
+        :param path: Path to the log file
+        :param identity: Parser identity string
+        :return: String
+        """
+        key = hashlib.sha1("{}\n{}".format(os.path.abspath(path), identity).encode("utf8"))
+        return os.path.join(self.directory, key.hexdigest() + ".msgs")
+
+    def load(self, path, identity, fingerprint=None):
+        """
+        Returns the cached messages of a file, or None if
+        there is no valid entry for it
+
+        :param path: Path to the log file
+        :param identity: Parser identity string
+        :param fingerprint: Optional fingerprint of the file, computed if not given
+        :return: store.MessageStore or None
+        """
+        try:
+            fingerprint = fingerprint or self.fingerprint(path)
+            with open(self.entry_path(path, identity), "rb") as f_obj:
+                if f_obj.read(len(MAGIC)) != MAGIC:
+                    return None
+                size = struct.unpack("<I", f_obj.read(4))[0]
+                header = json.loads(f_obj.read(size).decode("utf8"))
+                if header.get("version") != CACHE_VERSION or header.get("identity") != identity \
+                        or header.get("fingerprint") != fingerprint:
+                    return None
+                return store.MessageStore.read(f_obj)
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+
+    def save(self, path, identity, messages, fingerprint=None):
+        """
+        Write the messages of a file to the cache. The entry is
+        written to a temporary file first, so a reader never sees
+        a partially written entry
+
+        :param path: Path to the log file
+        :param identity: Parser identity string
+        :param messages: store.MessageStore of the messages of the file
+        :param fingerprint: Optional fingerprint of the file, taken before
+            it was parsed so a file modified while being parsed is not
+            cached as if it was unchanged. Computed if not given
+        """
+        header = json.dumps({
+            "version": CACHE_VERSION,
+            "identity": identity,
+            "fingerprint": fingerprint or self.fingerprint(path)
+        }).encode("utf8")
+
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f_obj:
+                f_obj.write(MAGIC)
+                f_obj.write(struct.pack("<I", len(header)))
+                f_obj.write(header)
+                messages.write(f_obj)
+            os.replace(temp_path, self.entry_path(path, identity))
+        except BaseException:
+            os.remove(temp_path)
+            raise
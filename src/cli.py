@@ -0,0 +1,325 @@
+"""
+Command line entry point, analyses the conversations listed in a
+manifest in parallel, each in its own process. Run with python -m src,
+see main.
+
+The manifest is a JSON file:
+
+{
+    "jobs": 4,
+    "memory_limit_mb": 2048,
+    "defaults": {"options": {"backend": "numpy"}},
+    "conversations": [
+        {
+            "name": "general",
+            "path": "logs/general/*.txt",
+            "parser": "myparsers:extract",
+            "name_map": {"id:12345": "Alice"},
+            "output_dir": "reports/general"
+        }
+    ]
+}
+
+Each conversation has:
+    name: Name used in the summary
+    path: Glob of the log files, see Conversation
+    parser: extract function, as "module:function", or the name of
+        a built-in parser such as "irc" (see parsers.PARSERS)
+    extract_messages, extract_messages_stream, sort_files: Optional
+        functions of Conversation, as "module:function"
+    name_map: Optional, see Conversation
+    output_dir: Folder of the report, see Conversation.generate_output
+    options: Optional keyword arguments of Conversation, such as
+        chunk_size or keep_raw
+    output: Optional keyword arguments of generate_output, such
+        as compact or json_format
+    memory_limit_mb: Optional memory limit of this conversation
+
+The keys of "defaults" are used for the conversations that do not
+set them ("options" and "output" are merged). Relative paths are
+relative to the folder of the manifest, and modules next to the
+manifest can be imported.
+"""
+
+import argparse
+import errno
+import glob
+import importlib
+import json
+import multiprocessing
+import multiprocessing.connection
+import os
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from src import conversation
+from src import parsers
+
+FUNCTION_KEYS = ["parser", "extract_messages", "extract_messages_stream", "sort_files"]
+
+
+def load_function(name):
+    """
+    Imports a function from a "module:function" string
+
+    :param name: String, the function may be an attribute
+        path such as "module:Class.method", or the name of
+        a built-in parser, see parsers.PARSERS
+    :return: Function
+    :raises ValueError: If the name has no ":"
+    """
+    if name in parsers.PARSERS:
+        return parsers.PARSERS[name]
+    if ":" not in name:
+        raise ValueError("Expected a function as module:function, got {}".format(name))
+    module_name, attributes = name.split(":", 1)
+    value = importlib.import_module(module_name)
+    for attribute in attributes.split("."):
+        value = getattr(value, attribute)
+    return value
+
+
+def load_manifest(path):
+    """
+    Reads a manifest, and returns the jobs with the defaults
+    applied and the paths made absolute
+
+    :param path: Path of the manifest
+    :return: (manifest dict, array of job dicts)
+    :raises ValueError: If a conversation misses a required key
+    """
+    with open(path, encoding="utf-8") as f_obj:
+        manifest = json.load(f_obj)
+
+    base = os.path.dirname(os.path.abspath(path))
+    defaults = manifest.get("defaults", {})
+    jobs = []
+    for i, entry in enumerate(manifest.get("conversations", [])):
+        job = dict(defaults)
+        job.update(entry)
+        job["options"] = dict(defaults.get("options", {}), **entry.get("options", {}))
+        job["output"] = dict(defaults.get("output", {}), **entry.get("output", {}))
+        job.setdefault("name", "conversation-{}".format(i))
+        job.setdefault("memory_limit_mb", manifest.get("memory_limit_mb"))
+        job["base"] = base
+
+        for key in ["path", "parser", "output_dir"]:
+            if key not in job:
+                raise ValueError("Conversation {} has no {}".format(job["name"], key))
+        job["path"] = os.path.join(base, job["path"])
+        job["output_dir"] = os.path.join(base, job["output_dir"])
+        jobs.append(job)
+    return manifest, jobs
+
+
+def input_size(job):
+    """Returns the total size in bytes of the log files of a job"""
+    return sum(os.path.getsize(f) for f in glob.glob(job["path"]))
+
+
+def set_memory_limit(megabytes):
+    """
+    Limits the address space of the current process, so a job
+    using too much memory fails with a MemoryError instead of
+    taking the memory of the other jobs. The limit includes the
+    memory mapped by the interpreter and its modules (about
+    100 MB with numpy), not only the memory of the analysis
+
+    :param megabytes: Limit in MB, or None for no limit
+    :return: False if limits are not supported on this platform
+    """
+    if megabytes is None:
+        return True
+    if resource is None:
+        return False
+    limit = int(megabytes * 1024 * 1024)
+    soft, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    return True
+
+
+def run_job(job):
+    """
+    Analyses a conversation and writes its report. Called in the
+    process of the job, errors are returned instead of raised
+
+    :param job: Job dict, see load_manifest
+    :return: Result dict, with the name, status ("ok", "memory"
+        if the memory limit was reached, or "error"), wall and
+        CPU time, number of messages and error if any
+    """
+    start = time.perf_counter()
+    start_cpu = time.process_time()
+    result = {"name": job["name"], "status": "ok", "messages": 0}
+    try:
+        if job["base"] not in sys.path:
+            sys.path.insert(0, job["base"])
+        if not set_memory_limit(job.get("memory_limit_mb")):
+            result["warning"] = "memory limits are not supported on this platform"
+
+        functions = {key: load_function(job[key]) for key in FUNCTION_KEYS if job.get(key)}
+        extract = functions.pop("parser")
+        c = conversation.Conversation(job["path"], extract, name_map=job.get("name_map", {}),
+                                      **dict(job["options"], **functions))
+        c.generate_output(output_dir=job["output_dir"], **job["output"])
+        result["messages"] = len(c.messages)
+    except (MemoryError, OSError) as e:
+        if isinstance(e, OSError) and e.errno != errno.ENOMEM:
+            result["status"] = "error"
+            result["error"] = "{}: {}".format(type(e).__name__, e)
+            result["traceback"] = traceback.format_exc()
+        else:
+            result["status"] = "memory"
+            result["error"] = "memory limit of {} MB reached".format(job.get("memory_limit_mb"))
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+        result["traceback"] = traceback.format_exc()
+
+    result["seconds"] = time.perf_counter() - start
+    result["cpu_seconds"] = time.process_time() - start_cpu
+    if resource is not None:
+        # Each job runs in a new process, so this is the peak of the job
+        # (in KB on Linux, in bytes on macOS)
+        result["max_rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def job_process(job, connection):
+    """
+    Target of the process of a job, runs the job and
+    sends its result to the parent process
+
+    :param job: Job dict, see load_manifest
+    :param connection: Sending end of a multiprocessing.Pipe
+    """
+    connection.send(run_job(job))
+    connection.close()
+
+
+def killed_result(job, process, seconds):
+    """
+    Returns the result of a job whose process exited
+    without sending a result, for example when it was
+    killed by the out of memory killer
+
+    :param job: Job dict
+    :param process: multiprocessing.Process of the job, exited
+    :param seconds: Wall time of the job
+    :return: Result dict, see run_job
+    """
+    if process.exitcode is not None and process.exitcode < 0:
+        error = "process killed by signal {}".format(-process.exitcode)
+    else:
+        error = "process exited with code {}".format(process.exitcode)
+    return {"name": job["name"], "status": "killed", "messages": 0, "error": error,
+            "seconds": seconds, "cpu_seconds": 0.0}
+
+
+def run(jobs, processes=None):
+    """
+    Runs jobs in parallel, each job in a new process. The largest
+    conversations are started first, so the total time is close to
+    the time of the largest one. The processes are not daemonic, so
+    a job can parse its files on a process pool (workers option of
+    Conversation). A job whose process dies is reported with the
+    status "killed", the other jobs keep running
+
+    :param jobs: Array of job dicts, see load_manifest
+    :param processes: Maximum number of jobs run at the same time,
+        defaults to the number of CPUs
+    :return: Array of result dicts, see run_job, in the order of jobs
+    """
+    processes = processes or multiprocessing.cpu_count()
+    order = sorted(range(len(jobs)), key=lambda i: input_size(jobs[i]), reverse=True)
+    results = [None] * len(jobs)
+
+    # Receiving end of the pipe of each running job -> (index, process, start time)
+    running = {}
+    try:
+        while order or running:
+            while order and len(running) < processes:
+                i = order.pop(0)
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                process = multiprocessing.Process(target=job_process, args=(jobs[i], sender))
+                process.start()
+                sender.close()
+                running[receiver] = (i, process, time.perf_counter())
+
+            for receiver in multiprocessing.connection.wait(list(running)):
+                i, process, start = running.pop(receiver)
+                try:
+                    results[i] = receiver.recv()
+                except EOFError:
+                    # The process exited without sending its result
+                    process.join()
+                    results[i] = killed_result(jobs[i], process, time.perf_counter() - start)
+                receiver.close()
+                process.join()
+    finally:
+        for receiver, (i, process, start) in running.items():
+            process.terminate()
+            process.join()
+            receiver.close()
+    return results
+
+
+def print_summary(results, seconds, f_obj=sys.stdout):
+    """
+    Prints the results of the jobs, slowest first
+
+    :param results: Array of result dicts
+    :param seconds: Total wall time
+    :param f_obj: File object to print to
+    """
+    print("{:<30} {:>8} {:>10} {:>10} {:>10}".format("conversation", "status", "messages", "seconds", "cpu"),
+          file=f_obj)
+    for result in sorted(results, key=lambda x: x["seconds"], reverse=True):
+        print("{:<30} {:>8} {:>10} {:>10.2f} {:>10.2f}".format(
+            result["name"][:30], result["status"], result["messages"], result["seconds"],
+            result["cpu_seconds"]), file=f_obj)
+        if "error" in result:
+            print("    " + result["error"], file=f_obj)
+
+    failed = sum(1 for result in results if result["status"] != "ok")
+    print("{} conversations, {} failed, {:.2f} seconds in total, {:.2f} seconds of work".format(
+        len(results), failed, seconds, sum(result["seconds"] for result in results)), file=f_obj)
+
+
+def main(argv=None):
+    """
+    Command line entry point
+
+    :param argv: Arguments, defaults to sys.argv[1:]
+    :return: Exit code, 1 if a conversation failed
+    """
+    parser = argparse.ArgumentParser(prog="python -m src",
+                                     description="Analyse the conversations of a manifest in parallel")
+    parser.add_argument("manifest", help="JSON manifest of the conversations, see src/cli.py")
+    parser.add_argument("-j", "--jobs", type=int, help="number of conversations analysed at the same time")
+    parser.add_argument("--memory-limit", type=float, help="memory limit of each conversation, in MB")
+    parser.add_argument("--summary", help="file to write the summary of the timings to, as JSON")
+    args = parser.parse_args(argv)
+
+    manifest, jobs = load_manifest(args.manifest)
+    if args.memory_limit is not None:
+        for job in jobs:
+            job["memory_limit_mb"] = args.memory_limit
+
+    start = time.perf_counter()
+    results = run(jobs, args.jobs or manifest.get("jobs"))
+    seconds = time.perf_counter() - start
+
+    print_summary(results, seconds)
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f_obj:
+            json.dump({"seconds": seconds, "conversations": results}, f_obj, indent=4, sort_keys=True)
+    return 1 if any(result["status"] != "ok" for result in results) else 0
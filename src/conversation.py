@@ -3,14 +3,39 @@ Conversation and Message class
 is contained in this file
 """
 
+import bisect
 import glob
-import datetime
+import gzip
 import json
 import html
+import io
+import itertools
+import os
+import shutil
+import struct
+import tempfile
+import uuid
+from concurrent import futures
 
 from src import person
 from src import analyser
+from src import cache
+from src import dayindex
+from src import histograms
 from src import html_render
+from src import json_export
+from src import matcher
+from src import parsers
+from src import pipeline as pipeline_module
+from src import profiler as profiler_module
+from src import reader
+from src import snapshot
+from src import store
+from src import timestamps
+from src import tokenizer
+
+# Version of the format written by Conversation.save_checkpoint
+CHECKPOINT_VERSION = 4
 
 
 class Message(object):
@@ -30,12 +55,133 @@ class Message(object):
         self.username = username
         self.content = content
         self.raw = raw
-        self.timestamp = datetime.datetime.strptime(timestamp.split(".")[0], "%Y-%m-%dT%H:%M:%S")
+        self.epoch = timestamps.parse(timestamp)
+
+    @property
+    def timestamp(self):
+        """datetime of the message"""
+        return timestamps.from_epoch(self.epoch)
+
+    @property
+    def day(self):
+        """Day index of the message, see timestamps.day"""
+        return self.epoch // timestamps.SECONDS_PER_DAY
+
+    @property
+    def weekday(self):
+        """Day of the week of the message, Monday is 0"""
+        return timestamps.weekday(self.epoch)
+
+    @property
+    def hour(self):
+        """Hour of the day of the message"""
+        return timestamps.hour(self.epoch)
 
     def __str__(self):
         return "{} {}: {}".format(self.timestamp, self.username, self.content)
 
 
+def parse_lines(lines, extract, messages):
+    """
+    Runs extract on each raw message, and adds
+    every valid one to a MessageStore
+
+    :param lines: Iterable of raw messages
+    :param extract: See extract in Conversation
+    :param messages: store.MessageStore to add the messages to
+    """
+    for line in lines:
+        data = extract(line)
+        if not data:
+            continue
+        messages.append(data[0], data[1], timestamps.parse(data[2]), data[3])
+
+
+def parse_text(text, extract, extract_messages, messages, path=None):
+    """
+    Parses the text content of a file into a MessageStore, in
+    bulk if extract is a parsers.Parser, otherwise with
+    extract_messages and parse_lines
+
+    :param text: Text content
+    :param extract: See extract in Conversation
+    :param extract_messages: See extract_messages in Conversation
+    :param messages: store.MessageStore to add the messages to
+    :param path: Optional path of the file, see parsers.Parser.parse
+    """
+    if parsers.is_parser(extract):
+        extract.parse(text, messages, path)
+    else:
+        parse_lines(extract_messages(text), extract, messages)
+
+
+def parse_chunks(chunks, extract, extract_messages_stream, messages, path=None):
+    """
+    Same as parse_text, for the content of a file given in chunks
+
+    :param chunks: Iterable of strings
+    :param extract: See extract in Conversation
+    :param extract_messages_stream: See extract_messages_stream in Conversation
+    :param messages: store.MessageStore to add the messages to
+    :param path: Optional path of the file, see parsers.Parser.parse
+    """
+    if parsers.is_parser(extract):
+        extract.parse_chunks(chunks, messages, path)
+    else:
+        parse_lines(extract_messages_stream(chunks), extract, messages)
+
+
+def file_chunks(chunk, last, items):
+    """
+    Yields the chunks of a file from the items of
+    Conversation.read_files, see Conversation.parse_items
+
+    :param chunk: First chunk of the file
+    :param last: True if it is the last chunk of the file
+    :param items: Iterator of the next items
+    :return: Generator of strings
+    """
+    yield chunk
+    while not last:
+        f, fingerprint, chunk, last = next(items)
+        yield chunk
+
+
+def parse_file(path, extract, extract_messages=reader.split_text, chunk_size=None,
+               extract_messages_stream=reader.split_lines, byte_range=None, keep_raw=True):
+    """
+    Parses a single log file into a MessageStore. This is
+    a module level function so it can be sent to worker
+    processes.
+
+    :param path: Path to the file
+    :param extract: See extract in Conversation
+    :param extract_messages: See extract_messages in Conversation
+    :param chunk_size: See chunk_size in Conversation
+    :param extract_messages_stream: See extract_messages_stream in Conversation
+    :param byte_range: Optional (start, end) tuple, as returned by
+        reader.split_ranges. If set, only that range of the file is
+        parsed, with extract_messages_stream
+    :param keep_raw: See keep_raw in Conversation
+    :return: store.MessageStore of the messages, in file order
+    """
+    messages = store.MessageStore(keep_raw)
+
+    if byte_range is not None:
+        chunks = reader.read_range_chunks(path, byte_range[0], byte_range[1],
+                                          chunk_size or reader.DEFAULT_CHUNK_SIZE)
+        parse_chunks(chunks, extract, extract_messages_stream, messages, path)
+        return messages
+
+    f_obj = open(path, "r", encoding="utf8")
+    if chunk_size:
+        parse_chunks(reader.read_chunks(f_obj, chunk_size), extract, extract_messages_stream, messages, path)
+    else:
+        parse_text(f_obj.read(), extract, extract_messages, messages, path)
+    f_obj.close()
+    return messages
+
+
 class Conversation(object):
     """
     Conversation object, contains the
@@ -43,9 +189,27 @@ class Conversation(object):
     """
 
     def __init__(self, path, extract,
-                 extract_messages=lambda x: x.split("\n"),
+                 extract_messages=reader.split_text,
                  sort_files=lambda x: sorted(x),
-                 name_map={}):
+                 name_map={},
+                 chunk_size=None,
+                 extract_messages_stream=reader.split_lines,
+                 workers=1,
+                 range_size=None,
+                 swears=matcher.SWEARS,
+                 responses=matcher.RESPONSES,
+                 keep_raw=True,
+                 backend="auto",
+                 cache_dir=None,
+                 cache_hash=False,
+                 checkpoint=None,
+                 word_capacity=None,
+                 url_sample_size=None,
+                 keep_person_messages=True,
+                 pipeline=False,
+                 queue_size=None,
+                 profiler=None,
+                 index_days=False):
         """
         Create a Conversation Object
 
@@ -54,7 +218,11 @@ class Conversation(object):
         :param extract: A function that given a line, returns either
             An array in this format: [username, content, timestamp in
                 "yyyy-mm-ddThh:mm:ss" format, raw_content]
-            or False, if the line is not a valid message
+            or False, if the line is not a valid message.
+            Can also be a built-in parser of parsers (such as
+            parsers.IRC or a parsers.RegexParser), which parses
+            whole files at once, in which case extract_messages
+            and extract_messages_stream are not used
         :param extract_messages: A function that given the raw text
             content of a file, returns a String array of each message, 1 per line
         :param sort_files: A function that given a String array of file names,
@@ -70,32 +238,605 @@ class Conversation(object):
 
             which would replace the phone number with the name
             in processing
+        :param chunk_size: Optional. If set, files are streamed in chunks
+            of at most chunk_size characters instead of being read whole,
+            and extract_messages_stream is used in place of extract_messages
+        :param extract_messages_stream: Chunk-aware variant of extract_messages
+            used when chunk_size is set. A function that given an iterable of
+            text chunks of a file, lazily yields each message. The default
+            yields 1 message per line
+        :param workers: Number of processes used to parse the files. If
+            greater than 1 (or None, for one per CPU) the files are parsed
+            in parallel on a process pool, in which case extract and the
+            extract_messages functions must be picklable (ie defined at
+            the top level of a module). Messages are still added in the
+            order given by sort_files
+        :param range_size: Optional, only used with workers. If set, files
+            larger than range_size bytes are split on line breaks into
+            ranges of about range_size bytes, which are parsed separately
+            with extract_messages_stream. Only use this if every message
+            is contained in a single line
+        :param swears: Optional custom dictionary of swears, either an
+            array of phrases or a matcher.PhraseMatcher. Defaults to
+            data.SWEARS
+        :param responses: Optional custom dictionary of responses (phrases
+            like "lol"), either an array of phrases or a matcher.PhraseMatcher,
+            matched case insensitively. Defaults to data.RESPONSES
+        :param keep_raw: If False, the raw line of each message is not
+            kept in memory, and the raw attribute of the messages is None
+        :param backend: How the time histograms are computed, "numpy"
+            computes them for the conversation and every person at once
+            with numpy, "python" updates them message by message, and
+            "auto" (default) uses numpy if it is installed
+        :param cache_dir: Optional directory of a cache of the parsed
+            messages of each file (see cache.MessageCache). Files that
+            did not change since the last run are loaded from the cache
+            instead of being parsed again. The cache is invalidated when
+            extract or the extract_messages functions change
+        :param cache_hash: If True, the content of the files is hashed
+            to check if they changed, not only their size and
+            modification time
+        :param checkpoint: Optional path of a checkpoint file. If it exists
+            (and was written with the same extract functions, name_map,
+            word_capacity and url_sample_size)
+            the conversation is restored from it, and only the lines
+            appended to the files since it was written are parsed and
+            analysed, see refresh. The checkpoint is then written with
+            the updated state. The messages are stored next to it, in
+            a file named like the checkpoint followed by .messages
+        :param word_capacity: Optional. If set, the words of the
+            conversation and of each person are counted approximately,
+            tracking at most word_capacity words per analyser, which
+            bounds the memory used on very large vocabularies (see
+            wordstats.SpaceSaving)
+        :param url_sample_size: Optional. If set, the analysers only keep
+            the first url_sample_size urls in their urls array instead
+            of every url, and bounded memory url statistics (total and
+            distinct counts, top domains and a random sample, see
+            urlstats.UrlStats) are included in the JSON output
+        :param keep_person_messages: If False, persons do not keep the list
+            of their messages, see Person. Their messages are then not
+            included in the JSON output
+        :param pipeline: If True, the files are read, parsed and analysed
+            at the same time, by a reader thread, a parser thread and the
+            calling thread connected by bounded queues (see pipeline.run),
+            so analysis starts as soon as the first file is read and file
+            reads do not leave the CPU idle. Can not be used with workers
+        :param queue_size: Optional, only used with pipeline. Maximum number
+            of chunks or batches of messages waiting between two stages
+        :param profiler: Optional profiler.Profiler. If set, the time spent
+            in each stage (loading, sorting, analysing, rendering...) and
+            in the extract functions (see profiler.Profiler callbacks) is
+            recorded in it, and generate_output
+            writes it to output/profile.json
+        :param index_days: If True, the aggregates of each day used by
+            slice (see dayindex.DayIndex) are built while the messages
+            are analysed, otherwise they are built by the first call to
+            slice, which tokenizes the messages again
         """
 
         self.path = path
         self.files = glob.glob(path)
-        self.messages = []
+        self.messages = store.MessageStore(keep_raw)
 
         self.extract = extract
         self.extract_messages = extract_messages
+        self.extract_messages_stream = extract_messages_stream
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.range_size = range_size
+        self.swears = matcher.compile_phrases(swears)
+        self.responses = matcher.compile_phrases(responses, lowercase=True)
+        self.tokenizer = tokenizer.Tokenizer(self.swears, self.responses)
         self.sort_files_raw = sort_files
+        self.backend = backend
+        self.word_capacity = word_capacity
+        self.url_sample_size = url_sample_size
+        self.keep_person_messages = keep_person_messages
+        self.pipeline = pipeline
+        self.queue_size = queue_size or pipeline_module.DEFAULT_QUEUE_SIZE
+        self.index_days = index_days
+        if pipeline and workers != 1:
+            raise ValueError("pipeline can not be used with workers")
+        self.cache = cache.MessageCache(cache_dir, cache_hash) if cache_dir else None
+        self.parser_identity = "\n".join([
+            cache.function_identity(self.extract),
+            cache.function_identity(self.extract_messages),
+            cache.function_identity(self.extract_messages_stream),
+            "raw" if keep_raw else "no raw"
+        ])
 
-        self.sort_files()
-        self.load_messages()
-        self.messages.sort(key=lambda x: x.timestamp)
-        self.analysis = analyser.BasicAnalyser(self.messages)
+        self.profiler = profiler
+        if profiler is not None and profiler.callbacks:
+            if not parsers.is_parser(extract):
+                self.extract = profiler.wrap("extract", extract)
+            self.extract_messages = profiler.wrap("extract_messages", extract_messages, stream=True)
+            self.extract_messages_stream = profiler.wrap("extract_messages_stream", extract_messages_stream,
+                                                         stream=True)
 
         self.name_map = name_map
+        self.checkpoint = checkpoint
+        self.file_offsets = {}
+        self.partial_lines = {}
+        self.day_index = None
+
+        # Id, message count and size of the messages file of the
+        # checkpoint, None if it must be written again from scratch
+        self.checkpoint_messages = None
+
+        restored = False
+        if checkpoint is not None:
+            with profiler_module.stage(self.profiler, "load_checkpoint"):
+                restored = self.load_checkpoint(checkpoint)
+
+        if restored:
+            self.refresh()
+        else:
+            self.sort_files()
+            if self.pipeline:
+                self.ingest()
+            else:
+                with profiler_module.stage(self.profiler, "load") as record:
+                    self.load_messages()
+                    record.count(files=len(self.files), bytes=self.bytes_read(), messages=len(self.messages))
+                with profiler_module.stage(self.profiler, "sort"):
+                    self.messages.sort()
+
+                self.persons = {}
+                self.analyse()
+
+        if checkpoint is not None:
+            with profiler_module.stage(self.profiler, "save_checkpoint"):
+                self.save_checkpoint()
+
+    def analyse(self):
+        """Computes the statistics of the conversation and of every
+           person in a single pass over self.messages. Each message is
+           only tokenized once, its tokens are shared by the global
+           analyser and the analyser of the person who said it"""
+        with profiler_module.stage(self.profiler, "analyse"):
+            vectorized = self.reset_analysis()
+            self.analyse_messages(0, time_statistics=not vectorized)
+
+            if vectorized:
+                self.compute_time_statistics(self.persons_by_username)
+
+            self.finish_analysis(self.persons.values())
+
+    def reset_analysis(self):
+        """Replaces the statistics with empty ones, before
+           the messages are analysed again
+
+        :return: True if the time statistics must be computed
+            with compute_time_statistics once the messages are added
+        """
+        vectorized = histograms.use_numpy(self.backend)
+        self.analysis = analyser.BasicAnalyser(time_statistics=not vectorized, word_capacity=self.word_capacity,
+                                               url_sample_size=self.url_sample_size)
+        self.persons = {}
+
+        # Cache of username in the logs -> Person
+        self.persons_by_username = {}
+        self.day_index = dayindex.DayIndex(self) if self.index_days else None
+        return vectorized
+
+    def analyse_messages(self, start, time_statistics=True):
+        """Adds the messages of self.messages from index start
+           to the global analyser and to the person who said them
+
+        :param start: Index of the first message to add
+        :param time_statistics: See Person
+        :return: Set of the names of the persons who said the messages
+        """
+        updated = set()
+        # The day index is updated with the same tokens, if it
+        # has indexed the messages before these ones
+        day_index = self.day_index
+        if day_index is not None and day_index.indexed != start:
+            day_index = None
+
+        with profiler_module.stage(self.profiler, "analyse_messages") as record:
+            for i in range(start, len(self.messages)):
+                message = self.messages[i]
+                tokens = self.tokenizer.tokenize(message.content)
+                self.analysis.add(message, tokens)
+
+                user = self.persons_by_username.get(message.username)
+                if user is None:
+                    username = html.escape(self.name_map.get(message.username, message.username))
+                    user = self.persons.get(username) or \
+                        person.Person(username, self.messages.subset() if self.keep_person_messages else [],
+                                      time_statistics=time_statistics, word_capacity=self.word_capacity,
+                                      url_sample_size=self.url_sample_size, keep_messages=self.keep_person_messages)
+                    self.persons[username] = user
+                    self.persons_by_username[message.username] = user
+                user.add(message, tokens)
+                updated.add(user.name)
+                if day_index is not None:
+                    day_index.add(i, message, tokens, user.name)
+            record.count(messages=len(self.messages) - start)
+        return updated
+
+    def finish_analysis(self, updated):
+        """Computes the statistics that are only needed once all
+           messages were added
+
+        :param updated: Iterable of the persons whose messages changed,
+            the others keep their random quote
+        """
+        with profiler_module.stage(self.profiler, "finish_analysis"):
+            self.analysis.finish()
+            for user in updated:
+                user.finish()
+            for key, value in self.persons.items():
+                value.compute_messages_all_time(self.analysis.days_in_range, self.analysis.first_message_timestamp)
+
+    def append(self, text, path=None):
+        """Parses new raw text (for example the lines written to a log
+           since the conversation was loaded) with extract_messages and
+           extract, and adds the messages to the conversation. The
+           statistics are updated in place, only the new messages
+           are analysed
+
+        :param text: Raw text content
+        :param path: Optional path of the file the text comes from,
+            see parsers.Parser.parse
+        :return: Number of messages added
+        """
+        messages = store.MessageStore(self.messages.keep_raw)
+        parse_text(text, self.extract, self.extract_messages, messages, path)
+        return self.add_messages(messages)
+
+    def add_messages(self, messages):
+        """Adds the messages of a MessageStore to the conversation,
+           and updates the statistics in place. If the new messages
+           are not all later than the last message of the conversation
+           the whole conversation is analysed again
+
+        :param messages: store.MessageStore
+        :return: Number of messages added
+        """
+        messages.sort()
+        start = len(self.messages)
+        self.messages.extend(messages)
+        if len(messages) == 0:
+            return 0
+
+        if start > 0 and messages.epochs[0] < self.messages.epochs[start - 1]:
+            with profiler_module.stage(self.profiler, "sort"):
+                self.messages.sort()
+            # The messages already in the checkpoint moved
+            self.checkpoint_messages = None
+            self.analyse()
+            return len(messages)
+
+        updated = self.analyse_messages(start)
+        self.finish_analysis([self.persons[name] for name in updated])
+        return len(messages)
+
+    def slice(self, start=None, end=None, users=None):
+        """Returns the statistics of the messages said between two
+           dates, optionally only by some persons, for example
+           slice(date(2019, 1, 1), date(2020, 1, 1), ["Alice"]).
+           The statistics are combined from aggregates computed per
+           day and per person, see dayindex.DayIndex and index_days
+
+        :param start: Optional date of the first day
+        :param end: Optional date of the day after the last day
+        :param users: Optional iterable of person names
+        :return: analyser.BasicAnalyser, it must not be modified
+        """
+        if self.day_index is None:
+            self.day_index = dayindex.DayIndex(self)
+        return self.day_index.query(start, end, users)
+
+    def refresh(self):
+        """Adds the lines appended to the files since they were read,
+           and the files created since then, see append and
+           read_new_lines
+
+        :return: Number of messages added
+        """
+        with profiler_module.stage(self.profiler, "load") as record:
+            messages, replaced = self.read_new_lines()
+            record.count(messages=len(messages))
+        if len(replaced):
+            self.remove_messages(replaced)
+        return self.add_messages(messages)
+
+    def remove_messages(self, messages):
+        """Removes messages from the conversation, one with the same
+           username, content and timestamp for each message of a
+           MessageStore, and analyses the other messages again
+
+        :param messages: store.MessageStore
+        """
+        epochs = self.messages.epochs
+        removed = set()
+        for message in messages:
+            i = bisect.bisect_right(epochs, message.epoch)
+            while i > 0 and epochs[i - 1] == message.epoch:
+                i -= 1
+                if i not in removed and self.messages.username_at(i) == message.username \
+                        and self.messages.content_at(i) == message.content:
+                    removed.add(i)
+                    break
+        if not removed:
+            return
+
+        self.messages.remove(removed)
+        # The messages already in the checkpoint changed
+        self.checkpoint_messages = None
+        self.analyse()
+
+    def read_new_lines(self):
+        """Parses the lines appended to the files since they were
+           read, and the files created since then. The last file
+           (in the order of sort_files) is the one still being written
+           to, so only its complete lines are parsed: its last line is
+           parsed by a later call, once a line break follows it.
+
+           Each file is read again from its last line break (see
+           record_offsets): a last line without a line break, which
+           was parsed whole when the file was loaded, may have been
+           cut while it was written. If that line is now longer, it
+           is parsed again and the messages parsed from the cut line
+           are returned to be replaced, otherwise it is skipped
+
+        :return: (store.MessageStore of the new messages, store.MessageStore
+            of the messages of cut lines)
+        """
+        files = self.sort_files_raw(glob.glob(self.path))
+        messages = store.MessageStore(self.messages.keep_raw)
+        replaced = store.MessageStore(self.messages.keep_raw)
+
+        for f in files:
+            offset = self.file_offsets.get(f, 0)
+            parsed = self.partial_lines.get(f, 0)
+            size = os.path.getsize(f)
+            if size < offset + parsed:
+                # The file was truncated or replaced, read it again
+                offset = parsed = 0
+            if size == offset + parsed:
+                continue
+
+            f_obj = open(f, "rb")
+            f_obj.seek(offset)
+            data = f_obj.read(size - offset)
+            f_obj.close()
+
+            end = len(data)
+            if f == files[-1]:
+                end = data.rfind(b"\n") + 1
+                if end == 0:
+                    # No complete line yet
+                    continue
+            line_start = data.rfind(b"\n", 0, end) + 1
+            self.file_offsets[f] = offset + line_start
+            self.partial_lines.pop(f, None)
+            if end > line_start:
+                self.partial_lines[f] = end - line_start
+
+            begin = 0
+            if parsed:
+                line_end = data.find(b"\n") + 1
+                if data[parsed:line_end] in (b"\n", b"\r\n"):
+                    # The line was complete, it was already parsed
+                    begin = line_end
+                else:
+                    parse_text(data[:parsed].decode("utf8"), self.extract, self.extract_messages, replaced, f)
+            data = data[begin:end]
+            if data.endswith(b"\n"):
+                # Not an empty message, the next line is still to come
+                data = data[:-1]
+            if data:
+                parse_text(data.decode("utf8"), self.extract, self.extract_messages, messages, f)
+
+        self.files = files
+        return messages, replaced
+
+    def record_offsets(self):
+        """Records how much of each file of self.files a load reads,
+           for read_new_lines: the offset of the last line of the file,
+           after its last line break, in self.file_offsets, and the
+           length of that line in self.partial_lines if it is not
+           empty. The files must not be written to while they are
+           being loaded"""
+        self.file_offsets = {}
+        self.partial_lines = {}
+        for f in self.files:
+            size = os.path.getsize(f)
+            self.file_offsets[f] = reader.last_line_start(f, size)
+            if size > self.file_offsets[f]:
+                self.partial_lines[f] = size - self.file_offsets[f]
+
+    def bytes_read(self):
+        """Returns the number of bytes of the files that were read"""
+        return sum(self.file_offsets.values()) + sum(self.partial_lines.values())
+
+    def save_checkpoint(self, path=None):
+        """Writes the state of the conversation (statistics and how
+           much of each file was read) to a gzip compressed file, from
+           which it can be restored with the checkpoint parameter of
+           the constructor. The messages are written to another file,
+           see save_checkpoint_messages
+
+        :param path: Path of the file, defaults to self.checkpoint
+        """
+        path = path or self.checkpoint
+        self.save_checkpoint_messages(path + ".messages")
+        header = json.dumps({
+            "version": CHECKPOINT_VERSION,
+            "parser_identity": self.parser_identity,
+            "name_map": self.name_map,
+            "files": self.file_offsets,
+            "partial_lines": self.partial_lines,
+            "messages": self.checkpoint_messages,
+            "analysis": self.analysis.to_state(),
+            "persons": [user.to_state() for user in self.persons.values()]
+        }, separators=(",", ":")).encode("utf8")
+
+        # Written to a temporary file first, so a crash never
+        # leaves a partially written checkpoint behind
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with gzip.open(os.fdopen(fd, "wb"), "wb") as f_obj:
+                f_obj.write(struct.pack("<I", len(header)))
+                f_obj.write(header)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def save_checkpoint_messages(self, path):
+        """Writes the messages of the conversation to the messages
+           file of a checkpoint: a header with a random id, followed
+           by blocks of messages in the format of MessageStore.write.
+           Only the messages added since the last save are appended
+           as a new block, the file is only written again from scratch
+           when the messages already in it changed (see add_messages).
+           Anything after the end recorded in the checkpoint (such as
+           a block appended by a save that crashed) is overwritten
+
+        :param path: Path of the messages file
+        """
+        saved = self.checkpoint_messages
+        if saved is not None and self.read_checkpoint_messages_id(path) == saved["id"] \
+                and os.path.getsize(path) >= saved["size"]:
+            with open(path, "r+b") as f_obj:
+                f_obj.truncate(saved["size"])
+                f_obj.seek(saved["size"])
+                if len(self.messages) > saved["count"]:
+                    self.messages.tail(saved["count"]).write(f_obj)
+                size = f_obj.tell()
+            self.checkpoint_messages = {"id": saved["id"], "count": len(self.messages), "size": size}
+            return
+
+        # A new id, so a checkpoint written with the previous
+        # messages file is not restored with this one
+        identifier = uuid.uuid4().hex
+        header = json.dumps({"id": identifier}).encode("utf8")
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f_obj:
+                f_obj.write(struct.pack("<I", len(header)))
+                f_obj.write(header)
+                self.messages.write(f_obj)
+                size = f_obj.tell()
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self.checkpoint_messages = {"id": identifier, "count": len(self.messages), "size": size}
+
+    @staticmethod
+    def read_checkpoint_messages_id(path):
+        """Returns the id in the header of the messages file
+           of a checkpoint, see save_checkpoint_messages
+
+        :param path: Path of the messages file
+        :return: String, None if the file is missing or invalid
+        """
+        try:
+            with open(path, "rb") as f_obj:
+                return json.loads(f_obj.read(struct.unpack("<I", f_obj.read(4))[0]).decode("utf8")).get("id")
+        except (OSError, ValueError, AttributeError, struct.error):
+            return None
+
+    @staticmethod
+    def load_checkpoint_messages(path, saved, keep_raw):
+        """Reads the messages file of a checkpoint, see
+           save_checkpoint_messages
+
+        :param path: Path of the messages file
+        :param saved: Id, message count and size of the file
+            recorded in the checkpoint
+        :param keep_raw: keep_raw of the returned store
+        :return: store.MessageStore, or None if the file is
+            missing or does not match the checkpoint
+        """
+        messages = store.MessageStore(keep_raw)
+        try:
+            with open(path, "rb") as f_obj:
+                header = json.loads(f_obj.read(struct.unpack("<I", f_obj.read(4))[0]).decode("utf8"))
+                if header.get("id") != saved["id"]:
+                    return None
+                while f_obj.tell() < saved["size"]:
+                    block = store.MessageStore.read(f_obj)
+                    if block.keep_raw != keep_raw:
+                        return None
+                    messages.extend(block)
+        except (OSError, ValueError, KeyError, struct.error):
+            return None
+        if len(messages) != saved["count"]:
+            return None
+        return messages
+
+    def load_checkpoint(self, path):
+        """Restores the state written by save_checkpoint
+
+        :param path: Path of the file
+        :return: False if the file does not exist, or was written with
+            other extract functions, another name_map, word_capacity
+            or url_sample_size
+        """
+        if not os.path.exists(path):
+            return False
+
+        with gzip.open(path, "rb") as f_obj:
+            state = json.loads(f_obj.read(struct.unpack("<I", f_obj.read(4))[0]).decode("utf8"))
+            if state.get("version") != CHECKPOINT_VERSION or state["parser_identity"] != self.parser_identity \
+                    or state["name_map"] != self.name_map \
+                    or state["analysis"].get("word_capacity") != self.word_capacity \
+                    or state["analysis"].get("url_sample_size") != self.url_sample_size:
+                return False
+
+        messages = self.load_checkpoint_messages(path + ".messages", state["messages"], self.messages.keep_raw)
+        if messages is None:
+            return False
+        self.messages = messages
+        self.checkpoint_messages = state["messages"]
+        self.file_offsets = state["files"]
+        self.partial_lines = state["partial_lines"]
+        self.files = list(self.file_offsets)
+        self.analysis = analyser.BasicAnalyser.from_state(state["analysis"])
+
+        # The messages of each person are found from the user ids
+        subsets = {user["name"]: self.messages.subset() for user in state["persons"]}
+        by_user_id = [subsets[html.escape(self.name_map.get(username, username))]
+                      for username in self.messages.usernames]
+        for i, user_id in enumerate(self.messages.user_ids):
+            by_user_id[user_id].indexes.append(i)
+        for user in state["persons"]:
+            if not user.get("keep_messages", True):
+                subsets[user["name"]] = []
+
         self.persons = {}
+        for user in state["persons"]:
+            self.persons[user["name"]] = person.Person.from_state(user, subsets[user["name"]])
+            self.persons[user["name"]].compute_messages_all_time(self.analysis.days_in_range,
+                                                                 self.analysis.first_message_timestamp)
+        self.persons_by_username = {username: self.persons[html.escape(self.name_map.get(username, username))]
+                                    for username in self.messages.usernames}
+        self.day_index = None
+        return True
 
-        for message in self.messages:
-            username = html.escape(self.name_map.get(message.username, message.username))
-            self.persons[username] = self.persons.get(username) or person.Person(username, [])
-            self.persons[username].messages.append(message)
+    def compute_time_statistics(self, persons_by_username):
+        """Computes the time statistics of the conversation and of
+           every person at once with numpy, see histograms
+
+        :param persons_by_username: Dict of username in the logs -> Person
+        """
+        with profiler_module.stage(self.profiler, "time_statistics"):
+            persons = list(self.persons.values())
+            indexes = {id(user): i for i, user in enumerate(persons)}
+            groups = [indexes[id(persons_by_username[username])] for username in self.messages.usernames]
 
-        for key, value in self.persons.items():
-            value.recompute()
-            value.compute_messages_all_time(self.analysis.days_in_range, self.analysis.first_message_timestamp)
+            total, statistics = histograms.compute(self.messages.epochs, self.messages.user_ids,
+                                                   groups, len(persons))
+            self.analysis.set_time_statistics(total)
+            for user, user_statistics in zip(persons, statistics):
+                user.set_time_statistics(user_statistics)
 
     def sort_files(self):
         """Sort the classes' file array by filename. Examples of
@@ -112,42 +853,289 @@ class Conversation(object):
 
     def load_messages(self):
         """Load all the conversations from self.files, and
-           add the new Message objects to self.messages"""
+           add the new messages to self.messages. If
+           self.chunk_size is set the files are streamed in chunks"""
+        self.record_offsets()
+        if self.workers != 1:
+            return self.load_messages_parallel()
+
         for f in self.files:
+            if self.cache is not None:
+                self.load_cached_file(f)
+                continue
+
             f_obj = open(f, "r", encoding="utf8")
-            self.extract_messages_from_text(f_obj.read())
+            if self.chunk_size:
+                self.extract_messages_from_chunks(reader.read_chunks(f_obj, self.chunk_size), f)
+            else:
+                self.extract_messages_from_text(f_obj.read(), f)
             f_obj.close()
 
-    def extract_messages_from_text(self, data):
-        """Given some text, extracts the messages from the data
-           and adds the new Message objects to self.messages"""
-        messages = self.extract_messages(data)
+    def ingest(self):
+        """Load all the conversations from self.files and analyse them
+           with a pipeline: a reader thread reads the files (see
+           read_files), a parser thread parses them into batches of
+           messages (see parse_items) and each batch is analysed as
+           soon as it is parsed. If a batch is older than the previous
+           one, the remaining batches are only loaded, and all the
+           messages are sorted and analysed again at the end"""
+        self.record_offsets()
+        vectorized = self.reset_analysis()
+        in_order = True
 
-        for message in messages:
-            data = self.extract(message)
-            if not data:
+        with profiler_module.stage(self.profiler, "ingest") as record:
+            for messages in pipeline_module.run(self.read_files(), [self.parse_items], self.queue_size):
+                messages.sort()
+                start = len(self.messages)
+                self.messages.extend(messages)
+                if not in_order or len(messages) == 0:
+                    continue
+
+                if start > 0 and messages.epochs[0] < self.messages.epochs[start - 1]:
+                    in_order = False
+                    continue
+                self.analyse_messages(start, time_statistics=not vectorized)
+            record.count(files=len(self.files), bytes=self.bytes_read(), messages=len(self.messages))
+
+        if not in_order:
+            with profiler_module.stage(self.profiler, "sort"):
+                self.messages.sort()
+            self.analyse()
+            return
+
+        if vectorized:
+            self.compute_time_statistics(self.persons_by_username)
+        self.finish_analysis(self.persons.values())
+
+    def read_files(self):
+        """Reader stage of ingest, reads self.files in order
+
+        :return: Generator of (path, cache fingerprint or None, data, last)
+            tuples. data is a chunk of text of the file (the whole file if
+            self.chunk_size is not set), or the store.MessageStore of the
+            file if it was found in self.cache. last is True for the
+            last chunk of a file
+        """
+        for f in self.files:
+            fingerprint = None
+            if self.cache is not None:
+                fingerprint = self.cache.fingerprint(f)
+                messages = self.cache.load(f, self.parser_identity, fingerprint)
+                if messages is not None:
+                    yield f, fingerprint, messages, True
+                    continue
+
+            with open(f, "r", encoding="utf8") as f_obj:
+                if not self.chunk_size:
+                    yield f, fingerprint, f_obj.read(), True
+                    continue
+
+                # Read one chunk ahead, to know which one is the last
+                previous = ""
+                for chunk in reader.read_chunks(f_obj, self.chunk_size):
+                    if previous:
+                        yield f, fingerprint, previous, False
+                    previous = chunk
+                yield f, fingerprint, previous, True
+
+    def parse_items(self, items):
+        """Parser stage of ingest, parses the chunks read by read_files
+
+        :param items: Iterable of the items of read_files
+        :return: Generator of store.MessageStore batches, in file order
+        """
+        items = iter(items)
+        for f, fingerprint, data, last in items:
+            if isinstance(data, store.MessageStore):
+                yield data
+                continue
+
+            if parsers.is_parser(self.extract):
+                # Bulk parsers parse each file in one batch
+                with profiler_module.stage(self.profiler, "parse") as record:
+                    messages = store.MessageStore(self.messages.keep_raw)
+                    if self.chunk_size:
+                        self.extract.parse_chunks(file_chunks(data, last, items), messages, f)
+                    else:
+                        self.extract.parse(data, messages, f)
+                    if self.cache is not None:
+                        self.cache.save(f, self.parser_identity, messages, fingerprint)
+                    record.count(messages=len(messages))
+                yield messages
+                continue
+
+            if self.chunk_size:
+                lines = self.extract_messages_stream(file_chunks(data, last, items))
+            else:
+                lines = self.extract_messages(data)
+
+            if self.cache is not None:
+                # Each file is parsed whole, to be saved in the cache
+                with profiler_module.stage(self.profiler, "parse") as record:
+                    messages = store.MessageStore(self.messages.keep_raw)
+                    parse_lines(lines, self.extract, messages)
+                    self.cache.save(f, self.parser_identity, messages, fingerprint)
+                    record.count(messages=len(messages))
+                yield messages
                 continue
-            self.messages.append(Message(data[0], data[1], data[2], data[3]))
 
-    def generate_html(self):
+            lines = iter(lines)
+            while True:
+                with profiler_module.stage(self.profiler, "parse") as record:
+                    batch = list(itertools.islice(lines, pipeline_module.DEFAULT_BATCH_SIZE))
+                    messages = store.MessageStore(self.messages.keep_raw)
+                    parse_lines(batch, self.extract, messages)
+                    record.count(messages=len(messages))
+                if not batch:
+                    break
+                yield messages
+
+    def load_cached_file(self, f):
+        """Add the messages of a file to self.messages, from
+           self.cache if the file did not change, otherwise by
+           parsing it and updating the cache"""
+        fingerprint = self.cache.fingerprint(f)
+        messages = self.cache.load(f, self.parser_identity, fingerprint)
+        if messages is None:
+            messages = parse_file(f, self.extract, self.extract_messages, self.chunk_size,
+                                  self.extract_messages_stream, keep_raw=self.messages.keep_raw)
+            self.cache.save(f, self.parser_identity, messages, fingerprint)
+        self.messages.extend(messages)
+
+    def load_messages_parallel(self):
+        """Load all the conversations from self.files on a pool of
+           self.workers processes, and add the new messages
+           to self.messages in file order. Files found in
+           self.cache are not sent to the pool"""
+        # Results are collected in submission order, so the
+        # messages stay in the order defined by sort_files
+        with futures.ProcessPoolExecutor(self.workers) as executor:
+            files = []
+            for f in self.files:
+                fingerprint = None
+                if self.cache is not None:
+                    fingerprint = self.cache.fingerprint(f)
+                    messages = self.cache.load(f, self.parser_identity, fingerprint)
+                    if messages is not None:
+                        files.append((f, fingerprint, messages, []))
+                        continue
+
+                jobs = []
+                for byte_range in reader.split_ranges(f, self.range_size) if self.range_size else [None]:
+                    # The callbacks timed by self.profiler can not be sent
+                    # to the workers, their time is only part of the load stage
+                    jobs.append(executor.submit(parse_file, f, profiler_module.unwrap(self.extract),
+                                                profiler_module.unwrap(self.extract_messages), self.chunk_size,
+                                                profiler_module.unwrap(self.extract_messages_stream), byte_range,
+                                                self.messages.keep_raw))
+                files.append((f, fingerprint, None, jobs))
+
+            for f, fingerprint, messages, jobs in files:
+                if messages is None and self.cache is None:
+                    for job in jobs:
+                        self.messages.extend(job.result())
+                    continue
+
+                if messages is None:
+                    messages = store.MessageStore(self.messages.keep_raw)
+                    for job in jobs:
+                        messages.extend(job.result())
+                    self.cache.save(f, self.parser_identity, messages, fingerprint)
+                self.messages.extend(messages)
+
+    def extract_messages_from_text(self, data, path=None):
+        """Given some text, extracts the messages from the data
+           and adds the new messages to self.messages. path is the
+           optional path of the file, see parse_text"""
+        parse_text(data, self.extract, self.extract_messages, self.messages, path)
+
+    def extract_messages_from_chunks(self, chunks, path=None):
+        """Given an iterable of text chunks, lazily extracts the messages
+           from the chunks and adds the new messages to self.messages,
+           see parse_chunks"""
+        parse_chunks(chunks, self.extract, self.extract_messages_stream, self.messages, path)
+
+    def generate_html(self, compact=False, lazy=False):
         """Returns an HTML string representing the statistics
-        for the conversation"""
-        return html_render.render(self)
+        for the conversation
+
+        :param compact: See html_render.render_chunks
+        :param lazy: See html_render.render_chunks
+        """
+        with profiler_module.stage(self.profiler, "render"):
+            return html_render.render(self, compact, lazy)
+
+    def write_html(self, f_obj, compact=False, lazy=False):
+        """Writes the HTML representing the statistics for the
+        conversation to a file object, section by section
+
+        :param f_obj: File object opened in text mode
+        :param compact: See html_render.render_chunks
+        :param lazy: See html_render.render_chunks
+        """
+        with profiler_module.stage(self.profiler, "render"):
+            html_render.render_to(self, f_obj, compact, lazy)
 
     def generate_json(self):
         """Returns a JSON representation of the conversation"""
-        return json.dumps({
-            "messages": list(map(lambda x: str(x), self.messages)),
-            "analysis": self.analysis.to_dict(),
-            "users": {k: v.to_dict() for k, v in self.persons.items()}
-        }, sort_keys=True, indent=4, separators=(',', ': '))
-
-    def generate_output(self):
-        """Updates the output folder"""
-        f = open("output/stats.html", "w", encoding="utf-8")
-        f.write(self.generate_html())
+        f = io.StringIO()
+        self.write_json(f)
+        return f.getvalue()
+
+    def write_json(self, f_obj, format="pretty", messages="all"):
+        """Writes the JSON representation of the conversation
+        to a file object, piece by piece
+
+        :param f_obj: File object opened in text mode
+        :param format: See json_export.write_json
+        :param messages: See json_export.write_json
+        """
+        with profiler_module.stage(self.profiler, "json"):
+            json_export.write_json(self, f_obj, format, messages)
+
+    def write_snapshot(self, path):
+        """Writes a binary snapshot of the aggregate statistics of the
+           conversation (messages per day, hour and weekday histograms
+           and totals), see snapshot.Snapshot to read it
+
+        :param path: Path of the file
+        """
+        with profiler_module.stage(self.profiler, "snapshot"):
+            snapshot.write(self, path)
+
+    def generate_output(self, compact=False, compress=False, lazy=False, json_format="pretty",
+                        json_messages="all", output_dir="output"):
+        """Updates the output folder
+
+        :param compact: If True, the data of the charts is only
+            written once in the HTML, see html_render.render_chunks
+        :param compress: If True, a gzip compressed copy of each
+            file is written as well (stats.html.gz, stats.json.gz),
+            for web servers that serve precompressed files
+        :param lazy: If True, the charts and statistics of each person
+            are only drawn on demand, see html_render.render_chunks
+        :param json_format: Format of stats.json, see json_export.write_json
+        :param json_messages: Messages written in stats.json, see json_export.write_json
+        :param output_dir: Folder of the output files, created if needed
+
+        If the conversation has a profiler, it is written to profile.json
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        html_path = os.path.join(output_dir, "stats.html")
+        json_path = os.path.join(output_dir, "stats.json")
+
+        f = open(html_path, "w", encoding="utf-8")
+        self.write_html(f, compact, lazy)
         f.close()
 
-        f = open("output/stats.json", "w", encoding="utf-8")
-        f.write(self.generate_json())
+        f = open(json_path, "w", encoding="utf-8")
+        self.write_json(f, json_format, json_messages)
         f.close()
+
+        if compress:
+            for path in [html_path, json_path]:
+                with open(path, "rb") as f_in, gzip.open(path + ".gz", "wb") as f_out:
+                    shutil.copyfileobj(f_in, f_out)
+
+        if self.profiler is not None:
+            self.profiler.write(os.path.join(output_dir, "profile.json"))
@@ -28,4 +28,7 @@ STOPWORDS = ["i", "mms", "me", "my", "myself", "we", "our", "ours", "ourselves",
              "again", "further", "then", "once", "here", "there", "when", "where", "why",
              "how", "all", "any", "both", "each", "few", "more", "most", "other", "some",
              "such", "no", "nor", "not", "only", "own", "same", "so", "than", "too", "very",
-             "s", "t", "can", "will", "just", "don", "should", "dont", "cant", "im", "now"]
\ No newline at end of file
+             "s", "t", "can", "will", "just", "don", "should", "dont", "cant", "im", "now"]
+
+# Set of the stopwords, for constant time lookups
+STOPWORD_SET = frozenset(STOPWORDS)
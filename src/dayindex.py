@@ -0,0 +1,340 @@
+"""
+DayIndex class, compact aggregates of the messages of a
+conversation by calendar day and person, used to answer
+date range and per person queries. See DayIndex help for
+more information.
+"""
+
+import bisect
+from array import array
+from collections import OrderedDict
+
+from src import analyser
+from src import timestamps
+from src import wordstats
+
+DEFAULT_CACHE_SIZE = 32
+
+# Fields of the record of a person in a day: the sums of the
+# statistics of their messages, the index of their first and last
+# message of the day, then the number of messages of each hour
+MESSAGES = 0
+WORDS = 1
+CHARACTERS = 2
+CHARACTERS_WITHOUT_SPACES = 3
+SWEARS = 4
+QUESTIONS = 5
+URLS = 6
+FIRST = 7
+LAST = 8
+HOURS = 9
+RECORD_SIZE = HOURS + 24
+
+
+def day_of(date):
+    """
+    Returns the day index (days since 1970-01-01) of a date
+
+    :param date: date or datetime object, the time is ignored
+    :return: int
+    """
+    return date.toordinal() - timestamps.EPOCH_ORDINAL
+
+
+class Day(object):
+    """
+    Day
+
+    Aggregates of the messages of an active day: a record
+    of counts per person (see RECORD_SIZE), the number of
+    times each person used each word, and the urls
+    """
+
+    def __init__(self, day):
+        """
+        Create an empty Day
+
+        :param day: Day index, see day_of
+        """
+        self.day = day
+
+        # Person id -> array of RECORD_SIZE counts
+        self.records = {}
+
+        # Entry i: the person persons[i] used the word word_ids[i]
+        # counts[i] times, first in the message firsts[i].
+        # Entries are in the order the words were first used in
+        self.word_ids = array("q")
+        self.persons = array("q")
+        self.counts = array("q")
+        self.firsts = array("q")
+
+        # (person id, message index, url) tuples, in order
+        self.urls = []
+
+        # Person id -> dict of word id -> entry, only kept
+        # while messages can be added to the day
+        self.positions = {}
+
+
+class DayIndex(object):
+    """
+    DayIndex
+
+    Aggregates the messages of a conversation per calendar day
+    and per person: message, word, character, swear, question
+    and url counts, messages per hour, word counts and the urls.
+    The aggregates are built once, from the tokens computed when
+    the messages are analysed (see Conversation.analyse_messages)
+    or by tokenizing the messages when the index is first queried.
+    A query combines the aggregates of the days in range into a
+    BasicAnalyser, so its cost depends on the number of days,
+    persons and distinct words of each day, not of messages. The
+    results of the last queries are kept in an LRU cache.
+
+    In bounded url mode (url_sample_size), only the first
+    url_sample_size urls of each person are kept per day: the url
+    count of a query is exact, its other url statistics (see
+    urlstats.UrlStats) only include the kept urls.
+    """
+
+    def __init__(self, conversation, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        Create an empty DayIndex of the messages of a conversation,
+        see add and update
+
+        :param conversation: Conversation object
+        :param cache_size: Number of query results kept
+        """
+        self.conversation = conversation
+        self.cache_size = cache_size
+
+        # Active days, and their day index (see day_of)
+        self.days = []
+        self.day_numbers = array("q")
+
+        # Number of messages of conversation.messages indexed
+        self.indexed = 0
+
+        # Person name <-> id, word <-> id
+        self.person_ids = {}
+        self.person_names = []
+        self.word_ids = {}
+        self.words = []
+
+        self.cache = OrderedDict()
+        self.cache_indexed = 0
+
+    def add(self, index, message, tokens, name):
+        """
+        Add a message to the aggregates. Messages must be added
+        in order, index being the number of messages indexed
+
+        :param index: Index of the message in conversation.messages
+        :param message: Message object
+        :param tokens: tokenizer.Tokens of the message
+        :param name: Name of the person who said the message
+        """
+        epoch = message.epoch
+        day = epoch // timestamps.SECONDS_PER_DAY
+        current = self.days[-1] if self.days else None
+        if current is None or current.day != day:
+            if current is not None:
+                current.positions = None
+            current = Day(day)
+            self.days.append(current)
+            self.day_numbers.append(day)
+
+        person = self.person_ids.get(name)
+        if person is None:
+            person = self.person_ids[name] = len(self.person_names)
+            self.person_names.append(name)
+
+        record = current.records.get(person)
+        if record is None:
+            record = current.records[person] = array("q", [0] * RECORD_SIZE)
+            record[FIRST] = index
+        record[LAST] = index
+        record[MESSAGES] += 1
+        record[WORDS] += len(tokens.words)
+        record[CHARACTERS] += tokens.total_characters
+        record[CHARACTERS_WITHOUT_SPACES] += tokens.total_characters_without_spaces
+        if tokens.swear:
+            record[SWEARS] += 1
+        if tokens.question:
+            record[QUESTIONS] += 1
+        record[HOURS + epoch % timestamps.SECONDS_PER_DAY // timestamps.SECONDS_PER_HOUR] += 1
+
+        if tokens.urls:
+            limit = self.conversation.url_sample_size
+            for url in tokens.urls:
+                if limit is None or record[URLS] < limit:
+                    current.urls.append((person, index, url))
+                record[URLS] += 1
+
+        positions = current.positions.get(person)
+        if positions is None:
+            positions = current.positions[person] = {}
+        for word in tokens.word_types:
+            word_id = self.word_ids.get(word)
+            if word_id is None:
+                word_id = self.word_ids[word] = len(self.words)
+                self.words.append(word)
+
+            position = positions.get(word_id)
+            if position is None:
+                positions[word_id] = len(current.word_ids)
+                current.word_ids.append(word_id)
+                current.persons.append(person)
+                current.counts.append(1)
+                current.firsts.append(index)
+            else:
+                current.counts[position] += 1
+
+        self.indexed = index + 1
+
+    def update(self):
+        """
+        Index the messages added to the conversation that are not
+        indexed yet. The new messages must all be later than the
+        indexed ones (see Conversation.add_messages)
+        """
+        conversation = self.conversation
+        messages = conversation.messages
+        for i in range(self.indexed, len(messages)):
+            message = messages[i]
+            tokens = conversation.tokenizer.tokenize(message.content)
+            self.add(i, message, tokens, conversation.persons_by_username[message.username].name)
+
+    def new_analyser(self):
+        """Returns an empty analyser with the options of the conversation"""
+        return analyser.BasicAnalyser(word_capacity=self.conversation.word_capacity,
+                                      url_sample_size=self.conversation.url_sample_size)
+
+    def combine(self, days, persons):
+        """
+        Combine the aggregates of days into an analyser
+
+        :param days: Iterable of Day objects, in order
+        :param persons: Set of person ids, or None for everyone
+        :return: BasicAnalyser, the same as an analyser of the
+            messages of the persons in these days
+        """
+        result = self.new_analyser()
+        messages = self.conversation.messages
+        epochs = messages.epochs
+        words = self.words
+        limit = result.url_sample_size
+
+        word_count = {}
+        first_seen = {}
+        url_count = 0
+        first = last = None
+        for day in days:
+            records = [record for person, record in day.records.items() if persons is None or person in persons]
+            if not records:
+                continue
+            totals = [sum(column) for column in zip(*records)]
+            day_first = min(record[FIRST] for record in records)
+            if first is None:
+                first = day_first
+            last = max(record[LAST] for record in records)
+
+            result.day_epochs.append(epochs[day_first])
+            result.day_counts.append(totals[MESSAGES])
+            result.total_messages += totals[MESSAGES]
+            result.total_words += totals[WORDS]
+            result.total_characters += totals[CHARACTERS]
+            result.total_characters_without_spaces += totals[CHARACTERS_WITHOUT_SPACES]
+            result.swears += totals[SWEARS]
+            result.questions += totals[QUESTIONS]
+            url_count += totals[URLS]
+
+            weekday = (day.day + timestamps.EPOCH_WEEKDAY) % 7
+            result.active_days_of_week[weekday] += totals[MESSAGES]
+            for hour in range(24):
+                result.active_hours[hour] += totals[HOURS + hour]
+                result.active_weekly_hours[weekday * 24 + hour] += totals[HOURS + hour]
+
+            for word_id, person, count, index in zip(day.word_ids, day.persons, day.counts, day.firsts):
+                if persons is None or person in persons:
+                    word = words[word_id]
+                    current = word_count.get(word)
+                    if current is None:
+                        word_count[word] = count
+                        first_seen[word] = epochs[index]
+                    else:
+                        word_count[word] = current + count
+
+            for person, index, url in day.urls:
+                if persons is None or person in persons:
+                    if limit is None or len(result.urls) < limit:
+                        result.urls.append(url)
+                        result.url_timeline.append(epochs[index])
+                    if result.url_stats is not None:
+                        result.url_stats.add(url)
+
+        if first is None:
+            return result
+
+        result.first_message = messages[first]
+        result.first_epoch = epochs[first]
+        result.last_message = messages[last]
+        result.last_epoch = epochs[last]
+
+        if result.word_sketch is None:
+            result.word_count = word_count
+            result.word_first_seen = first_seen
+        else:
+            result.word_sketch = wordstats.SpaceSaving.from_counts(word_count, result.word_capacity)
+            result.word_count = result.word_sketch.counts
+            result.word_first_seen = {word: first_seen[word] for word in result.word_count}
+
+        if result.url_stats is not None:
+            # Urls that were not kept are counted, not sampled
+            result.url_stats.total = url_count
+            result.url_stats.samples.seen = url_count
+
+        result.update_daily_statistics()
+        result.finish()
+        return result
+
+    def query(self, start=None, end=None, users=None):
+        """
+        Returns the statistics of the messages of a date range
+
+        :param start: Optional date (or datetime, the time is ignored)
+            of the first day of the range
+        :param end: Optional date of the day after the range, ie the
+            range is start <= day < end
+        :param users: Optional iterable of person names (keys of
+            conversation.persons), only their messages are included
+        :return: BasicAnalyser, shared with the cache so it must not be modified
+        :raises KeyError: If a user is not a person of the conversation
+        """
+        if users is not None:
+            users = frozenset(users)
+            for name in users:
+                if name not in self.conversation.persons:
+                    raise KeyError(name)
+
+        self.update()
+        if self.cache_indexed != self.indexed:
+            self.cache.clear()
+            self.cache_indexed = self.indexed
+
+        key = (None if start is None else day_of(start), None if end is None else day_of(end), users)
+        result = self.cache.get(key)
+        if result is not None:
+            self.cache.move_to_end(key)
+            return result
+
+        first = 0 if key[0] is None else bisect.bisect_left(self.day_numbers, key[0])
+        last = len(self.days) if key[1] is None else bisect.bisect_left(self.day_numbers, key[1])
+        persons = None if users is None else {self.person_ids[name] for name in users if name in self.person_ids}
+
+        result = self.combine(self.days[first:last], persons)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
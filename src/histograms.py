@@ -0,0 +1,191 @@
+"""
+Vectorized time statistics. If numpy is installed, the time based
+histograms of the whole conversation and of every person are computed
+at once with numpy.bincount over the epoch array of the messages,
+instead of being incremented once per message by each analyser.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from src import timestamps
+
+BACKENDS = ["auto", "python", "numpy"]
+
+
+def use_numpy(backend):
+    """
+    Returns True if the time statistics should be vectorized
+
+    :param backend: "python" (never), "numpy" (always) or "auto"
+        (if numpy is installed)
+    :return: bool
+    :raises ValueError: If the backend is unknown, or is "numpy"
+        and numpy is not installed
+    """
+    if backend not in BACKENDS:
+        raise ValueError("Unknown backend {}, expected one of {}".format(backend, BACKENDS))
+    if backend == "numpy" and numpy is None:
+        raise ValueError("The numpy backend requires numpy to be installed")
+    return numpy is not None and backend != "python"
+
+
+class TimeStatistics(object):
+    """
+    TimeStatistics
+
+    The time based statistics of a group of messages, with
+    the same meaning as the attributes of BasicAnalyser
+    """
+
+    def __init__(self):
+        self.days_in_range = 0
+        self.active_days = 0
+        self.active_hours = [0] * 24
+        self.active_days_of_week = [0] * 7
+        self.active_weekly_hours = [0] * (7 * 24)
+        self.active_days_all_time = []
+        self.messages_said_all_time = []
+        self.most_active_epoch = None
+        self.most_messages_said = 0
+
+        # First epoch and number of messages of the last active
+        # day, needed to keep adding messages incrementally
+        self.current_epoch = None
+        self.messages_said = 0
+
+        # (epoch, messages said the previous active day) for
+        # every day change, see Person.compute_messages_all_time
+        self.day_changes = []
+
+
+def compute(epochs, user_ids=None, groups=None, group_count=0):
+    """
+    Computes the time statistics of a conversation, and of groups
+    of its messages (ie persons), with numpy
+
+    :param epochs: Epochs of the messages, sorted. Any buffer of
+        int64, such as MessageStore.epochs
+    :param user_ids: Optional buffer of the user id of each message,
+        such as MessageStore.user_ids
+    :param groups: Optional array mapping each user id to a group index
+    :param group_count: Number of groups
+    :return: (TimeStatistics of all messages, array of TimeStatistics
+        of each group)
+    """
+    epochs = numpy.asarray(epochs, dtype=numpy.int64)
+    if len(epochs) == 0:
+        return TimeStatistics(), [TimeStatistics() for i in range(group_count)]
+
+    total = _compute_segments(epochs, numpy.array([0]), numpy.array([len(epochs)]))[0]
+    if groups is None or group_count == 0:
+        return total, []
+
+    # Stable sort by group, so each group is a contiguous
+    # segment of epochs that are still sorted
+    message_groups = numpy.asarray(groups, dtype=numpy.int64)[numpy.asarray(user_ids, dtype=numpy.int64)]
+    order = numpy.argsort(message_groups, kind="stable")
+    sizes = numpy.bincount(message_groups, minlength=group_count)
+    ends = numpy.cumsum(sizes)
+    starts = ends - sizes
+
+    present = numpy.flatnonzero(sizes)
+    segments = _compute_segments(epochs[order], starts[present], ends[present])
+
+    statistics = [TimeStatistics() for i in range(group_count)]
+    for i, group in enumerate(present.tolist()):
+        statistics[group] = segments[i]
+    return total, statistics
+
+
+def _compute_segments(epochs, starts, ends):
+    """
+    Computes the time statistics of contiguous segments of
+    an epoch array, each sorted from earliest to latest
+
+    :param epochs: numpy int64 array
+    :param starts: numpy array of the start index of each segment
+    :param ends: numpy array of the end index of each segment, segments
+        must be non empty and cover the whole epochs array
+    :return: Array of TimeStatistics
+    """
+    count = len(starts)
+    lengths = ends - starts
+    segment = numpy.repeat(numpy.arange(count), lengths)
+
+    day = epochs // timestamps.SECONDS_PER_DAY
+    hour = epochs % timestamps.SECONDS_PER_DAY // timestamps.SECONDS_PER_HOUR
+    weekday = (day + timestamps.EPOCH_WEEKDAY) % 7
+
+    hours = numpy.bincount(segment * 24 + hour, minlength=count * 24).reshape(count, 24)
+    weekdays = numpy.bincount(segment * 7 + weekday, minlength=count * 7).reshape(count, 7)
+    weekly_hours = numpy.bincount(segment * 168 + weekday * 24 + hour,
+                                  minlength=count * 168).reshape(count, 168)
+
+    # Messages per calendar day, from the day of the first message of each segment
+    first = epochs[starts]
+    first_day = day[starts]
+    ranges = day[ends - 1] - first_day + 1
+    offsets = numpy.concatenate([[0], numpy.cumsum(ranges)])
+    all_time = numpy.bincount(offsets[segment] + day - first_day[segment], minlength=offsets[-1])
+
+    # Calendar days, see BasicAnalyser.add for the logic
+    is_day_start = numpy.ones(len(epochs), dtype=bool)
+    is_day_start[1:] = (day[1:] != day[:-1]) | (segment[1:] != segment[:-1])
+    day_starts = numpy.flatnonzero(is_day_start)
+    day_counts = numpy.diff(numpy.append(day_starts, len(epochs)))
+    day_epochs = epochs[day_starts]
+    day_segments = segment[day_starts]
+    active_day_numbers = day[day_starts]
+    active_days = numpy.bincount(day_segments, minlength=count)
+
+    # A day change is an active day that is not the first of its segment
+    changes = numpy.flatnonzero(day_segments[1:] == day_segments[:-1]) + 1
+    change_segments = day_segments[changes]
+    change_epochs = day_epochs[changes]
+    change_values = day_counts[changes - 1]
+    missing_days = active_day_numbers[changes] - active_day_numbers[changes - 1] - 1
+
+    # messages_said_all_time is missing_days zeros then the value, per change
+    said_lengths = missing_days + 1
+    said_positions = numpy.cumsum(said_lengths) - 1
+    said = numpy.zeros(int(said_lengths.sum()), dtype=numpy.int64)
+    said[said_positions] = change_values
+    said_offsets = numpy.concatenate([[0], numpy.cumsum(
+        numpy.bincount(change_segments, weights=said_lengths, minlength=count).astype(numpy.int64))])
+
+    # Most active day: first change with the highest value in each segment
+    most_epochs = first.copy()
+    most_values = numpy.zeros(count, dtype=numpy.int64)
+    if len(changes) > 0:
+        order = numpy.lexsort((numpy.arange(len(changes)), -change_values, change_segments))
+        best = order[numpy.concatenate([[True], change_segments[order][1:] != change_segments[order][:-1]])]
+        most_epochs[change_segments[best]] = change_epochs[best]
+        most_values[change_segments[best]] = change_values[best]
+
+    last_days = numpy.cumsum(active_days) - 1
+
+    change_offsets = numpy.concatenate([[0], numpy.cumsum(numpy.bincount(change_segments, minlength=count))])
+    change_epochs = change_epochs.tolist()
+    change_values = change_values.tolist()
+
+    statistics = []
+    for i in range(count):
+        stats = TimeStatistics()
+        stats.days_in_range = int(ranges[i])
+        stats.active_days = int(active_days[i])
+        stats.active_hours = hours[i].tolist()
+        stats.active_days_of_week = weekdays[i].tolist()
+        stats.active_weekly_hours = weekly_hours[i].tolist()
+        stats.active_days_all_time = all_time[offsets[i]:offsets[i + 1]].tolist()
+        stats.messages_said_all_time = said[said_offsets[i]:said_offsets[i + 1]].tolist()
+        stats.most_active_epoch = int(most_epochs[i])
+        stats.most_messages_said = int(most_values[i])
+        stats.current_epoch = int(day_epochs[last_days[i]])
+        stats.messages_said = int(day_counts[last_days[i]])
+        stats.day_changes = list(zip(change_epochs[change_offsets[i]:change_offsets[i + 1]],
+                                     change_values[change_offsets[i]:change_offsets[i + 1]]))
+        statistics.append(stats)
+    return statistics
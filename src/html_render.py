@@ -1,6 +1,7 @@
 from src import data
 import datetime
 import html as html_mod
+import json
 
 HOURS_PER_DAY = [
     "12 AM", "1 AM", "2 AM", "3 AM", "4 AM",
@@ -17,6 +18,57 @@ for day in DAYS_PER_WEEK:
     for hour in HOURS_PER_DAY:
         HOURS_PER_WEEK.append(day + " " + hour)
 
+# Script of the compact data block, expands the shared axes
+# and the sparse series of the STATS object, see compact_data
+COMPACT_DATA_SCRIPT = """
+(function () {
+    var start = Date.parse(STATS.start + "T00:00:00Z");
+    STATS.dates = [];
+    for (var i = 0; i < STATS.days; i++) {
+        STATS.dates.push(new Date(start + i * 86400000).toISOString().slice(0, 10));
+    }
+    STATS.hoursPerWeek = [];
+    STATS.daysPerWeek.forEach(function (day) {
+        STATS.hoursPerDay.forEach(function (hour) { STATS.hoursPerWeek.push(day + " " + hour); });
+    });
+})();
+
+function statsSeries(series) {
+    var values = new Array(STATS.days).fill(0);
+    for (var i = 0; i < series[0].length; i++) {
+        values[series[0][i]] = series[1][i];
+    }
+    return values;
+}
+"""
+
+# Script of the lazy mode, runs the function that draws a
+# chart when its element scrolls into view, see render_chunks
+LAZY_SCRIPT = """<script>
+var statsLazyInits = {};
+var statsObserver = "IntersectionObserver" in window ? new IntersectionObserver(function (entries) {
+    entries.forEach(function (entry) {
+        var init = statsLazyInits[entry.target.id];
+        if (entry.isIntersecting && init) {
+            statsObserver.unobserve(entry.target);
+            delete statsLazyInits[entry.target.id];
+            init();
+        }
+    });
+}, { rootMargin: "200px" }) : null;
+
+function statsLazy(id, init) {
+    var element = document.getElementById(id);
+    if (statsObserver === null || element === null) {
+        init();
+        return;
+    }
+    statsLazyInits[id] = init;
+    statsObserver.observe(element);
+}
+</script>
+"""
+
 
 def generate_date_range(start_date, days):
     """
@@ -96,7 +148,19 @@ def generate_deviation(average, value):
 def generate_stacked_bar_graph(x_axis, y_axii, names, id, height=300, height_padding=35):
     """
     Generates the <script> tag to graph a
-    stacked vertical bar graph.
+    stacked vertical bar graph. See
+    stacked_bar_graph_chunks for the parameters
+
+    :return: HTML code
+    """
+    return "".join(stacked_bar_graph_chunks(x_axis, y_axii, names, id, height, height_padding))
+
+
+def stacked_bar_graph_chunks(x_axis, y_axii, names, id, height=300, height_padding=35, raw=False):
+    """
+    Generates the <script> tag to graph a
+    stacked vertical bar graph, one chunk
+    per stack.
 
     :param x_axis: Array of x axis points
     :param y_axii: Array of array of y axis points
@@ -106,23 +170,27 @@ def generate_stacked_bar_graph(x_axis, y_axii, names, id, height=300, height_pad
     :param id: id of the graph element
     :param height: height of the graph, default 300 (px)
     :param height_padding: bottom padding of the graph, default 35 (px)
-    :return: HTML code
+    :param raw: If True, x_axis and the elements of y_axii are
+        javascript expressions, such as "STATS.dates"
+    :return: Generator of HTML code
     """
 
-    html = "<script>"
+    yield "<script>"
     var_count = 1
-    x_axis = str_list(x_axis)
+    if not raw:
+        x_axis = str_list(x_axis)
 
     for i in range(len(y_axii)):
-        html += "var trace" + str(var_count) + " = {\n"
+        html = "var trace" + str(var_count) + " = {\n"
         html += "   x: " + x_axis + ",\n"
-        html += "   y: " + str(y_axii[i]) + ",\n"
+        html += "   y: " + (y_axii[i] if raw else str(y_axii[i])) + ",\n"
         html += "   name: '" + names[i] + "',\n"
         html += "   type: 'bar'\n"
         html += "};\n"
         var_count += 1
+        yield html
 
-    html += "var data = [" \
+    html = "var data = [" \
             + ", ".join(generate_trace("trace", len(names))) \
             + "];\n"
 
@@ -134,25 +202,128 @@ def generate_stacked_bar_graph(x_axis, y_axii, names, id, height=300, height_pad
         height: """ + str(height) + """
     });\n"""
     html += "</script>"
-    return html
+    yield html
+
+
+def sparse_series(values):
+    """
+    Returns the non zero values of an array and their
+    indexes, see statsSeries in COMPACT_DATA_SCRIPT
+
+    :param values: Array of numbers
+    :return: [array of indexes, array of values]
+    """
+    indexes = [i for i, value in enumerate(values) if value]
+    return [indexes, [values[i] for i in indexes]]
+
+
+def compact_data(conversation):
+    """
+    Returns the data of the charts of a conversation, with
+    the axes shared by every chart only included once, and
+    the daily activity of each person as a sparse series
+
+    :param conversation: Conversation object
+    :return: dict
+    """
+    return {
+        "start": conversation.analysis.first_message_timestamp.strftime('%Y-%m-%d'),
+        "days": conversation.analysis.days_in_range,
+        "hoursPerDay": HOURS_PER_DAY,
+        "daysPerWeek": DAYS_PER_WEEK,
+        "persons": [{
+            "days": sparse_series(user.messages_all_time),
+            "daysOfWeek": user.analysis.active_days_of_week,
+            "hours": user.analysis.active_hours,
+            "weeklyHours": user.analysis.active_weekly_hours
+        } for user in conversation.persons.values()]
+    }
+
+
+def compact_data_block(conversation):
+    """
+    Returns the <script> tag defining the STATS object used
+    by the charts in compact mode, see compact_data
+
+    :param conversation: Conversation object
+    :return: HTML code
+    """
+    stats = json.dumps(compact_data(conversation), separators=(",", ":")).replace("</", "<\\/")
+    return "<script>\nvar STATS = " + stats + ";\n" + COMPACT_DATA_SCRIPT + "</script>\n"
 
 
 """ Renders a conversation into a neat HTML file"""
 
 
-def render(conversation):
+def render(conversation, compact=False, lazy=False):
     """
     Renders a conversation object into
     an HTML file (string)
 
     :param conversation: Conversation object
+    :param compact: See render_chunks
+    :param lazy: See render_chunks
     :return: HTML String
     """
+    return "".join(render_chunks(conversation, compact, lazy))
+
+
+def render_to(conversation, f_obj, compact=False, lazy=False):
+    """
+    Renders a conversation object into an HTML file,
+    writing it section by section instead of building
+    the whole page in memory
+
+    :param conversation: Conversation object
+    :param f_obj: File object opened in text mode
+    :param compact: See render_chunks
+    :param lazy: See render_chunks
+    """
+    for chunk in render_chunks(conversation, compact, lazy):
+        f_obj.write(chunk)
+
+
+def render_chunks(conversation, compact=False, lazy=False):
+    """
+    Renders a conversation object into HTML,
+    one section at a time
 
-    data_date_range = generate_date_range(conversation.analysis.first_message_timestamp,
-                            conversation.analysis.days_in_range)
+    :param conversation: Conversation object
+    :param compact: If True, the data of the charts is written once
+        in a single data block (see compact_data) which the charts
+        reference, instead of in every chart
+    :param lazy: If True, the activity chart of each person is only
+        drawn when it scrolls into view, and the statistics of each
+        person are in a collapsed section, so the page is usable
+        as soon as the summary charts are drawn
+    :return: Generator of HTML strings, the page
+        being their concatenation
+    """
 
-    html = """
+    # Data of the charts, either the values or in compact
+    # mode javascript expressions referencing the data block
+    if compact:
+        data_date_range = "STATS.dates"
+        days_series = ["statsSeries(STATS.persons[{}].days)".format(i) for i in range(len(conversation.persons))]
+        days_of_week = ["STATS.persons[{}].daysOfWeek".format(i) for i in range(len(conversation.persons))]
+        hours = ["STATS.persons[{}].hours".format(i) for i in range(len(conversation.persons))]
+        weekly_hours = ["STATS.persons[{}].weeklyHours".format(i) for i in range(len(conversation.persons))]
+        hours_per_day = "STATS.hoursPerDay"
+        hours_per_week = "STATS.hoursPerWeek"
+        days_per_week = "STATS.daysPerWeek"
+    else:
+        data_date_range = generate_date_range(conversation.analysis.first_message_timestamp,
+                                              conversation.analysis.days_in_range)
+        days_series = [user.messages_all_time for user in conversation.persons.values()]
+        days_of_week = [user.analysis.active_days_of_week for user in conversation.persons.values()]
+        hours = [user.analysis.active_hours for user in conversation.persons.values()]
+        weekly_hours = [user.analysis.active_weekly_hours for user in conversation.persons.values()]
+        hours_per_day = HOURS_PER_DAY
+        hours_per_week = HOURS_PER_WEEK
+        days_per_week = DAYS_PER_WEEK
+    to_js = (lambda x: x) if compact else str
+
+    yield """
     <title>Chat Statistics</title>
     <link href="https://fonts.googleapis.com/css?family=Open+Sans:400,700" rel="stylesheet">
     <link rel="stylesheet" href="stats.css">  
@@ -282,7 +453,7 @@ def render(conversation):
 
         conversation.analysis.swears,
         conversation.analysis.questions,
-        len(conversation.analysis.urls),
+        conversation.analysis.url_count,
         "<br>".join(map_list(
             lambda x: "<a href=\"" + x + "\" class=\"url\">" + x + "</a>",
             conversation.analysis.urls[0: 8])),
@@ -291,12 +462,19 @@ def render(conversation):
         conversation.name_map.get(conversation.analysis.first_message.username, conversation.analysis.first_message.username),
     )
 
+    if compact:
+        yield compact_data_block(conversation)
+    if lazy:
+        yield LAZY_SCRIPT
+
     highest_user_messages = max(map_list(lambda x: max(x.analysis.active_days_all_time), conversation.persons.values()))
 
-    html += "<table style='width: 100%'>"
+    yield "<table style='width: 100%'>"
 
-    for name, user in conversation.persons.items():
-        html += """
+    for i, (name, user) in enumerate(conversation.persons.items()):
+        lazy_start = "statsLazy(" + json.dumps(html_mod.unescape(name)) + ", function () {" if lazy else ""
+        lazy_end = "});\n    " if lazy else ""
+        yield """
     <tr>
         <td style="padding: 10px; width: 200px">
             <h3 class="large-bold light-blue-gray" 
@@ -304,10 +482,10 @@ def render(conversation):
         </td>
         <td class='user_graph_1' id='""" + name + """'></td>
     </tr>
-    <script>
+    <script>""" + lazy_start + """
     var trace = {
-        x: """ + str(data_date_range) + """,
-        y: """ + str(user.messages_all_time) + """,
+        x: """ + to_js(data_date_range) + """,
+        y: """ + to_js(days_series[i]) + """,
         type: 'bar',
         marker: {  color: '#455A64' }
     };
@@ -330,9 +508,9 @@ def render(conversation):
     };
 
     Plotly.newPlot(""" + name + """, data, layout);
-    </script>"""
+    """ + lazy_end + """</script>"""
 
-    html += "</table>"
+    yield "</table>"
 
     # ----------------------------------------------
     # Activity percentages
@@ -340,19 +518,19 @@ def render(conversation):
     # Pie chart of the number of messages per user
     # divided by total messages
     # ----------------------------------------------
-    html += "<br><br><h2>Percentage Share of Activity Per Person</h2><br>"
-    html += "<table style='width: 100%'><tr><td style='width: 300px'>"
-    html += "<table>"
+    yield "<br><br><h2>Percentage Share of Activity Per Person</h2><br>"
+    yield "<table style='width: 100%'><tr><td style='width: 300px'>"
+    yield "<table>"
 
     for name, user in conversation.persons.items():
-        html += "<tr><td class='small-td'><b>"
-        html += name + "</b></td><td class='small-td'>" \
+        yield "<tr><td class='small-td'><b>"
+        yield name + "</b></td><td class='small-td'>" \
                      + "{:0.2f}%<br>".format(user.analysis.total_messages
                      / conversation.analysis.total_messages * 100)
-        html += "</td></tr>"
-    html += "</table></td><td>"
+        yield "</td></tr>"
+    yield "</table></td><td>"
 
-    html += """
+    yield """
     <div id="user_activity_pie_chart"></div>
     <script>
         var data = [{
@@ -371,7 +549,7 @@ def render(conversation):
         });
     </script>"""
 
-    html += "</td></tr></table>"
+    yield "</td></tr></table>"
 
     # ----------------------------------------------
     # Activity over the entire period
@@ -380,20 +558,16 @@ def render(conversation):
     # messages from each user stacked on top of each other, over
     # the entire duration of analysis
     # ----------------------------------------------
-    html += """
+    yield """
     <br>
     <h2>Activity Over Entire Period</h2><br>
     <div id="stacked_activity_all"></div>\n"""
 
-    y_axii = []
-    names = []
-    for name, user in conversation.persons.items():
-        y_axii.append(user.messages_all_time)
-        names.append(name)
+    names = list(conversation.persons.keys())
 
-    html += generate_stacked_bar_graph(
+    yield from stacked_bar_graph_chunks(
         data_date_range,
-        y_axii, names, "stacked_activity_all", 350, 55)
+        days_series, names, "stacked_activity_all", 350, 55, raw=compact)
 
     # ----------------------------------------------
     # Activity per day of the week
@@ -402,20 +576,16 @@ def render(conversation):
     # messages from each user stacked on top of each other, over
     # each day of the week
     # ----------------------------------------------
-    html += """
+    yield """
     <br>
     <h2>Activity Per Day of Week &nbsp; &nbsp; (STACK, TOP) (SIDE, BOTTOM)</h2><br>
     <div id="activity_per_day_week_stacked"></div>\n"""
 
-    y_axii = []
-    for name, user in conversation.persons.items():
-        y_axii.append(user.analysis.active_days_of_week)
-
-    html += generate_stacked_bar_graph(
-        DAYS_PER_WEEK,
-        y_axii, names, "activity_per_day_week_stacked", 220)
+    yield from stacked_bar_graph_chunks(
+        days_per_week,
+        days_of_week, names, "activity_per_day_week_stacked", 220, raw=compact)
 
-    html += """
+    yield """
     <div id="activity_per_week_day_side"></div>
     <script>
         Plotly.newPlot("activity_per_week_day_side", data, {
@@ -433,7 +603,7 @@ def render(conversation):
     # A graph of the activity per hour of the entire period
     # stacked per person.
     # ----------------------------------------------
-    html += """
+    yield """
     <br>
     <h2>Most Active Hour of Day</h2><br>
     <div id="most_active_hour_day"></div>
@@ -442,15 +612,15 @@ def render(conversation):
     """
     i = 0
     for name, user in conversation.persons.items():
-        html += """
+        yield """
             var trace""" + str(i) + """ = {
-                x: """ + str(HOURS_PER_DAY) + """,
-                y: """ + str(user.analysis.active_hours) + """,
+                x: """ + to_js(hours_per_day) + """,
+                y: """ + to_js(hours[i]) + """,
                 name: '""" + name + """',
                 type: 'bar'
             }; """
         i += 1
-    html += """
+    yield """
     var data = """ + str(
         list(map(lambda x: "trace" + str(x), list(range(len(conversation.persons.items())))))).replace("'", "") + """;
     var layout = {
@@ -470,27 +640,27 @@ def render(conversation):
     # every hour in the entire week, with user counts
     # stacked on top of each other
     # ----------------------------------------------
-    html += """
+    yield """
         <br>
         <h2>Most Active Hour of the Week</h2><br>
         <div id="most_active_hour_week"></div>
         <script>\n"""
 
     i = 1
-    days_range = str(HOURS_PER_WEEK)
+    days_range = to_js(hours_per_week)
 
     for name, user in conversation.persons.items():
-        html += "var trace" + str(i) + " = {\n"
-        html += "   x: " + days_range + ",\n"
-        html += "   y: " + str(user.analysis.active_weekly_hours) + ",\n"
-        html += "   name: '" + name + "',\n"
-        html += "   type: 'bar'\n"
-        html += "};\n"
+        yield "var trace" + str(i) + " = {\n"
+        yield "   x: " + days_range + ",\n"
+        yield "   y: " + to_js(weekly_hours[i - 1]) + ",\n"
+        yield "   name: '" + name + "',\n"
+        yield "   type: 'bar'\n"
+        yield "};\n"
         i += 1
-    html += "var data = [" \
+    yield "var data = [" \
             + ", ".join(generate_trace("trace", len(conversation.persons.items()))) \
             + "];\n"
-    html += """
+    yield """
         Plotly.newPlot("most_active_hour_week", data, {
             barmode: "stack",
             margin: { l: 25, r: 25, b: 75, t: 25, pad: 4 },
@@ -506,10 +676,9 @@ def render(conversation):
     # Shows most common words and their usage count, not
     # including english stopwords
     # ----------------------------------------------
-    stopwords_removed = filter_list(lambda x: x[0].lower() not in data.STOPWORDS,
-                                    conversation.analysis.word_freq_sorted)
+    stopwords_removed = conversation.analysis.top_words(15, data.STOPWORD_SET)
 
-    html += """
+    yield """
     <br>
     <h2>Commonly used words</h2><br>
     <div id="common_words"></div>
@@ -518,8 +687,8 @@ def render(conversation):
     <script>
     var data = [{
         type: 'bar',
-        x: """ + str(reversed_list(map_list(lambda x: x[1], stopwords_removed[0:15]))) + """,
-        y: """ + str(reversed_list(map_list(lambda x: x[0], stopwords_removed[0:15]))) + """,
+        x: """ + str(reversed_list(map_list(lambda x: x[1], stopwords_removed))) + """,
+        y: """ + str(reversed_list(map_list(lambda x: x[0], stopwords_removed))) + """,
         orientation: 'h'
     }];
     
@@ -534,60 +703,63 @@ def render(conversation):
     # ----------------------------------------------
     # Per Person Statistics
     # ----------------------------------------------
-    html += "<br><br><h2>Per Person Statistics</h2>"
+    yield "<br><br><h2>Per Person Statistics</h2>"
     for name, user in conversation.persons.items():
-        html += "<br><br><h2 style='font-size: 24px' class='large-bold light-blue-gray'>" + name + "</h2><br>"
-        html += "<b>Common Words:</b> "
-
-        stopwords_removed = filter_list(
-                                 lambda x: x[0].lower() not in data.STOPWORDS and len(x[0]) >= 3,
-                                 user.analysis.word_freq_sorted)[0:30]
+        if lazy:
+            yield "<br><br><details><summary><h2 style='font-size: 24px; display: inline' " \
+                  "class='large-bold light-blue-gray'>" + name + "</h2></summary><br>"
+        else:
+            yield "<br><br><h2 style='font-size: 24px' class='large-bold light-blue-gray'>" + name + "</h2><br>"
+        yield "<b>Common Words:</b> "
+
+        stopwords_removed = user.analysis.top_words(30, data.STOPWORD_SET, min_length=3)
         for word in stopwords_removed:
-            html += word[0] + " <span style='color: gray'>(" + str(word[1]) + ")</span> "
+            yield word[0] + " <span style='color: gray'>(" + str(word[1]) + ")</span> "
 
-        html += "<br><br>"
-        html += "<table class='simple-table float-left'>"
-        html += "<tr><td>Total Messages</td><td>{:,}</td>".format(user.analysis.total_messages)
-        html += "<tr><td>Total Words</td><td>{:,}</td>".format(user.analysis.total_words)
-        html += "<tr><td>Active Days</td><td>{:,}</td>".format(user.analysis.active_days)
-        html += "</table>"
+        yield "<br><br>"
+        yield "<table class='simple-table float-left'>"
+        yield "<tr><td>Total Messages</td><td>{:,}</td>".format(user.analysis.total_messages)
+        yield "<tr><td>Total Words</td><td>{:,}</td>".format(user.analysis.total_words)
+        yield "<tr><td>Active Days</td><td>{:,}</td>".format(user.analysis.active_days)
+        yield "</table>"
 
-        html += "<table class='simple-table float-left'>"
-        html += "<tr><td>Words Per Message</td><td>{:0.2f} {}</td>"\
+        yield "<table class='simple-table float-left'>"
+        yield "<tr><td>Words Per Message</td><td>{:0.2f} {}</td>"\
             .format(user.analysis.total_words / user.analysis.total_messages,
                     generate_deviation(
                         conversation.analysis.total_words / conversation.analysis.total_messages,
                         user.analysis.total_words / user.analysis.total_messages
                     ))
-        html += "<tr><td>Chars Per Message</td><td>{:0.2f} {}</td>"\
+        yield "<tr><td>Chars Per Message</td><td>{:0.2f} {}</td>"\
             .format(user.analysis.total_characters / user.analysis.total_messages,
                     generate_deviation(
                         conversation.analysis.total_characters / conversation.analysis.total_messages,
                         user.analysis.total_characters / user.analysis.total_messages
                     ))
-        html += "<tr><td>Letters per word</td><td>{:0.2f} {}</td>"\
+        yield "<tr><td>Letters per word</td><td>{:0.2f} {}</td>"\
             .format(user.analysis.total_characters_without_spaces / user.analysis.total_words,
                     generate_deviation(
                         conversation.analysis.total_characters_without_spaces / conversation.analysis.total_words,
                         user.analysis.total_characters_without_spaces / user.analysis.total_words
                     ))
-        html += "</table>"
+        yield "</table>"
 
-        html += "<table class='simple-table float-left'>"
-        html += "<tr><td>Swears</td><td>{:,}</td>".format(user.analysis.swears)
-        html += "<tr><td>Questions</td><td>{:,}</td>".format(user.analysis.questions)
-        html += "<tr><td>URLs</td><td>{:,}</td>".format(len(user.analysis.urls))
-        html += "</table>"
+        yield "<table class='simple-table float-left'>"
+        yield "<tr><td>Swears</td><td>{:,}</td>".format(user.analysis.swears)
+        yield "<tr><td>Questions</td><td>{:,}</td>".format(user.analysis.questions)
+        yield "<tr><td>URLs</td><td>{:,}</td>".format(user.analysis.url_count)
+        yield "</table>"
 
-        html += "<br><br><br><br>"
-        html += "<blockquote>{}<span>First Message Sent</span></blockquote>".format(html_mod.escape(user.analysis.first_message.content))
-        html += "<blockquote>{}<span>Random Quote</span></blockquote>".format(html_mod.escape(user.random_quote))
+        yield "<br><br><br><br>"
+        yield "<blockquote>{}<span>First Message Sent</span></blockquote>".format(html_mod.escape(user.analysis.first_message.content))
+        yield "<blockquote>{}<span>Random Quote</span></blockquote>".format(html_mod.escape(user.random_quote))
 
-        html += "<br><b>Common Responses:</b><br>"
+        yield "<br><b>Common Responses:</b><br>"
 
         common_responses = list(set(user.common_responses))[0: 15]
-        html += "<div>{}</div>".format(
+        yield "<div>{}</div>".format(
             " ".join(map_list(lambda x: "<div class='badge'>" + html_mod.escape(x) + "</div>", common_responses)))
 
-        html += "<br><br>"
-    return html
+        yield "<br><br>"
+        if lazy:
+            yield "</details>"
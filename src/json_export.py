@@ -0,0 +1,207 @@
+"""
+Streaming JSON export of a conversation. The JSON
+is written to a file piece by piece, instead of
+being built as one string with json.dumps
+"""
+
+import json
+
+FORMATS = ["pretty", "compact", "ndjson"]
+MESSAGES = ["all", "once", "none"]
+
+
+class Stream(object):
+    """
+    Stream
+
+    Marks an iterable to be written as a JSON array one
+    item at a time, without building the array in memory
+    """
+
+    def __init__(self, items):
+        """
+        Create a Stream
+
+        :param items: Iterable of JSON serializable values
+        """
+        self.items = items
+
+
+class Object(object):
+    """
+    Object
+
+    Marks an iterable of (key, value) pairs to be written as a
+    JSON object one pair at a time, in the order of the pairs
+    (which must be sorted by key for the output to be the same
+    as json.dumps with sort_keys=True), so the values are only
+    computed as they are written
+    """
+
+    def __init__(self, pairs):
+        """
+        Create an Object
+
+        :param pairs: Iterable of (string, JSON serializable value) tuples
+        """
+        self.pairs = pairs
+
+
+def iter_json(value, indent=None, separators=(",", ":"), level=0):
+    """
+    Encodes a value to JSON, one piece at a time. Dicts are written
+    with sorted keys, and the result is the same as json.dumps with
+    sort_keys=True, where Stream objects are written as arrays and
+    Object objects as objects
+
+    :param value: Value to encode, dicts, Streams and Objects may be nested
+    :param indent: See json.dumps
+    :param separators: See json.dumps
+    :param level: Nesting level of the value
+    :return: Generator of strings
+    """
+    item_separator, key_separator = separators
+    if indent is None:
+        newline = ""
+        inner = ""
+    else:
+        newline = "\n" + " " * (indent * level)
+        inner = newline + " " * indent
+        item_separator = item_separator.rstrip(" ")
+
+    if isinstance(value, dict):
+        if not value:
+            yield "{}"
+            return
+        yield "{"
+        for i, key in enumerate(sorted(value)):
+            yield (item_separator if i > 0 else "") + inner + json.dumps(key) + key_separator
+            yield from iter_json(value[key], indent, separators, level + 1)
+        yield newline + "}"
+    elif isinstance(value, Stream):
+        empty = True
+        for item in value.items:
+            yield ("[" if empty else item_separator) + inner
+            yield from iter_json(item, indent, separators, level + 1)
+            empty = False
+        yield "[]" if empty else newline + "]"
+    elif isinstance(value, Object):
+        empty = True
+        for key, item in value.pairs:
+            yield ("{" if empty else item_separator) + inner + json.dumps(key) + key_separator
+            yield from iter_json(item, indent, separators, level + 1)
+            empty = False
+        yield "{}" if empty else newline + "}"
+    else:
+        encoded = json.dumps(value, sort_keys=True, indent=indent, separators=separators)
+        yield encoded if indent is None else encoded.replace("\n", newline)
+
+
+def message_value(conversation, message, messages):
+    """
+    Returns the JSON value of a message
+
+    :param conversation: Conversation object
+    :param message: Message object
+    :param messages: "all" for the message as a string,
+        "once" for a [timestamp, user, content] array, where
+        user is the key of the person in the "users" object
+    :return: JSON serializable value
+    """
+    if messages == "once":
+        user = conversation.persons_by_username[message.username].name
+        return [str(message.timestamp), user, message.content]
+    return str(message)
+
+
+def user_value(user, messages):
+    """
+    Returns the JSON value of a person
+
+    :param user: Person object
+    :param messages: See write_json
+    :return: dict of Streams and values
+    """
+    value = user.to_dict(messages=False)
+    if messages == "all" and user.keep_messages:
+        value["messages"] = Stream(str(message) for message in user.messages)
+    return value
+
+
+def conversation_value(conversation, messages="all"):
+    """
+    Returns the structure of the JSON export, see write_json
+
+    :param conversation: Conversation object
+    :param messages: See write_json
+    :return: dict of Streams and values
+    """
+    value = {
+        "analysis": conversation.analysis.to_dict(),
+        "users": Object((name, user_value(conversation.persons[name], messages))
+                        for name in sorted(conversation.persons))
+    }
+    if messages != "none":
+        value["messages"] = Stream(message_value(conversation, message, messages)
+                                   for message in conversation.messages)
+    return value
+
+
+def write_json(conversation, f_obj, format="pretty", messages="all"):
+    """
+    Writes the JSON export of a conversation to a file, piece by
+    piece. The export is an object with the keys "analysis" (see
+    BasicAnalyser.to_dict), "users" (see Person.to_dict) and "messages"
+
+    :param conversation: Conversation object
+    :param f_obj: File object opened in text mode
+    :param format: "pretty" (indented, the same as generate_json),
+        "compact" (no whitespace), or "ndjson" (one compact JSON object
+        per line: {"type": "analysis", "analysis": ...}, then one
+        {"type": "user", "name": ..., "user": ...} per person and one
+        {"type": "message", "message": ...} per message)
+    :param messages: "all" to write the messages as strings, both in
+        "messages" and in the "messages" of each user (unless the persons
+        do not keep their messages, see Person), "once" to only
+        write them in "messages", as [timestamp, user, content] arrays,
+        or "none" to leave the messages out
+    """
+    if format not in FORMATS:
+        raise ValueError("Unknown format {}, expected one of {}".format(format, FORMATS))
+    if messages not in MESSAGES:
+        raise ValueError("Unknown messages option {}, expected one of {}".format(messages, MESSAGES))
+
+    if format == "ndjson":
+        write_ndjson(conversation, f_obj, messages)
+        return
+
+    value = conversation_value(conversation, messages)
+    if format == "pretty":
+        chunks = iter_json(value, 4, (",", ": "))
+    else:
+        chunks = iter_json(value)
+    for chunk in chunks:
+        f_obj.write(chunk)
+
+
+def write_ndjson(conversation, f_obj, messages="all"):
+    """
+    Writes the ndjson variant of the export, see write_json
+
+    :param conversation: Conversation object
+    :param f_obj: File object opened in text mode
+    :param messages: See write_json
+    """
+    def write_line(value):
+        for chunk in iter_json(value):
+            f_obj.write(chunk)
+        f_obj.write("\n")
+
+    write_line({"type": "analysis", "analysis": conversation.analysis.to_dict()})
+
+    for name, user in conversation.persons.items():
+        write_line({"type": "user", "name": name, "user": user_value(user, messages)})
+
+    if messages != "none":
+        for message in conversation.messages:
+            write_line({"type": "message", "message": message_value(conversation, message, messages)})
@@ -0,0 +1,136 @@
+"""
+PhraseMatcher class, used to find swears,
+responses and other dictionaries of phrases
+in messages
+"""
+
+from src import data
+
+
+class PhraseMatcher(object):
+    """
+    PhraseMatcher
+
+    Matches a dictionary of phrases against text. A phrase
+    matches if it appears delimited by spaces (or the start
+    and end of the text), ie the same as checking
+    " " + phrase + " " in " " + text + " "
+
+    Because a phrase can only match a run of whole space
+    separated words, phrases are indexed by their words
+    and every run of words in the text is looked up in a
+    set. The cost of a match depends on the number of words
+    in the text, not on the number of phrases.
+    """
+
+    def __init__(self, phrases, lowercase=False):
+        """
+        Compile a PhraseMatcher
+
+        :param phrases: Iterable of phrases, a phrase being one
+            or more words separated by a single space
+        :param lowercase: If True, the text is lowercased before
+            matching it. The phrases are used as is
+        """
+        self.lowercase = lowercase
+
+        # Single word phrases
+        self.words = set()
+
+        # Multiple word phrases, and the lengths (in words)
+        # of the phrases starting with each first word
+        self.phrases = set()
+        self.lengths = {}
+
+        # Phrases that are not made of whole words, such as
+        # phrases with leading spaces, are checked the slow way
+        self.irregular = []
+
+        for phrase in phrases:
+            words = phrase.split(" ")
+            if "" in words:
+                self.irregular.append(phrase)
+            elif len(words) == 1:
+                self.words.add(phrase)
+            else:
+                self.phrases.add(phrase)
+                lengths = self.lengths.setdefault(words[0], [])
+                if len(words) not in lengths:
+                    lengths.append(len(words))
+
+    def search(self, words):
+        """
+        Returns True if any phrase matches
+
+        :param words: Words of the text, ie text.split(" "),
+            already lowercased if the matcher is
+        :return: bool
+        """
+        if not self.words.isdisjoint(words):
+            return True
+
+        if self.lengths:
+            for i, word in enumerate(words):
+                for length in self.lengths.get(word, ()):
+                    if " ".join(words[i:i + length]) in self.phrases:
+                        return True
+
+        if self.irregular:
+            text = " " + " ".join(words) + " "
+            return any(" " + phrase + " " in text for phrase in self.irregular)
+        return False
+
+    def matches(self, text):
+        """
+        Returns True if any phrase matches the text
+
+        :param text: String
+        :return: bool
+        """
+        if self.lowercase:
+            text = text.lower()
+        return self.search(text.split(" "))
+
+    def findall(self, text):
+        """
+        Returns the phrases matching the text, with one entry
+        per occurrence of a phrase made of whole words
+
+        :param text: String
+        :return: String array of phrases
+        """
+        if self.lowercase:
+            text = text.lower()
+        words = text.split(" ")
+
+        found = []
+        for i, word in enumerate(words):
+            if word in self.words:
+                found.append(word)
+            for length in sorted(self.lengths.get(word, ())):
+                phrase = " ".join(words[i:i + length])
+                if phrase in self.phrases:
+                    found.append(phrase)
+
+        padded = " " + text + " "
+        found += [phrase for phrase in self.irregular if " " + phrase + " " in padded]
+        return found
+
+
+# Default matchers, built from the lists in data
+SWEARS = PhraseMatcher(data.SWEARS)
+RESPONSES = PhraseMatcher(data.RESPONSES, lowercase=True)
+
+
+def compile_phrases(phrases, lowercase=False):
+    """
+    Returns a PhraseMatcher for phrases, which may be
+    an array of phrases or an already compiled matcher
+
+    :param phrases: PhraseMatcher or iterable of phrases
+    :param lowercase: See PhraseMatcher
+    :return: PhraseMatcher
+    """
+    if isinstance(phrases, PhraseMatcher):
+        return phrases
+    return PhraseMatcher(phrases, lowercase)
@@ -0,0 +1,321 @@
+"""
+Built-in log format parsers. A parser can be given to Conversation
+in place of an extract function: it parses the content of a file (the
+whole file, or each chunk of it if chunk_size or range_size is set, see
+Parser.parse_chunks) with a single call to re.findall, and adds the
+messages to a MessageStore column by column, instead of calling
+extract once per line.
+
+    conversation.Conversation("logs/*.log", parsers.IRC)
+"""
+
+import abc
+import datetime
+import os
+import re
+
+from src import timestamps
+
+
+class Parser(abc.ABC):
+    """
+    Parser
+
+    Base class of the bulk parsers. Subclasses implement parse
+    """
+
+    # True if a message can span several lines, in which case
+    # start must match the beginning of a message
+    multiline = False
+    start = None
+
+    @abc.abstractmethod
+    def parse(self, text, messages, path=None):
+        """
+        Parse the content of a log file, and add the
+        messages to a MessageStore
+
+        :param text: Text content (or complete messages of it)
+        :param messages: store.MessageStore to add the messages to
+        :param path: Optional path of the file, for formats that
+            store part of the timestamp in the file name
+        """
+
+    def parse_chunks(self, chunks, messages, path=None):
+        """
+        Parse the content of a log file given in chunks. Each
+        chunk is parsed up to the beginning of its last message,
+        the rest being parsed with the next chunk
+
+        :param chunks: Iterable of strings
+        :param messages: store.MessageStore to add the messages to
+        :param path: See parse
+        """
+        pending = ""
+        for chunk in chunks:
+            text = pending + chunk
+            end = self.split_point(text)
+            if end > 0:
+                self.parse(text[:end], messages, path)
+            pending = text[end:]
+        self.parse(pending, messages, path)
+
+    def split_point(self, text):
+        """
+        Returns the index of the beginning of the last message
+        of a text, which may be incomplete
+
+        :param text: String
+        :return: int, 0 if the text may be a single incomplete message
+        """
+        end = text.rfind("\n")
+        if not self.multiline:
+            return end + 1
+        while end >= 0 and not self.start.match(text, end + 1):
+            end = text.rfind("\n", 0, end)
+        return end + 1
+
+    @property
+    def cache_identity(self):
+        """Identity of the parser, see cache.function_identity"""
+        return "{}.{}:{}".format(type(self).__module__, type(self).__qualname__, sorted(vars(self).items()))
+
+
+class RegexParser(Parser):
+    """
+    RegexParser
+
+    Parses messages with a regular expression with the named groups
+    user, content and timestamp, matched in multiline mode (^ and $
+    match at line breaks). Text that does not match, such as log
+    headers or join messages, is ignored. For example, the format of
+    example/sample_conversation.txt:
+
+        RegexParser(r"^(?P<timestamp>\\S+) <(?P<user>[^>\\n]*)> (?P<content>[^\\n]*)")
+    """
+
+    def __init__(self, pattern, timestamp_format=None, flags=0, start=None):
+        """
+        Create a RegexParser
+
+        :param pattern: Regular expression string
+        :param timestamp_format: Optional strptime format of the timestamp
+            group. Defaults to yyyy-mm-ddThh:mm:ss, see timestamps.parse
+        :param flags: Extra re flags
+        :param start: Optional regular expression matching the beginning
+            of a message, for formats where the content of a message can
+            span several lines. Used to split chunks, see Parser.parse_chunks
+        """
+        self.source = pattern
+        self.timestamp_format = timestamp_format
+        self.flags = flags
+        self.pattern = re.compile("(?P<raw>{})".format(pattern), re.MULTILINE | flags)
+        self.multiline = start is not None
+        self.start = None if start is None else re.compile(start, flags)
+
+        # Index of each group in the tuples returned by findall
+        self.groups = {name: index - 1 for name, index in self.pattern.groupindex.items()}
+
+    @property
+    def cache_identity(self):
+        return "{}.{}:{}:{}:{}:{}".format(type(self).__module__, type(self).__qualname__, self.source,
+                                          self.timestamp_format, self.flags, self.start and self.start.pattern)
+
+    def epochs(self, rows, path):
+        """
+        Returns the timestamps of the matches
+
+        :param rows: Tuples of the groups of each match, see groups
+        :param path: See Parser.parse
+        :return: Array of epochs
+        """
+        index = self.groups["timestamp"]
+        if self.timestamp_format is None:
+            parse = timestamps.parse
+            return [parse(row[index]) for row in rows]
+
+        strptime = datetime.datetime.strptime
+        to_epoch = timestamps.to_epoch
+        timestamp_format = self.timestamp_format
+        return [to_epoch(strptime(row[index], timestamp_format)) for row in rows]
+
+    def parse(self, text, messages, path=None):
+        rows = self.pattern.findall(text)
+        if not rows:
+            return
+        user = self.groups["user"]
+        content = self.groups["content"]
+        raw = self.groups["raw"]
+        messages.append_all([row[user] for row in rows], [row[content] for row in rows],
+                            self.epochs(rows, path), [row[raw] for row in rows] if messages.keep_raw else None)
+
+
+class IrcParser(RegexParser):
+    """
+    IrcParser
+
+    Parses IRC logs in the format written by ZNC (and most clients):
+
+        [12:34:56] <nick> message
+
+    The date of the messages is taken from the file name, which
+    must contain it as yyyy-mm-dd or yyyymmdd (ZNC writes one file
+    per day, such as 2019-01-31.log), unless the timestamps include
+    it, as in [2019-01-31 12:34:56]. Mode prefixes (@, +...) are
+    removed from the nicks. Joins, parts and other events are
+    ignored, and so are actions (* nick does something) unless
+    actions is set.
+    """
+
+    MESSAGE = r"^\[(?:(?P<date>\d{4}-\d\d-\d\d)[ T])?(?P<timestamp>\d\d:\d\d(?::\d\d)?)\] " \
+              r"<[~&@%+]?(?P<user>[^>\s]+)> (?P<content>[^\n]*?)\r?$"
+    ACTION = r"^\[(?:(?P<date>\d{4}-\d\d-\d\d)[ T])?(?P<timestamp>\d\d:\d\d(?::\d\d)?)\] " \
+             r"(?:<[~&@%+]?(?P<user>[^>\s]+)> |\* [~&@%+]?(?P<action_user>[^\s]+) )(?P<content>[^\n]*?)\r?$"
+    FILE_DATE = re.compile(r"(\d{4})-?(\d\d)-?(\d\d)")
+
+    def __init__(self, actions=False):
+        """
+        Create an IrcParser
+
+        :param actions: If True, actions are parsed as messages of their
+            nick, with a content starting with "* "
+        """
+        super(IrcParser, self).__init__(self.ACTION if actions else self.MESSAGE)
+        self.actions = actions
+
+    def file_epoch(self, path):
+        """
+        Returns the epoch of midnight of the date in a file name
+
+        :param path: Path of the file
+        :return: int
+        :raises ValueError: If the file name has no date
+        """
+        match = self.FILE_DATE.search(os.path.basename(path or ""))
+        if match is None:
+            raise ValueError("No date in the timestamps or in the file name {}".format(path))
+        return timestamps.date_epoch("{}-{}-{}".format(*match.groups()))
+
+    def epochs(self, rows, path):
+        date = self.groups["date"]
+        index = self.groups["timestamp"]
+        file_epoch = None
+        epochs = []
+        for row in rows:
+            if row[date]:
+                day = timestamps.date_epoch(row[date])
+            else:
+                if file_epoch is None:
+                    file_epoch = self.file_epoch(path)
+                day = file_epoch
+            time = row[index]
+            seconds = int(time[6:8]) if len(time) > 5 else 0
+            epochs.append(day + int(time[0:2]) * timestamps.SECONDS_PER_HOUR + int(time[3:5]) * 60 + seconds)
+        return epochs
+
+    def parse(self, text, messages, path=None):
+        if not self.actions:
+            super(IrcParser, self).parse(text, messages, path)
+            return
+
+        rows = self.pattern.findall(text)
+        if not rows:
+            return
+        user = self.groups["user"]
+        action_user = self.groups["action_user"]
+        content = self.groups["content"]
+        raw = self.groups["raw"]
+        messages.append_all([row[user] or row[action_user] for row in rows],
+                            [row[content] if row[user] else "* " + row[content] for row in rows],
+                            self.epochs(rows, path), [row[raw] for row in rows] if messages.keep_raw else None)
+
+
+class WhatsAppParser(RegexParser):
+    """
+    WhatsAppParser
+
+    Parses chats exported from WhatsApp ("Export chat", without media),
+    in the Android format:
+
+        12/31/19, 9:41 PM - Alice: message
+
+    or the iOS format:
+
+        [31/12/2019, 21:41:05] Alice: message
+
+    Messages can span several lines. Notices without an author (such
+    as "Messages are end-to-end encrypted") are ignored.
+    """
+
+    # Beginning of a message, a (left-to-right mark and) date
+    START = r"\u200e?\[?\d{1,2}/\d{1,2}/\d{2,4}, "
+    MESSAGE = r"^\u200e?\[?(?P<date>\d{1,2}/\d{1,2}/\d{2,4}), " \
+              r"(?P<timestamp>\d{1,2}:\d\d(?::\d\d)?)(?:[ \u202f]?(?P<ampm>[AaPp]\.?[Mm]\.?))?" \
+              r"(?:\] | - )(?P<user>[^:\n]+): (?P<content>[^\n]*(?:\n+(?!" + START + r")[^\n]+)*)"
+
+    def __init__(self, dayfirst=False):
+        """
+        Create a WhatsAppParser
+
+        :param dayfirst: If True, dates are read as day/month/year
+            (most of the world), otherwise as month/day/year (US)
+        """
+        super(WhatsAppParser, self).__init__(self.MESSAGE, start=self.START)
+        self.dayfirst = dayfirst
+
+    @property
+    def cache_identity(self):
+        return "{}:{}".format(super(WhatsAppParser, self).cache_identity, self.dayfirst)
+
+    def epochs(self, rows, path):
+        date = self.groups["date"]
+        index = self.groups["timestamp"]
+        ampm = self.groups["ampm"]
+        days = {}
+        epochs = []
+        for row in rows:
+            day = days.get(row[date])
+            if day is None:
+                first, second, year = row[date].split("/")
+                month, day_of_month = (second, first) if self.dayfirst else (first, second)
+                year = int(year) + 2000 if len(year) == 2 else int(year)
+                day = days[row[date]] = timestamps.date_epoch(
+                    "{:04d}-{:02d}-{:02d}".format(year, int(month), int(day_of_month)))
+
+            time = row[index].split(":")
+            hours = int(time[0])
+            if row[ampm]:
+                hours = hours % 12 + (12 if row[ampm][0] in "Pp" else 0)
+            seconds = int(time[2]) if len(time) > 2 else 0
+            epochs.append(day + hours * timestamps.SECONDS_PER_HOUR + int(time[1]) * 60 + seconds)
+        return epochs
+
+
+# Format of example/sample_conversation.txt:
+# 2018-03-26T12:00:00 <Alice> Hello
+# Like the extract function of example/example.py, the content
+# stops at the next "> ", the rest of the line is only in raw
+EXAMPLE = RegexParser(r"^(?P<timestamp>\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d+)?) <(?P<user>[^>\n]*)> "
+                      r"(?P<content>[^>\n]*(?:>(?! )[^>\n]*)*)[^\n]*")
+IRC = IrcParser()
+WHATSAPP = WhatsAppParser()
+
+# Parsers that can be given by name, for example in the manifests of cli
+PARSERS = {
+    "example": EXAMPLE,
+    "irc": IRC,
+    "znc": IRC,
+    "whatsapp": WHATSAPP,
+    "whatsapp-dayfirst": WhatsAppParser(dayfirst=True)
+}
+
+
+def is_parser(extract):
+    """
+    Returns True if an extract argument is a bulk parser
+
+    :param extract: extract argument of Conversation
+    :return: bool
+    """
+    return isinstance(extract, Parser)
+
@@ -4,8 +4,17 @@ for more information.
 """
 
 from src import analyser
-from src import data
-import random
+from src import sampling
+from src import timestamps
+from src import tokenizer
+from src import wordstats
+
+# Number of distinct responses tracked per person
+# when the messages are not kept
+RESPONSE_CAPACITY = 64
+
+# Minimum number of words of a random quote
+QUOTE_MIN_WORDS = 6
 
 
 class Person(object):
@@ -15,27 +24,135 @@ class Person(object):
     A person class, which represents a user
     in the chat. Contains a list of their
     messages, and extra statistics.
+
+    The random quote and the responses are sampled as messages
+    are added, so a person can also be built without keeping
+    its messages (see keep_messages)
     """
 
-    def __init__(self, name, messages):
+    def __init__(self, name, messages, time_statistics=True, word_capacity=None, url_sample_size=None,
+                 keep_messages=True):
         """
         Create a person object.
 
         :param name: Name of the person
         :param messages: Array of Message objects the person said
             Must be sorted from earliest to latest
+        :param time_statistics: If False, time statistics are not updated
+            by add(), and must be set with set_time_statistics
+        :param word_capacity: See BasicAnalyser
+        :param url_sample_size: See BasicAnalyser
+        :param keep_messages: If False, messages given to add() are not
+            appended to self.messages, and common_responses only holds
+            the RESPONSE_CAPACITY most common distinct responses
         """
 
         self.name = name
+        self.time_statistics = time_statistics
+        self.word_capacity = word_capacity
+        self.url_sample_size = url_sample_size
+        self.keep_messages = keep_messages
         self.messages = messages
         self.messages_all_time = []
+        self.random_quote = None
+        self.reset_statistics()
 
         if len(messages) > 0:
-            self.analysis = analyser.BasicAnalyser(messages)
-            self.random_quote = random.choice(messages).content
+            self.recompute()
+
+    def reset_statistics(self):
+        """
+        Clears every statistic computed from the messages,
+        without touching self.messages
+        """
+        self.analysis = analyser.BasicAnalyser(time_statistics=self.time_statistics,
+                                               word_capacity=self.word_capacity,
+                                               url_sample_size=self.url_sample_size)
+        self.common_responses = []
+        self.response_counts = wordstats.SpaceSaving(RESPONSE_CAPACITY)
+
+        # A random long message, or a random message if
+        # none is long enough, see finish
+        self.quotes = sampling.Reservoir(1)
+        self.fallback_quotes = sampling.Reservoir(1)
+
+        # (epoch, messages said the previous active day) for
+        # every day change, used by compute_messages_all_time
+        self.day_changes = []
+        self._messages_said = 0
+        self._current_day = None
+
+    def add(self, message, tokens=None):
+        """
+        Add a message said by the person, updating the
+        statistics. Messages must be added from earliest to
+        latest, and finish() called after the last one
+
+        :param message: Message object
+        :param tokens: Optional tokenizer.Tokens of the message, if
+            they were already computed for another analyser
+        """
+        if self.keep_messages:
+            self.messages.append(message)
+        self.update(message, tokens)
+
+    def update(self, message, tokens=None):
+        """
+        Update the statistics with a message that is already
+        in self.messages
+
+        :param message: Message object
+        :param tokens: Optional tokenizer.Tokens of the message
+        """
+        if tokens is None:
+            tokens = tokenizer.tokenize(message.content)
+        self.analysis.add(message, tokens)
+
+        if self.analysis.time_statistics:
+            day = message.epoch // timestamps.SECONDS_PER_DAY
+            if self._current_day is None:
+                self._current_day = day
+            elif day != self._current_day:
+                self.day_changes.append((message.epoch, self._messages_said))
+                self._current_day = day
+                self._messages_said = 0
+            self._messages_said += 1
+
+        self.update_common_responses(message, tokens)
+
+        if len(tokens.words) >= QUOTE_MIN_WORDS:
+            self.quotes.add(message.content)
+        elif len(self.quotes.items) == 0:
+            self.fallback_quotes.add(message.content)
+
+    def set_time_statistics(self, statistics):
+        """
+        Set the time statistics computed in bulk for the messages
+        added so far, see BasicAnalyser.set_time_statistics
+
+        :param statistics: histograms.TimeStatistics
+        """
+        self.analysis.set_time_statistics(statistics)
+        self.day_changes = list(statistics.day_changes)
+        self._current_day = statistics.current_epoch // timestamps.SECONDS_PER_DAY
+        self._messages_said = statistics.messages_said
+
+    def finish(self):
+        """
+        Compute the statistics that are only needed once
+        all messages were added. Assumes at least one
+        message was added
+        """
+        self.analysis.finish()
+
+        # A meaningful quote (> 5 words in length) picked uniformly
+        # among the messages of the person, or any message if the
+        # user has never said a meaningful quote
+        quotes = self.quotes.items or self.fallback_quotes.items
+        self.random_quote = quotes[0] if quotes else None
 
-            self.common_responses = []
-            self.get_common_responses()
+        if not self.keep_messages:
+            self.common_responses = list(self.response_counts.counts)
 
     def recompute(self):
         """
@@ -43,19 +160,10 @@ class Person(object):
         were updated after construction. Assumes self.messages
         has a length > 0
         """
-
-        self.analysis = analyser.BasicAnalyser(self.messages)
-
-        # Attempt to select a meaningful quote (> 5 words in
-        # length). Because the user might have never said
-        # a meaningful quote, we will only try 15 times
-        for i in range(15):
-            self.random_quote = random.choice(self.messages).content
-            if len(self.random_quote.split(" ")) > 5:
-                break
-
-        self.common_responses = []
-        self.get_common_responses()
+        self.reset_statistics()
+        for message in self.messages:
+            self.update(message)
+        self.finish()
 
     def compute_messages_all_time(self, days_in_range, start_date):
         """
@@ -68,30 +176,86 @@ class Person(object):
 
         self.messages_all_time = [0] * days_in_range
 
-        # Calculate all time messages/day statistics
-        messages_said = 0
-        current_timestamp = self.analysis.first_message_timestamp
-
-        for message in self.messages:
-            if current_timestamp is None or message.timestamp.date() != current_timestamp.date():
-                self.messages_all_time[(message.timestamp - start_date).days] = messages_said
-                current_timestamp = message.timestamp
-                messages_said = 0
-
-            messages_said += 1
+        # Calculate all time messages/day statistics, per calendar day
+        start = timestamps.to_epoch(start_date) // timestamps.SECONDS_PER_DAY
+        for epoch, messages_said in self.day_changes:
+            self.messages_all_time[epoch // timestamps.SECONDS_PER_DAY - start] = messages_said
 
     def get_common_responses(self):
         """
         A response is a short message (<5 words) that contains
         phrases like "lol", "thanks", "good job", etc...
 
-        This returns a list of responses the user has said
+        This adds every response the user has said to
+        self.common_responses
         """
         for message in self.messages:
-            if any(" " + d + " " in " " + message.content.lower() + " " for d in data.RESPONSES) \
-                    and len(message.content.split(" ")) < 5:
+            self.update_common_responses(message, tokenizer.tokenize(message.content))
+
+    def update_common_responses(self, message, tokens):
+        """
+        If the message is a response (see get_common_responses),
+        it is added to self.common_responses
+
+        :param message: Message object
+        :param tokens: tokenizer.Tokens of the message
+        """
+        if tokens.response:
+            self.response_counts.add(message.content)
+            if self.keep_messages:
                 self.common_responses.append(message.content)
 
+    def to_state(self):
+        """
+        Returns the state of the person as a JSON serializable
+        dict, see BasicAnalyser.to_state. The messages are not
+        included, they are stored with the conversation
+
+        :return: dict
+        """
+        return {
+            "name": self.name,
+            "analysis": self.analysis.to_state(),
+            "common_responses": self.common_responses,
+            "day_changes": self.day_changes,
+            "messages_said": self._messages_said,
+            "current_day": self._current_day,
+            "random_quote": self.random_quote,
+            "keep_messages": self.keep_messages,
+            "response_counts": [[response, count, self.response_counts.errors[response]]
+                                for response, count in self.response_counts.counts.items()],
+            "quotes": self.quotes.to_state(),
+            "fallback_quotes": self.fallback_quotes.to_state()
+        }
+
+    @classmethod
+    def from_state(cls, state, messages):
+        """
+        Rebuild a person from the dict returned by to_state
+
+        :param state: dict
+        :param messages: Array of Message objects the person
+            said, the same as when the state was saved
+        :return: Person
+        """
+        user = cls(state["name"], [], keep_messages=state.get("keep_messages", True))
+        user.messages = messages
+        user.analysis = analyser.BasicAnalyser.from_state(state["analysis"])
+        user.word_capacity = user.analysis.word_capacity
+        user.url_sample_size = user.analysis.url_sample_size
+        user.common_responses = state["common_responses"]
+        user.day_changes = [tuple(change) for change in state["day_changes"]]
+        user._messages_said = state["messages_said"]
+        user._current_day = state["current_day"]
+        user.random_quote = state["random_quote"]
+        if "quotes" in state:
+            user.quotes = sampling.Reservoir.from_state(state["quotes"])
+            user.fallback_quotes = sampling.Reservoir.from_state(state["fallback_quotes"])
+            user.response_counts = wordstats.SpaceSaving.from_counts(
+                {response: count for response, count, error in state["response_counts"]}, RESPONSE_CAPACITY,
+                {response: error for response, count, error in state["response_counts"]})
+        return user
+
     def __str__(self):
         """
         Convert person to a string
@@ -99,15 +263,19 @@ class Person(object):
         """
         return self.name
 
-    def to_dict(self):
+    def to_dict(self, messages=True):
         """
         Returns a dictionary representation of the object
+        :param messages: If False, the messages are left out. They
+            are always left out if the person does not keep them
         :return: dict representation
         """
-        return {
+        value = {
             "analysis": self.analysis.to_dict(),
-            "messages": list(map(lambda x: str(x), self.messages)),
             "messages_all_time": self.messages_all_time,
             "common_responses": self.common_responses,
             "random_quote": self.random_quote
         }
+        if messages and self.keep_messages:
+            value["messages"] = list(map(lambda x: str(x), self.messages))
+        return value
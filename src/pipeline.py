@@ -0,0 +1,124 @@
+"""
+A pipeline of stages running in background threads, connected
+by bounded queues, so reading files, parsing and analysing can
+overlap. See run for more information.
+"""
+
+import queue
+import threading
+
+# Default number of items waiting between two stages
+DEFAULT_QUEUE_SIZE = 8
+
+# Default number of raw messages parsed into one batch
+DEFAULT_BATCH_SIZE = 10000
+
+# How often (in seconds) a blocked stage checks if the
+# pipeline was stopped
+POLL_INTERVAL = 0.1
+
+# Marks the end of the items of a queue
+END = object()
+
+
+class Stopped(Exception):
+    """Raised in a stage when the pipeline was stopped"""
+
+
+def put(items, item, stopped):
+    """
+    Put an item in a queue, waiting while it is full
+
+    :param items: queue.Queue
+    :param item: Item to put
+    :param stopped: threading.Event set when the pipeline is stopped
+    :raises Stopped: If the pipeline is stopped while waiting
+    """
+    while True:
+        if stopped.is_set():
+            raise Stopped()
+        try:
+            items.put(item, timeout=POLL_INTERVAL)
+            return
+        except queue.Full:
+            pass
+
+
+def iterate(items, stopped):
+    """
+    Yields the items of a queue until END
+
+    :param items: queue.Queue
+    :param stopped: threading.Event set when the pipeline is stopped
+    :return: Generator of items
+    :raises Stopped: If the pipeline is stopped while waiting
+    """
+    while True:
+        try:
+            item = items.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if stopped.is_set():
+                raise Stopped()
+            continue
+        if item is END:
+            return
+        yield item
+
+
+def run(source, stages=(), queue_size=DEFAULT_QUEUE_SIZE):
+    """
+    Runs a pipeline: the source and each stage run in their own
+    thread, connected by queues of at most queue_size items, and
+    the items of the last stage are yielded in the calling thread.
+    A stage that is faster than the next one blocks when its
+    queue is full (backpressure), so at most about queue_size
+    items per stage are in memory at a time.
+
+    If a stage raises an exception, the pipeline is stopped and
+    the exception is raised in the calling thread. Closing the
+    generator early stops the pipeline as well.
+
+    :param source: Iterable of items, iterated in a background thread
+        (for example a generator reading files)
+    :param stages: Functions taking an iterable of the items of the
+        previous stage and returning an iterable of items, each called
+        in a background thread
+    :param queue_size: Maximum number of items waiting between two stages
+    :return: Generator of the items of the last stage
+    """
+    stopped = threading.Event()
+    errors = []
+
+    def work(produce, inputs, outputs):
+        try:
+            for item in produce(inputs):
+                put(outputs, item, stopped)
+            put(outputs, END, stopped)
+        except Stopped:
+            pass
+        except BaseException as e:
+            errors.append(e)
+            stopped.set()
+
+    threads = []
+    outputs = queue.Queue(queue_size)
+    threads.append(threading.Thread(target=work, args=(lambda inputs: source, None, outputs),
+                                    name="pipeline-source", daemon=True))
+    for i, stage in enumerate(stages):
+        inputs, outputs = outputs, queue.Queue(queue_size)
+        threads.append(threading.Thread(target=work, args=(stage, iterate(inputs, stopped), outputs),
+                                        name="pipeline-stage-{}".format(i), daemon=True))
+
+    for thread in threads:
+        thread.start()
+    try:
+        yield from iterate(outputs, stopped)
+    except Stopped:
+        pass
+    finally:
+        stopped.set()
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
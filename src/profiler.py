@@ -0,0 +1,280 @@
+"""
+Profiler class, which records the time spent in each stage of
+the analysis of a conversation (and in the user callbacks such
+as extract), with counts and optional memory peaks. See
+Profiler help for more information.
+"""
+
+import contextlib
+import json
+import threading
+import time
+import tracemalloc
+
+from src import cache
+
+
+class StageRecord(object):
+    """
+    StageRecord
+
+    The measurements of one run of a stage, yielded by
+    Profiler.stage so counts can be added to it
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.counts = {}
+        self.peak_bytes = None
+
+    def count(self, **counts):
+        """
+        Add to the counts of the stage, for example count(messages=10)
+
+        :param counts: Name -> number
+        """
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def to_dict(self):
+        """
+        Returns a dict representation of the object
+        :return: dict representation
+        """
+        result = {"wall": self.wall, "cpu": self.cpu, "counts": dict(self.counts)}
+        if self.peak_bytes is not None:
+            result["peak_bytes"] = self.peak_bytes
+        return result
+
+
+class NullRecord(object):
+    """StageRecord of a stage that is not profiled"""
+
+    def count(self, **counts):
+        pass
+
+
+NULL_RECORD = NullRecord()
+
+
+class TimedCallback(object):
+    """
+    TimedCallback
+
+    Wraps a function (such as the extract callback of a Conversation)
+    to add the time spent in each call to a stage of a Profiler. Keeps
+    the cache identity of the function, see cache.function_identity
+    """
+
+    def __init__(self, profiler, name, func, stream=False):
+        """
+        :param profiler: Profiler
+        :param name: Name of the stage
+        :param func: Function to wrap
+        :param stream: If True, func returns an iterable, and the time
+            spent iterating over it is recorded as well
+        """
+        self.profiler = profiler
+        self.name = name
+        self.func = func
+        self.stream = stream
+        self.cache_identity = cache.function_identity(func)
+
+    def __call__(self, *args, **kwargs):
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        result = self.func(*args, **kwargs)
+        self.profiler.add(self.name, time.perf_counter() - start_wall, time.thread_time() - start_cpu, calls=1)
+        if self.stream:
+            return self.iterate(result)
+        return result
+
+    def iterate(self, items):
+        """Yields the items of an iterable, timing each step"""
+        iterator = iter(items)
+        wall = cpu = 0.0
+        count = 0
+        try:
+            while True:
+                start_wall = time.perf_counter()
+                start_cpu = time.thread_time()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    wall += time.perf_counter() - start_wall
+                    cpu += time.thread_time() - start_cpu
+                count += 1
+                yield item
+        finally:
+            self.profiler.add(self.name, wall, cpu, items=count)
+
+
+class Profiler(object):
+    """
+    Profiler
+
+    Records the wall time, CPU time (of the thread running the stage),
+    number of runs and counts (such as lines, messages and bytes) of
+    each stage, summed over every run of the stage. Stages can be
+    nested, the time of a stage includes the time of the stages it
+    contains. If memory is set, the peak memory allocated during each
+    stage is recorded with tracemalloc, which slows the program down
+    considerably. tracemalloc has a single peak for the whole process,
+    so the peaks of stages running at the same time in several threads
+    (see Conversation pipeline) are approximate.
+
+    Subscribers are called with the StageRecord of each run of a
+    stage when it ends. Calls to wrapped callbacks (see wrap) are only
+    summed, as they are too frequent to be sent to subscribers.
+    """
+
+    def __init__(self, memory=False, callbacks=True):
+        """
+        Create a Profiler
+
+        :param memory: If True, record the peak memory of each stage
+            with tracemalloc, started on the first stage if needed
+        :param callbacks: If False, a Conversation does not wrap its
+            callbacks (extract...) to time them, as timing every call
+            makes the stages calling them slower
+        """
+        self.memory = memory
+        self.callbacks = callbacks
+        self.stages = {}
+        self.subscribers = []
+        self.lock = threading.Lock()
+
+        # Stages of the current thread being run, to record nested peaks
+        self.local = threading.local()
+
+    def subscribe(self, callback):
+        """
+        Call a function at the end of every run of a stage
+
+        :param callback: Function taking a StageRecord
+        """
+        self.subscribers.append(callback)
+
+    def add(self, name, wall, cpu, peak_bytes=None, runs=0, **counts):
+        """
+        Add measurements to the totals of a stage
+
+        :param name: Name of the stage
+        :param wall: Wall time in seconds
+        :param cpu: CPU time in seconds
+        :param peak_bytes: Optional peak memory
+        :param runs: Number of runs of the stage
+        :param counts: Name -> number to add to the counts
+        """
+        with self.lock:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = {"runs": 0, "wall": 0.0, "cpu": 0.0, "counts": {}}
+            stage["runs"] += runs
+            stage["wall"] += wall
+            stage["cpu"] += cpu
+            for key, value in counts.items():
+                stage["counts"][key] = stage["counts"].get(key, 0) + value
+            if peak_bytes is not None:
+                stage["peak_bytes"] = max(stage.get("peak_bytes", 0), peak_bytes)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Context manager recording a run of a stage
+
+        :param name: Name of the stage
+        :return: StageRecord, to add counts to
+        """
+        record = StageRecord(name)
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # The peak is reset for this stage, so the peak reached so
+            # far by the enclosing stage is saved first
+            if stack:
+                stack[-1][1] = max(stack[-1][1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            entry = [tracemalloc.get_traced_memory()[0], 0]
+            stack.append(entry)
+
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield record
+        finally:
+            record.wall = time.perf_counter() - start_wall
+            record.cpu = time.thread_time() - start_cpu
+
+            if self.memory:
+                stack.pop()
+                peak = max(entry[1], tracemalloc.get_traced_memory()[1])
+                record.peak_bytes = peak - entry[0]
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+
+            self.add(name, record.wall, record.cpu, record.peak_bytes, runs=1, **record.counts)
+            for callback in self.subscribers:
+                callback(record)
+
+    def wrap(self, name, func, stream=False):
+        """
+        Returns a function that calls func, recording the time spent
+        in it in a stage, see TimedCallback
+
+        :param name: Name of the stage
+        :param func: Function to wrap
+        :param stream: See TimedCallback
+        :return: TimedCallback
+        """
+        return TimedCallback(self, name, func, stream)
+
+    def to_dict(self):
+        """
+        Returns a dict representation of the object
+        :return: dict representation
+        """
+        with self.lock:
+            return {name: dict(stage, counts=dict(stage["counts"])) for name, stage in self.stages.items()}
+
+    def write(self, path):
+        """
+        Write the totals of every stage to a JSON file
+
+        :param path: Path of the file
+        """
+        with open(path, "w", encoding="utf-8") as f_obj:
+            json.dump({"stages": self.to_dict()}, f_obj, indent=4, sort_keys=True)
+
+
+def stage(profiler, name):
+    """
+    Returns profiler.stage(name), or a context manager
+    that does nothing if profiler is None
+
+    :param profiler: Profiler or None
+    :param name: Name of the stage
+    :return: Context manager yielding a StageRecord
+    """
+    if profiler is None:
+        return contextlib.nullcontext(NULL_RECORD)
+    return profiler.stage(name)
+
+
+def unwrap(func):
+    """
+    Returns the function wrapped by Profiler.wrap, for example
+    to send it to another process
+
+    :param func: Function, possibly a TimedCallback
+    :return: Function
+    """
+    return func.func if isinstance(func, TimedCallback) else func
@@ -0,0 +1,167 @@
+"""
+Streaming helpers used to read chat logs
+in bounded chunks instead of all at once
+"""
+
+import codecs
+import io
+import os
+
+# Default number of characters read from a file at a time
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def read_chunks(f_obj, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields the content of an open file in chunks of
+    at most chunk_size characters
+
+    :param f_obj: File object opened in text mode
+    :param chunk_size: Maximum number of characters per chunk
+    :return: Generator of strings
+    """
+    while True:
+        chunk = f_obj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def split_lines(chunks):
+    """
+    Chunk-aware equivalent of text.split("\\n"). Given an
+    iterable of text chunks, lazily yields each line, joining
+    lines that were cut across chunk boundaries.
+
+    Like str.split, a trailing newline yields a final
+    empty string.
+
+    :param chunks: Iterable of strings
+    :return: Generator of lines, without the newline
+    """
+    pending = []
+    for chunk in chunks:
+        lines = chunk.split("\n")
+        if len(lines) == 1:
+            # No line break in this chunk, the line continues
+            pending.append(chunk)
+            continue
+
+        pending.append(lines[0])
+        yield "".join(pending)
+
+        for i in range(1, len(lines) - 1):
+            yield lines[i]
+        pending = [lines[-1]]
+    yield "".join(pending)
+
+
+def split_text(text):
+    """
+    Default extract_messages function, splits the whole
+    text content of a file on newlines
+
+    :param text: Text content of a file
+    :return: String array of lines
+    """
+    return text.split("\n")
+
+
+def split_ranges(path, range_size):
+    """
+    Splits a file into byte ranges of roughly range_size bytes,
+    cut on line breaks so that every range holds whole lines.
+    The line break a range is cut on belongs to neither range,
+    so splitting the ranges with split_lines and joining the
+    results gives the same lines as splitting the whole file.
+
+    :param path: Path to the file
+    :param range_size: Approximate size of a range, in bytes
+    :return: Array of (start, end) byte offsets
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    start = 0
+
+    f_obj = open(path, "rb")
+    while size - start > range_size:
+        # Search for the next line break after the cut point, keeping
+        # 1 byte before it in case the line ends with \r\n
+        position = start + range_size - 1
+        f_obj.seek(position)
+        block = b""
+        index = -1
+        while index < 1:
+            data = f_obj.read(DEFAULT_CHUNK_SIZE)
+            if not data:
+                break
+            block += data
+            index = block.find(b"\n", 1)
+
+        if index < 1:
+            break
+
+        end = position + index
+        ranges.append((start, end - 1 if block[index - 1:index] == b"\r" else end))
+        start = end + 1
+    f_obj.close()
+
+    ranges.append((start, size))
+    return ranges
+
+
+def last_line_start(path, size):
+    """
+    Returns the offset of the last line of a file: the offset
+    after its last line break, 0 if it has none. The file is
+    searched backwards from size, one chunk at a time
+
+    :param path: Path to the file
+    :param size: Number of bytes of the file to search
+    :return: int
+    """
+    f_obj = open(path, "rb")
+    end = size
+    while end > 0:
+        start = max(end - DEFAULT_CHUNK_SIZE, 0)
+        f_obj.seek(start)
+        index = f_obj.read(end - start).rfind(b"\n")
+        if index != -1:
+            f_obj.close()
+            return start + index + 1
+        end = start
+    f_obj.close()
+    return 0
+
+
+def read_range_chunks(path, start, end, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Yields the text content of a byte range of a file, in chunks
+    of at most chunk_size bytes. The bytes are decoded as utf8
+    with universal newlines, the same way open() does it.
+
+    :param path: Path to the file
+    :param start: Offset of the first byte of the range
+    :param end: Offset after the last byte of the range
+    :param chunk_size: Maximum number of bytes read at a time
+    :return: Generator of strings
+    """
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf8")(), translate=True)
+
+    f_obj = open(path, "rb")
+    f_obj.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        data = f_obj.read(min(chunk_size, remaining))
+        if not data:
+            break
+        remaining -= len(data)
+
+        text = decoder.decode(data)
+        if text:
+            yield text
+    f_obj.close()
+
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
@@ -0,0 +1,89 @@
+"""
+Reservoir class, a fixed size uniform random
+sample of a stream. See Reservoir help for more
+information.
+"""
+
+import random
+
+
+class Reservoir(object):
+    """
+    Reservoir
+
+    Keeps a uniform random sample of at most size items
+    of a stream of items of unknown length, without
+    keeping the stream in memory (reservoir sampling)
+    """
+
+    def __init__(self, size):
+        """
+        Create an empty Reservoir
+
+        :param size: Maximum number of items in the sample
+        """
+        self.size = size
+        self.seen = 0
+        self.items = []
+
+    def add(self, item):
+        """
+        Add an item of the stream
+
+        :param item: Any object
+        """
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            i = random.randrange(self.seen)
+            if i < self.size:
+                self.items[i] = item
+
+    def merge(self, other):
+        """
+        Merge the sample of another stream into this one, the
+        result is a uniform sample of both streams
+
+        :param other: Reservoir, it is not modified
+        :return: self
+        """
+        # Each item of the merged sample comes from one of the two
+        # samples, with a probability proportional to the number of
+        # items of its stream that are not yet sampled
+        remaining = [self.seen, other.seen]
+        pools = [list(self.items), list(other.items)]
+        random.shuffle(pools[0])
+        random.shuffle(pools[1])
+
+        items = []
+        while len(items) < self.size and (pools[0] or pools[1]):
+            side = 0 if pools[0] and (not pools[1] or random.randrange(sum(remaining)) < remaining[0]) else 1
+            items.append(pools[side].pop())
+            remaining[side] -= 1
+
+        self.items = items
+        self.seen += other.seen
+        return self
+
+    def to_state(self):
+        """
+        Returns a JSON serializable dict of the sample,
+        if the items are JSON serializable
+
+        :return: dict
+        """
+        return {"size": self.size, "seen": self.seen, "items": self.items}
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Inverse of to_state
+
+        :param state: dict
+        :return: Reservoir
+        """
+        reservoir = cls(state["size"])
+        reservoir.seen = state["seen"]
+        reservoir.items = list(state["items"])
+        return reservoir
@@ -0,0 +1,273 @@
+"""
+Binary snapshot of the aggregate statistics of a conversation
+(messages per day, hour and weekday histograms and totals of the
+conversation and of every person), in a fixed layout of typed
+arrays so it can be memory-mapped. See write and Snapshot.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from src import histograms
+from src import timestamps
+
+MAGIC = b"CHATSTATS-SNAPSHOT"
+SNAPSHOT_VERSION = 1
+
+# Columns of the totals array, in order
+TOTALS = ["messages", "words", "characters", "characters_without_spaces",
+          "swears", "questions", "urls", "active_days"]
+
+# name -> (typecode, number of columns, or None for one per day)
+ARRAYS = [
+    ("days", "I", None),
+    ("hours", "I", 24),
+    ("weekdays", "I", 7),
+    ("totals", "Q", len(TOTALS))
+]
+
+ALIGNMENT = 8
+
+
+def analyser_totals(analysis):
+    """
+    Returns the row of the totals array of an analyser
+
+    :param analysis: BasicAnalyser
+    :return: Array of ints, in the order of TOTALS
+    """
+    return [analysis.total_messages, analysis.total_words, analysis.total_characters,
+            analysis.total_characters_without_spaces, analysis.swears, analysis.questions,
+            analysis.url_count, analysis.active_days]
+
+
+def day_counts(epochs, rows, row_count, first_day, day_count):
+    """
+    Counts the messages of each row per calendar day. Every
+    message is counted in row 0 as well as in its own row
+
+    :param epochs: Epochs of the messages
+    :param rows: Row index of each message, at least 1
+    :param row_count: Number of rows
+    :param first_day: Day index of the first day
+    :param day_count: Number of days
+    :return: array("I") of row_count * day_count counts
+    """
+    if histograms.numpy is not None:
+        numpy = histograms.numpy
+        days = numpy.asarray(epochs, dtype=numpy.int64) // timestamps.SECONDS_PER_DAY - first_day
+        counts = numpy.bincount(numpy.asarray(rows, dtype=numpy.int64) * day_count + days,
+                                minlength=row_count * day_count).reshape(row_count, day_count)
+        counts[0] = counts[1:].sum(axis=0)
+        return array("I", counts.astype(numpy.uint32).tobytes())
+
+    counts = array("I", bytes(4 * row_count * day_count))
+    for epoch, row in zip(epochs, rows):
+        day = epoch // timestamps.SECONDS_PER_DAY - first_day
+        counts[day] += 1
+        counts[row * day_count + day] += 1
+    return counts
+
+
+def write(conversation, path):
+    """
+    Writes a snapshot of a conversation. Row 0 of each array is
+    the whole conversation, row i + 1 is the i-th person of
+    conversation.persons. The file is written atomically
+
+    :param conversation: Conversation object
+    :param path: Path of the file
+    """
+    messages = conversation.messages
+    persons = list(conversation.persons.values())
+    indexes = {id(user): i + 1 for i, user in enumerate(persons)}
+    row_count = len(persons) + 1
+
+    epochs = messages.epochs
+    if len(epochs) > 0:
+        first_day = epochs[0] // timestamps.SECONDS_PER_DAY
+        day_count = epochs[-1] // timestamps.SECONDS_PER_DAY - first_day + 1
+    else:
+        first_day = 0
+        day_count = 0
+
+    user_rows = [indexes[id(conversation.persons_by_username[username])] for username in messages.usernames]
+    rows = array("i", [user_rows[user_id] for user_id in messages.user_ids])
+    days = day_counts(epochs, rows, row_count, first_day, day_count)
+
+    analysers = [conversation.analysis] + [user.analysis for user in persons]
+    columns = {
+        "days": days,
+        "hours": array("I", [x for analysis in analysers for x in analysis.active_hours]),
+        "weekdays": array("I", [x for analysis in analysers for x in analysis.active_days_of_week]),
+        "totals": array("Q", [x for analysis in analysers for x in analyser_totals(analysis)])
+    }
+
+    layout = {}
+    offset = 0
+    for name, typecode, width in ARRAYS:
+        width = width or day_count
+        layout[name] = {"typecode": typecode, "offset": offset, "width": width}
+        offset += len(columns[name]) * columns[name].itemsize
+        offset += -offset % ALIGNMENT
+
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "byteorder": sys.byteorder,
+        "users": [user.name for user in persons],
+        "first_day": first_day,
+        "days": day_count,
+        "totals": TOTALS,
+        "arrays": layout,
+        "size": offset
+    }).encode("utf8")
+
+    # The arrays start on an aligned offset of the file
+    prefix_size = len(MAGIC) + 4 + len(header)
+    header += b" " * (-prefix_size % ALIGNMENT)
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f_obj:
+            f_obj.write(MAGIC)
+            f_obj.write(struct.pack("<I", len(header)))
+            f_obj.write(header)
+            for name, typecode, width in ARRAYS:
+                data = columns[name].tobytes()
+                f_obj.write(data)
+                f_obj.write(bytes(-len(data) % ALIGNMENT))
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class Snapshot(object):
+    """
+    Snapshot
+
+    Reads a snapshot written by write. The file is memory-mapped,
+    and the series returned are memoryviews of the mapping, so
+    opening a snapshot and reading a person's series does not read
+    or copy the rest of the file. The views must be released before
+    the snapshot is closed. Can be used as a context manager.
+    """
+
+    def __init__(self, path):
+        """
+        Open a snapshot
+
+        :param path: Path of the file
+        :raises ValueError: If the file is not a snapshot, or was
+            written by another version
+        """
+        with open(path, "rb") as f_obj:
+            if f_obj.read(len(MAGIC)) != MAGIC:
+                raise ValueError("{} is not a snapshot".format(path))
+            size = struct.unpack("<I", f_obj.read(4))[0]
+            header = json.loads(f_obj.read(size).decode("utf8"))
+            if header.get("version") != SNAPSHOT_VERSION:
+                raise ValueError("Unsupported snapshot version {}".format(header.get("version")))
+            self._start = len(MAGIC) + 4 + size
+            self._mmap = mmap.mmap(f_obj.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < self._start + header["size"]:
+            self._mmap.close()
+            raise ValueError("Truncated snapshot")
+
+        self.header = header
+        self.users = header["users"]
+        self.user_index = {name: i + 1 for i, name in enumerate(self.users)}
+        self.first_day = header["first_day"]
+        self.day_count = header["days"]
+        self.swapped = header["byteorder"] != sys.byteorder
+        self._view = memoryview(self._mmap)
+
+    def row(self, name, user=None):
+        """
+        Returns a row of one of the arrays. This is a memoryview of
+        the file, unless it was written on a machine of the other
+        byte order, in which case the row is copied and converted
+
+        :param name: Array name, see ARRAYS
+        :param user: Name of the person, or None for the whole conversation
+        :return: memoryview (or array) of ints
+        :raises KeyError: If there is no such person
+        """
+        index = 0 if user is None else self.user_index[user]
+        layout = self.header["arrays"][name]
+        itemsize = array(layout["typecode"]).itemsize
+        start = self._start + layout["offset"] + index * layout["width"] * itemsize
+        view = self._view[start:start + layout["width"] * itemsize]
+        if self.swapped:
+            values = array(layout["typecode"], view.tobytes())
+            values.byteswap()
+            view.release()
+            return values
+        return view.cast(layout["typecode"])
+
+    def days(self, user=None):
+        """
+        Returns the number of messages said each day, from the day of
+        the first message of the conversation (see date) to the last
+
+        :param user: Name of the person, or None for the whole conversation
+        :return: memoryview of ints
+        """
+        return self.row("days", user)
+
+    def hours(self, user=None):
+        """
+        Returns the number of messages said at each hour of the day
+
+        :param user: Name of the person, or None for the whole conversation
+        :return: memoryview of 24 ints
+        """
+        return self.row("hours", user)
+
+    def weekdays(self, user=None):
+        """
+        Returns the number of messages said each day of the week, Monday first
+
+        :param user: Name of the person, or None for the whole conversation
+        :return: memoryview of 7 ints
+        """
+        return self.row("weekdays", user)
+
+    def totals(self, user=None):
+        """
+        Returns the totals of the conversation or of a person
+
+        :param user: Name of the person, or None for the whole conversation
+        :return: Dict of total name (see TOTALS) -> int
+        """
+        row = self.row("totals", user)
+        result = dict(zip(self.header["totals"], row))
+        if isinstance(row, memoryview):
+            row.release()
+        return result
+
+    def date(self, day):
+        """
+        Returns the date of an index of the days series
+
+        :param day: Index in the series returned by days
+        :return: datetime object (midnight of the day)
+        """
+        return timestamps.from_epoch((self.first_day + day) * timestamps.SECONDS_PER_DAY)
+
+    def close(self):
+        """Close the snapshot, views of it must be released first"""
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
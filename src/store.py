@@ -0,0 +1,429 @@
+"""
+MessageStore class, a compact columnar storage
+for messages. See MessageStore help for more
+information.
+"""
+
+import itertools
+import json
+import struct
+import sys
+from array import array
+
+from src import timestamps
+
+
+class MessageStore(object):
+    """
+    MessageStore
+
+    Stores messages column by column instead of as a list of
+    Message objects: epochs in an int array, usernames interned
+    as integer ids, and the content of every message in a single
+    utf8 buffer with offsets. Indexing or iterating the store
+    returns MessageView objects, which behave like Message objects.
+    """
+
+    def __init__(self, keep_raw=True):
+        """
+        Create an empty MessageStore
+
+        :param keep_raw: If False, the raw lines of the messages are
+            not stored, and the raw attribute of the views is None
+        """
+        self.keep_raw = keep_raw
+
+        self.epochs = array("q")
+        self.user_ids = array("i")
+
+        # id -> username, and username -> id
+        self.usernames = []
+        self.user_index = {}
+
+        # Message i is content[content_offsets[i]:content_offsets[i + 1]]
+        self.content = bytearray()
+        self.content_offsets = array("q", [0])
+
+        self.raw = bytearray()
+        self.raw_offsets = array("q", [0])
+
+    def user_id(self, username):
+        """
+        Returns the id of a username, adding it if needed
+
+        :param username: Username string
+        :return: int
+        """
+        user_id = self.user_index.get(username)
+        if user_id is None:
+            user_id = len(self.usernames)
+            self.user_index[username] = user_id
+            self.usernames.append(username)
+        return user_id
+
+    def append(self, username, content, epoch, raw=None):
+        """
+        Add a message to the store
+
+        :param username: Username of the person who said the message
+        :param content: Content of the message
+        :param epoch: Timestamp of the message, see timestamps
+        :param raw: Raw match, only stored if keep_raw is True
+        """
+        self.epochs.append(epoch)
+        self.user_ids.append(self.user_id(username))
+
+        self.content += content.encode("utf8")
+        self.content_offsets.append(len(self.content))
+
+        if self.keep_raw:
+            self.raw += (raw or "").encode("utf8")
+            self.raw_offsets.append(len(self.raw))
+
+    def append_message(self, message):
+        """
+        Add a Message (or MessageView) object to the store
+
+        :param message: Message object
+        """
+        self.append(message.username, message.content, message.epoch, message.raw)
+
+    def append_all(self, usernames, contents, epochs, raws=None):
+        """
+        Add many messages at once, column by column, which is
+        faster than calling append for each message
+
+        :param usernames: Array of usernames
+        :param contents: Array of contents, same length
+        :param epochs: Array of timestamps, same length, see timestamps
+        :param raws: Optional array of raw matches, only stored if
+            keep_raw is True
+        """
+        user_id = self.user_id
+        self.epochs.extend(epochs)
+        self.user_ids.extend(array("i", [user_id(username) for username in usernames]))
+        self._append_strings(self.content, self.content_offsets, contents)
+
+        if self.keep_raw:
+            if raws is None:
+                self.raw_offsets.extend(array("q", [len(self.raw)] * len(contents)))
+            else:
+                self._append_strings(self.raw, self.raw_offsets, raws)
+
+    @staticmethod
+    def _append_strings(buffer, offsets, strings):
+        """
+        Append strings to a utf8 buffer and its offsets
+
+        :param buffer: bytearray, extended in place
+        :param offsets: array of offsets, extended in place
+        :param strings: Array of strings
+        """
+        data = "".join(strings).encode("utf8")
+        if len(data) == sum(map(len, strings)):
+            # Only ASCII, the lengths in bytes are the lengths in characters
+            lengths = map(len, strings)
+        else:
+            lengths = (len(string.encode("utf8")) for string in strings)
+        ends = itertools.accumulate(lengths, initial=len(buffer))
+        next(ends)
+        offsets.extend(array("q", ends))
+        buffer += data
+
+    def extend(self, other):
+        """
+        Add every message of another MessageStore, in order
+
+        :param other: MessageStore
+        """
+        user_ids = [self.user_id(username) for username in other.usernames]
+        self.epochs.extend(other.epochs)
+        self.user_ids.extend(array("i", [user_ids[i] for i in other.user_ids]))
+
+        offset = len(self.content)
+        self.content += other.content
+        self.content_offsets.extend(array("q", [offset + x for x in other.content_offsets[1:]]))
+
+        if self.keep_raw:
+            if other.keep_raw:
+                offset = len(self.raw)
+                self.raw += other.raw
+                self.raw_offsets.extend(array("q", [offset + x for x in other.raw_offsets[1:]]))
+            else:
+                self.raw_offsets.extend(array("q", [len(self.raw)] * len(other)))
+
+    def tail(self, start):
+        """
+        Returns a new store of the messages from index start,
+        with only the usernames of these messages
+
+        :param start: Index of the first message
+        :return: MessageStore
+        """
+        messages = MessageStore(self.keep_raw)
+        user_ids = self.user_ids[start:]
+        used = sorted(set(user_ids))
+        new_ids = {user_id: i for i, user_id in enumerate(used)}
+        messages.usernames = [self.usernames[user_id] for user_id in used]
+        messages.user_index = {username: i for i, username in enumerate(messages.usernames)}
+        messages.epochs = self.epochs[start:]
+        messages.user_ids = array("i", [new_ids[user_id] for user_id in user_ids])
+
+        offset = self.content_offsets[start]
+        messages.content = self.content[offset:]
+        messages.content_offsets = array("q", [x - offset for x in self.content_offsets[start:]])
+        if self.keep_raw:
+            offset = self.raw_offsets[start]
+            messages.raw = self.raw[offset:]
+            messages.raw_offsets = array("q", [x - offset for x in self.raw_offsets[start:]])
+        return messages
+
+    def sort(self):
+        """
+        Sort the messages by timestamp. The sort is stable,
+        messages with the same timestamp keep their order
+        """
+        epochs = self.epochs
+        if all(epochs[i] <= epochs[i + 1] for i in range(len(epochs) - 1)):
+            return
+
+        self._select(sorted(range(len(epochs)), key=epochs.__getitem__))
+
+    def remove(self, indexes):
+        """
+        Remove the messages at some indexes, the other messages
+        keep their order. Usernames left without messages are
+        removed too, the ids of the others may change
+
+        :param indexes: Set of message indexes
+        """
+        self._select([i for i in range(len(self.epochs)) if i not in indexes])
+        used = sorted(set(self.user_ids))
+        new_ids = {user_id: i for i, user_id in enumerate(used)}
+        self.usernames = [self.usernames[user_id] for user_id in used]
+        self.user_index = {username: i for i, username in enumerate(self.usernames)}
+        self.user_ids = array("i", [new_ids[user_id] for user_id in self.user_ids])
+
+    def _select(self, order):
+        """
+        Keep the messages at the given indexes, in that order
+
+        :param order: Array of message indexes
+        """
+        self.epochs = array("q", [self.epochs[i] for i in order])
+        self.user_ids = array("i", [self.user_ids[i] for i in order])
+        self.content, self.content_offsets = self._reorder(self.content, self.content_offsets, order)
+        if self.keep_raw:
+            self.raw, self.raw_offsets = self._reorder(self.raw, self.raw_offsets, order)
+
+    @staticmethod
+    def _reorder(buffer, offsets, order):
+        """
+        Returns a copy of a buffer and its offsets with
+        the items in the given order
+
+        :param buffer: bytearray
+        :param offsets: Offsets of the items in the buffer
+        :param order: Array of item indexes
+        :return: (bytearray, offsets)
+        """
+        new_buffer = bytearray()
+        new_offsets = array("q", [0])
+        for i in order:
+            new_buffer += buffer[offsets[i]:offsets[i + 1]]
+            new_offsets.append(len(new_buffer))
+        return new_buffer, new_offsets
+
+    def write(self, f_obj):
+        """
+        Write the store to a binary file, the columns are
+        written as is so reading them back is a memory copy
+
+        :param f_obj: File object opened in binary mode
+        """
+        header = json.dumps({
+            "count": len(self),
+            "keep_raw": self.keep_raw,
+            "byteorder": sys.byteorder,
+            "usernames": self.usernames,
+            "content_size": len(self.content),
+            "raw_size": len(self.raw)
+        }).encode("utf8")
+
+        f_obj.write(struct.pack("<I", len(header)))
+        f_obj.write(header)
+        for column in [self.epochs, self.user_ids, self.content_offsets, self.raw_offsets]:
+            f_obj.write(column.tobytes())
+        f_obj.write(self.content)
+        f_obj.write(self.raw)
+
+    @classmethod
+    def read(cls, f_obj):
+        """
+        Read a store written by write
+
+        :param f_obj: File object opened in binary mode
+        :return: MessageStore
+        :raises ValueError: If the file is truncated
+        """
+        def read_bytes(size):
+            data = f_obj.read(size)
+            if len(data) != size:
+                raise ValueError("Truncated message store")
+            return data
+
+        def read_column(typecode, count):
+            column = array(typecode)
+            column.frombytes(read_bytes(count * column.itemsize))
+            if header["byteorder"] != sys.byteorder:
+                column.byteswap()
+            return column
+
+        header = json.loads(read_bytes(struct.unpack("<I", read_bytes(4))[0]).decode("utf8"))
+        count = header["count"]
+
+        messages = cls(header["keep_raw"])
+        messages.usernames = header["usernames"]
+        messages.user_index = {username: i for i, username in enumerate(messages.usernames)}
+        messages.epochs = read_column("q", count)
+        messages.user_ids = read_column("i", count)
+        messages.content_offsets = read_column("q", count + 1)
+        messages.raw_offsets = read_column("q", count + 1 if messages.keep_raw else 1)
+        messages.content = bytearray(read_bytes(header["content_size"]))
+        messages.raw = bytearray(read_bytes(header["raw_size"]))
+        return messages
+
+    def username_at(self, i):
+        """Returns the username of message i"""
+        return self.usernames[self.user_ids[i]]
+
+    def content_at(self, i):
+        """Returns the content of message i"""
+        return self.content[self.content_offsets[i]:self.content_offsets[i + 1]].decode("utf8")
+
+    def raw_at(self, i):
+        """Returns the raw line of message i, or None if not kept"""
+        if not self.keep_raw:
+            return None
+        return self.raw[self.raw_offsets[i]:self.raw_offsets[i + 1]].decode("utf8")
+
+    def subset(self, indexes=None):
+        """
+        Returns a MessageSubset of this store
+
+        :param indexes: Optional array of message indexes
+        :return: MessageSubset
+        """
+        return MessageSubset(self, indexes)
+
+    def __len__(self):
+        return len(self.epochs)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [MessageView(self, j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("message index out of range")
+        return MessageView(self, i)
+
+    def __iter__(self):
+        for i in range(len(self.epochs)):
+            yield MessageView(self, i)
+
+
+class MessageSubset(object):
+    """
+    MessageSubset
+
+    A list-like selection of the messages of a MessageStore,
+    for example the messages said by a Person. Only the
+    indexes of the messages are stored.
+    """
+
+    def __init__(self, store, indexes=None):
+        """
+        Create a MessageSubset
+
+        :param store: MessageStore the messages belong to
+        :param indexes: Optional array of message indexes
+        """
+        self.store = store
+        self.indexes = array("q", indexes or [])
+
+    def append(self, message):
+        """
+        Add a message to the subset
+
+        :param message: MessageView of a message in the store
+        """
+        self.indexes.append(message.index)
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [MessageView(self.store, j) for j in self.indexes[i]]
+        return MessageView(self.store, self.indexes[i])
+
+    def __iter__(self):
+        for i in self.indexes:
+            yield MessageView(self.store, i)
+
+
+class MessageView(object):
+    """
+    MessageView
+
+    A message of a MessageStore, with the same
+    attributes as a Message object
+    """
+
+    __slots__ = ["store", "index"]
+
+    def __init__(self, store, index):
+        """
+        Create a MessageView
+
+        :param store: MessageStore the message belongs to
+        :param index: Index of the message in the store
+        """
+        self.store = store
+        self.index = index
+
+    @property
+    def username(self):
+        return self.store.username_at(self.index)
+
+    @property
+    def content(self):
+        return self.store.content_at(self.index)
+
+    @property
+    def raw(self):
+        return self.store.raw_at(self.index)
+
+    @property
+    def epoch(self):
+        return self.store.epochs[self.index]
+
+    @property
+    def timestamp(self):
+        return timestamps.from_epoch(self.epoch)
+
+    @property
+    def day(self):
+        return self.epoch // timestamps.SECONDS_PER_DAY
+
+    @property
+    def weekday(self):
+        return timestamps.weekday(self.epoch)
+
+    @property
+    def hour(self):
+        return timestamps.hour(self.epoch)
+
+    def __str__(self):
+        return "{} {}: {}".format(self.timestamp, self.username, self.content)
@@ -0,0 +1,113 @@
+"""
+Timestamp helpers. Timestamps are stored as the
+number of seconds since 1970-01-01T00:00:00 (naive,
+no timezone), so calendar fields can be computed
+with integer arithmetic.
+"""
+
+import datetime
+import functools
+
+EPOCH = datetime.datetime(1970, 1, 1)
+EPOCH_ORDINAL = EPOCH.toordinal()
+SECONDS_PER_HOUR = 60 * 60
+SECONDS_PER_DAY = 24 * SECONDS_PER_HOUR
+
+# 1970-01-01 was a thursday
+EPOCH_WEEKDAY = 3
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def to_epoch(timestamp):
+    """
+    Converts a (naive) datetime to the number of
+    seconds since 1970-01-01T00:00:00
+
+    :param timestamp: datetime object
+    :return: int
+    """
+    delta = timestamp - EPOCH
+    return delta.days * SECONDS_PER_DAY + delta.seconds
+
+
+def from_epoch(epoch):
+    """
+    Inverse of to_epoch
+
+    :param epoch: Seconds since 1970-01-01T00:00:00
+    :return: datetime object
+    """
+    return EPOCH + datetime.timedelta(seconds=epoch)
+
+
+def day(epoch):
+    """
+    Returns the day index (days since 1970-01-01) of an epoch
+    Two epochs have the same day index if they are on the
+    same date.
+
+    :param epoch: Seconds since 1970-01-01T00:00:00
+    :return: int
+    """
+    return epoch // SECONDS_PER_DAY
+
+
+def weekday(epoch):
+    """
+    Returns the day of the week of an epoch, same as
+    datetime.weekday() (Monday is 0, Sunday is 6)
+
+    :param epoch: Seconds since 1970-01-01T00:00:00
+    :return: int
+    """
+    return (epoch // SECONDS_PER_DAY + EPOCH_WEEKDAY) % 7
+
+
+def hour(epoch):
+    """
+    Returns the hour of the day of an epoch
+
+    :param epoch: Seconds since 1970-01-01T00:00:00
+    :return: int
+    """
+    return epoch % SECONDS_PER_DAY // SECONDS_PER_HOUR
+
+
+@functools.lru_cache(maxsize=4096)
+def date_epoch(date):
+    """
+    Returns the epoch of midnight of a date. Cached, as
+    chat logs have many messages per day.
+
+    :param date: Date string in yyyy-mm-dd format
+    :return: int
+    """
+    ordinal = datetime.date(int(date[0:4]), int(date[5:7]), int(date[8:10])).toordinal()
+    return (ordinal - EPOCH_ORDINAL) * SECONDS_PER_DAY
+
+
+def parse(timestamp):
+    """
+    Parses a timestamp in yyyy-mm-ddThh:mm:ss format (anything
+    after a "." is ignored) into an epoch. Well formed timestamps
+    are parsed by slicing, others go through strptime.
+
+    :param timestamp: Timestamp string
+    :return: Seconds since 1970-01-01T00:00:00
+    :raises ValueError: If the timestamp is invalid
+    """
+    timestamp = timestamp.split(".")[0]
+
+    if len(timestamp) == 19 and timestamp[4] == "-" and timestamp[7] == "-" and timestamp[10] == "T" \
+            and timestamp[13] == ":" and timestamp[16] == ":":
+        digits = timestamp[0:4] + timestamp[5:7] + timestamp[8:10] \
+            + timestamp[11:13] + timestamp[14:16] + timestamp[17:19]
+        if digits.isdigit():
+            hours = int(timestamp[11:13])
+            minutes = int(timestamp[14:16])
+            seconds = int(timestamp[17:19])
+            if hours < 24 and minutes < 60 and seconds < 60:
+                return date_epoch(timestamp[0:10]) + hours * SECONDS_PER_HOUR + minutes * 60 + seconds
+
+    return to_epoch(datetime.datetime.strptime(timestamp, TIMESTAMP_FORMAT))
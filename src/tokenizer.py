@@ -0,0 +1,119 @@
+"""
+Tokenizer class, splits a message into the
+tokens used by every analyser. See Tokenizer
+help for more information.
+"""
+
+import re
+
+from src import matcher
+
+
+URL_PATTERN = 'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\(\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+URL_REGEX = re.compile(URL_PATTERN)
+
+# Every byte except ascii letters and spaces, deleted from words
+# with bytes.translate instead of a regex substitution per word
+NON_LETTERS = bytes(c for c in range(256) if not (chr(c).isascii() and chr(c).isalpha()) and chr(c) != " ")
+
+
+class Tokens(object):
+    """
+    Tokens
+
+    The tokens of a message, computed once per message
+    and shared by every analyser the message is added to
+    (ie the global chat and the user)
+    """
+
+    __slots__ = ["words", "word_types", "urls", "total_characters",
+                 "total_characters_without_spaces", "question", "swear", "response"]
+
+    def __init__(self, words, word_types, urls, total_characters,
+                 total_characters_without_spaces, question, swear, response):
+        """
+        Create a Tokens object, see Tokenizer.tokenize
+
+        :param words: String array of the words, split on spaces
+        :param word_types: String array of the normalized words (lowercase
+            letters only), not including urls and empty words
+        :param urls: String array of the urls
+        :param total_characters: Number of characters
+        :param total_characters_without_spaces: Number of characters that are not spaces
+        :param question: True if the message contains a question mark
+        :param swear: True if the message contains a swear
+        :param response: True if the message is a response (see Person)
+        """
+        self.words = words
+        self.word_types = word_types
+        self.urls = urls
+        self.total_characters = total_characters
+        self.total_characters_without_spaces = total_characters_without_spaces
+        self.question = question
+        self.swear = swear
+        self.response = response
+
+
+class Tokenizer(object):
+    """
+    Tokenizer
+
+    Splits the content of a message into words, normalized
+    words and urls, counts its characters and matches it
+    against the swear and response dictionaries, using only
+    precompiled patterns and translation tables.
+    """
+
+    def __init__(self, swears=matcher.SWEARS, responses=matcher.RESPONSES):
+        """
+        Create a Tokenizer
+
+        :param swears: PhraseMatcher of the swears
+        :param responses: PhraseMatcher of the responses
+        """
+        self.swears = swears
+        self.responses = responses
+
+    def tokenize(self, content):
+        """
+        Tokenize the content of a message
+
+        :param content: Content of the message
+        :return: Tokens object
+        """
+        words = content.split(" ")
+        lowered = content.lower()
+        lower_words = lowered.split(" ")
+
+        # Lowercasing never adds or removes spaces, and neither does the
+        # translation, so the normalized words line up with the words
+        normalized = lowered.encode("ascii", "ignore").translate(None, NON_LETTERS).decode("ascii").split(" ")
+
+        if "http" in lowered:
+            urls = URL_REGEX.findall(content)
+            word_types = [word for word, lower_word in zip(normalized, lower_words)
+                          if word and "http://" not in lower_word and "https://" not in lower_word]
+        else:
+            urls = []
+            word_types = list(filter(None, normalized))
+
+        response = len(words) < 5 and \
+            self.responses.search(lower_words if self.responses.lowercase else words)
+
+        return Tokens(words, word_types, urls, len(content), len(content) - content.count(" "),
+                      "?" in content, self.swears.search(words), response)
+
+
+# Tokenizer using the default dictionaries
+DEFAULT = Tokenizer()
+
+
+def tokenize(content):
+    """
+    Tokenize the content of a message with
+    the default dictionaries
+
+    :param content: Content of the message
+    :return: Tokens object
+    """
+    return DEFAULT.tokenize(content)
@@ -0,0 +1,229 @@
+"""
+URL statistics in bounded memory: total count,
+approximate distinct count (HyperLogLog), most
+common domains and a uniform sample of the urls
+"""
+
+import base64
+import hashlib
+import math
+import re
+from urllib.parse import urlsplit
+
+from src import sampling
+from src import wordstats
+
+DEFAULT_SAMPLE_SIZE = 8
+DEFAULT_DOMAIN_CAPACITY = 256
+DEFAULT_PRECISION = 12
+
+NONZERO = re.compile(b"[^\x00]")
+
+
+def domain(url):
+    """
+    Returns the lowercase domain of a url
+
+    :param url: Url string
+    :return: String, empty if the url has no domain
+    """
+    try:
+        return urlsplit(url).hostname or ""
+    except ValueError:
+        return ""
+
+
+class HyperLogLog(object):
+    """
+    HyperLogLog
+
+    Estimates the number of distinct values added to it with
+    2 ** precision one byte registers, with a relative error
+    of about 1.04 / sqrt(2 ** precision) (1.6% for the default
+    precision of 12, ie 4KB)
+    """
+
+    def __init__(self, precision=DEFAULT_PRECISION):
+        """
+        Create an empty HyperLogLog
+
+        :param precision: Number of bits of the hash used to
+            select a register, between 4 and 16
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        """
+        Add a value
+
+        :param value: String
+        """
+        # A stable hash, unlike hash(), so registers can be
+        # merged across processes and saved
+        x = int.from_bytes(hashlib.blake2b(value.encode("utf8"), digest_size=8).digest(), "big")
+        bits = 64 - self.precision
+        index = x >> bits
+        rank = bits - (x & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        """
+        Returns the estimated number of distinct values
+
+        :return: int
+        """
+        m = len(self.registers)
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+
+        # Small range correction
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other):
+        """
+        Merge the values of another HyperLogLog into this one
+
+        :param other: HyperLogLog with the same precision
+        :return: self
+        """
+        if other.precision != self.precision:
+            raise ValueError("Can not merge HyperLogLogs of different precisions")
+
+        # A HyperLogLog of few values has few non zero registers,
+        # which are found without a loop over every register
+        if other.registers.count(0) * 2 > len(other.registers):
+            registers = self.registers
+            for match in NONZERO.finditer(other.registers):
+                i = match.start()
+                if other.registers[i] > registers[i]:
+                    registers[i] = other.registers[i]
+        else:
+            self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+
+class UrlStats(object):
+    """
+    UrlStats
+
+    Statistics of the urls of a conversation that use a fixed
+    amount of memory, however many urls are added: the total
+    number of urls, an estimate of the number of distinct urls,
+    the most common domains (see wordstats.SpaceSaving) and a
+    uniform random sample of the urls (see sampling.Reservoir)
+    """
+
+    def __init__(self, sample_size=DEFAULT_SAMPLE_SIZE, domain_capacity=DEFAULT_DOMAIN_CAPACITY,
+                 precision=DEFAULT_PRECISION):
+        """
+        Create empty UrlStats
+
+        :param sample_size: Number of urls kept in the sample
+        :param domain_capacity: Maximum number of domains tracked
+        :param precision: Precision of the distinct count, see HyperLogLog
+        """
+        self.total = 0
+        self.distinct = HyperLogLog(precision)
+        self.domains = wordstats.SpaceSaving(domain_capacity)
+        self.samples = sampling.Reservoir(sample_size)
+
+    def add(self, url):
+        """
+        Add a url
+
+        :param url: Url string
+        """
+        self.total += 1
+        self.distinct.add(url)
+        self.domains.add(domain(url))
+        self.samples.add(url)
+
+    @property
+    def sample(self):
+        """Uniform random sample of the urls"""
+        return self.samples.items
+
+    @property
+    def distinct_count(self):
+        """Estimated number of distinct urls"""
+        return self.distinct.count()
+
+    def top_domains(self, k):
+        """
+        Returns the k most common domains
+
+        :param k: Number of domains
+        :return: Array of (domain, count) tuples
+        """
+        return wordstats.top_k(self.domains.counts, k)
+
+    def merge(self, other):
+        """
+        Merge the statistics of other urls into this one
+
+        :param other: UrlStats, it is not modified
+        :return: self
+        """
+        counts = dict(self.domains.counts)
+        errors = dict(self.domains.errors)
+        for name, count in other.domains.counts.items():
+            counts[name] = counts.get(name, 0) + count
+            errors[name] = errors.get(name, 0) + other.domains.errors[name]
+        self.domains = wordstats.SpaceSaving.from_counts(counts, self.domains.capacity, errors)
+        self.distinct.merge(other.distinct)
+        self.samples.merge(other.samples)
+        self.total += other.total
+        return self
+
+    def to_state(self):
+        """
+        Returns a JSON serializable dict of the statistics
+
+        :return: dict
+        """
+        return {
+            "sample_size": self.samples.size,
+            "total": self.total,
+            "precision": self.distinct.precision,
+            "registers": base64.b64encode(bytes(self.distinct.registers)).decode("ascii"),
+            "domain_capacity": self.domains.capacity,
+            "domains": [[name, count, self.domains.errors[name]] for name, count in self.domains.counts.items()],
+            "sample": self.sample
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """
+        Inverse of to_state
+
+        :param state: dict
+        :return: UrlStats
+        """
+        stats = cls(state["sample_size"], state["domain_capacity"], state["precision"])
+        stats.total = state["total"]
+        stats.distinct.registers = bytearray(base64.b64decode(state["registers"]))
+        stats.domains = wordstats.SpaceSaving.from_counts(
+            {name: count for name, count, error in state["domains"]}, state["domain_capacity"],
+            {name: error for name, count, error in state["domains"]})
+        stats.samples.seen = state["total"]
+        stats.samples.items = list(state["sample"])
+        return stats
+
+    def to_dict(self):
+        """
+        Returns a dict representation of the object
+        :return: dict representation
+        """
+        return {
+            "total": self.total,
+            "distinct": self.distinct_count,
+            "top_domains": self.top_domains(10),
+            "sample": self.sample
+        }
@@ -0,0 +1,125 @@
+"""
+Word statistics helpers: top-k selection of word
+counts, and the SpaceSaving counter used to count
+words in bounded memory
+"""
+
+import heapq
+from operator import itemgetter
+
+
+def top_k(counts, k, exclude=None, min_length=0):
+    """
+    Returns the k most frequent words, in the same order as
+    sorted(counts.items(), key=count, reverse=True)[:k] (words
+    with the same count keep the order of counts), but with a
+    heap instead of a sort of the whole vocabulary
+
+    :param counts: Dict of word -> count
+    :param k: Number of words
+    :param exclude: Optional set of words to skip, such as data.STOPWORD_SET
+    :param min_length: Skip words shorter than this
+    :return: Array of (word, count) tuples
+    """
+    items = counts.items()
+    if exclude or min_length:
+        exclude = exclude or ()
+        items = ((word, count) for word, count in items
+                 if len(word) >= min_length and word not in exclude)
+    return heapq.nlargest(k, items, key=itemgetter(1))
+
+
+class SpaceSaving(object):
+    """
+    SpaceSaving
+
+    Approximate word counter using the Space-Saving algorithm.
+    At most capacity words are tracked: when a new word is seen
+    and the counter is full, the word with the lowest count is
+    evicted and the new word takes over its count. Every word
+    more frequent than total / capacity is guaranteed to be
+    tracked, and the count of a word overestimates its true
+    count by at most errors[word].
+    """
+
+    def __init__(self, capacity):
+        """
+        Create an empty SpaceSaving counter
+
+        :param capacity: Maximum number of words tracked
+        """
+        if capacity < 1:
+            raise ValueError("SpaceSaving capacity must be at least 1")
+        self.capacity = capacity
+
+        # word -> count, in the order the words were tracked
+        self.counts = {}
+        self.errors = {}
+
+        # Min heap of (count, word), one entry per tracked word.
+        # Counts are not updated in the heap when a word is seen
+        # again, entries are refreshed when they reach the top
+        self._heap = []
+
+    def add(self, word, count=1):
+        """
+        Count a word
+
+        :param word: String
+        :param count: Number of occurrences
+        :return: The word evicted to make room, or None
+        """
+        current = self.counts.get(word)
+        if current is not None:
+            self.counts[word] = current + count
+            return None
+
+        evicted = None
+        error = 0
+        if len(self.counts) >= self.capacity:
+            evicted, error = self._pop_min()
+
+        self.counts[word] = error + count
+        self.errors[word] = error
+        heapq.heappush(self._heap, (error + count, word))
+        return evicted
+
+    def _pop_min(self):
+        """
+        Removes the tracked word with the lowest count
+
+        :return: (word, count)
+        """
+        while True:
+            count, word = heapq.heappop(self._heap)
+            current = self.counts[word]
+            if current == count:
+                del self.counts[word]
+                del self.errors[word]
+                return word, count
+            heapq.heappush(self._heap, (current, word))
+
+    @classmethod
+    def from_counts(cls, counts, capacity, errors=None):
+        """
+        Build a counter from existing counts, keeping the capacity
+        most frequent words, for example to merge two counters
+
+        :param counts: Dict of word -> count
+        :param capacity: Maximum number of words tracked
+        :param errors: Optional dict of word -> error
+        :return: SpaceSaving
+        """
+        counter = cls(capacity)
+        kept = counts
+        if len(counts) > capacity:
+            kept = set(word for word, count in top_k(counts, capacity))
+
+        errors = errors or {}
+        for word, count in counts.items():
+            if word in kept:
+                counter.counts[word] = count
+                counter.errors[word] = errors.get(word, 0)
+        counter._heap = [(count, word) for word, count in counter.counts.items()]
+        heapq.heapify(counter._heap)
+        return counter
@@ -0,0 +1,82 @@
+"""
+Shared fixtures of the tests: small synthetic logs generated
+with benchmark/generate.py, the extract function of their
+format, and the conversation analysed from them the default
+way (one process, whole files), which the other ways of
+loading and analysing the logs are compared against.
+"""
+
+import os.path
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmark"))
+
+import pytest
+
+import generate
+from src import conversation
+
+
+def extract(line):
+    """extract function of the generated logs, see Conversation"""
+    if line.startswith("--") or not line:
+        return False
+    return [line.split("<")[1].split(">")[0], line.split("> ")[1], line.split(" ")[0], line]
+
+
+def unique_epochs(messages):
+    """
+    Returns the messages whose timestamp is not shared by another
+    message, so the order of the messages does not depend on how
+    ties are broken (see BasicAnalyser.merge)
+
+    :param messages: Iterable of messages, sorted
+    :return: Array of messages
+    """
+    messages = list(messages)
+    return [message for i, message in enumerate(messages)
+            if (i == 0 or messages[i - 1].epoch != message.epoch)
+            and (i == len(messages) - 1 or messages[i + 1].epoch != message.epoch)]
+
+
+def analysis_dict(c):
+    """
+    Returns the statistics of a conversation as a dict, without
+    the random quotes which are sampled differently on every run
+
+    :param c: Conversation
+    :return: dict
+    """
+    users = {}
+    for name, user in c.persons.items():
+        users[name] = user.to_dict()
+        users[name].pop("random_quote")
+    return {"analysis": c.analysis.to_dict(), "users": users, "messages": [str(m) for m in c.messages]}
+
+
+@pytest.fixture(scope="session")
+def log_dir(tmp_path_factory):
+    """Directory of 3 months of logs of 6 users, one file per month"""
+    directory = str(tmp_path_factory.mktemp("logs"))
+    generate.generate(directory, users=6, messages_per_day=20, years=0.25, url_rate=0.2, vocabulary=300, seed=1)
+    return directory
+
+
+@pytest.fixture(scope="session")
+def logs(log_dir):
+    """Glob of the generated logs"""
+    return os.path.join(log_dir, "chat-*.txt")
+
+
+@pytest.fixture(scope="session")
+def baseline(logs):
+    """Conversation of the generated logs, analysed the default way"""
+    return conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python")
+
+
+@pytest.fixture(scope="session")
+def baseline_dict(baseline):
+    """analysis_dict of the baseline conversation"""
+    return analysis_dict(baseline)
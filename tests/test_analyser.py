@@ -0,0 +1,92 @@
+"""
+Tests of BasicAnalyser merging and state, against
+a single analyser of the same messages
+"""
+
+import itertools
+
+from conftest import unique_epochs
+from src import analyser
+from src import conversation
+
+
+def shards(messages, count):
+    """Splits messages into count shards of consecutive messages"""
+    size = len(messages) // count + 1
+    return [messages[i:i + size] for i in range(0, len(messages), size)]
+
+
+def test_merge_matches_single_pass(baseline):
+    messages = unique_epochs(baseline.messages)
+    expected = analyser.BasicAnalyser(messages).to_dict()
+
+    parts = [analyser.BasicAnalyser(part) for part in shards(messages, 4)]
+    assert analyser.merge(parts).to_dict() == expected
+    assert analyser.merge(reversed(parts)).to_dict() == expected
+
+    # Shards that overlap in time, one per user
+    by_user = {}
+    for message in messages:
+        by_user.setdefault(message.username, []).append(message)
+    parts = [analyser.BasicAnalyser(part) for part in by_user.values()]
+    assert analyser.merge(parts).to_dict() == expected
+
+
+def test_merge_is_commutative_and_associative(baseline):
+    messages = unique_epochs(baseline.messages)
+    expected = analyser.BasicAnalyser(messages).to_dict()
+
+    a, b, c = [analyser.BasicAnalyser(messages[i::3]) for i in range(3)]
+    for order in itertools.permutations([a, b, c]):
+        assert analyser.merge(order).to_dict() == expected
+    assert analyser.merge([analyser.merge([a, b]), c]).to_dict() == \
+        analyser.merge([a, analyser.merge([b, c])]).to_dict() == expected
+
+
+def test_merge_keeps_the_order_of_words_seen_at_the_same_time():
+    first = conversation.Message("a", "nede bevisa", "2020-01-01T00:00:00", None)
+    second = conversation.Message("a", "bevisa nede", "2020-01-02T00:00:00", None)
+    expected = analyser.BasicAnalyser([first, second]).word_freq_sorted
+    assert expected == [("nede", 2), ("bevisa", 2)]
+
+    a = analyser.BasicAnalyser([first])
+    b = analyser.BasicAnalyser([second])
+    assert analyser.merge([b, a]).word_freq_sorted == expected
+    assert analyser.BasicAnalyser([second]).merge(a).word_freq_sorted == expected
+
+
+def test_state_round_trip(baseline, tmp_path):
+    messages = list(baseline.messages)
+    half = len(messages) // 2
+    analysis = analyser.BasicAnalyser(messages[:half])
+
+    state = analysis.to_state()
+    assert len(state["day_epochs"]) == analysis.active_days
+
+    path = str(tmp_path / "state.gz")
+    analysis.save(path)
+    restored = analyser.BasicAnalyser.load(path)
+    assert restored.to_dict() == analysis.to_dict()
+
+    # A restored analyser can keep adding messages
+    for message in messages[half:]:
+        restored.add(message)
+    restored.finish()
+    assert restored.to_dict() == analyser.BasicAnalyser(messages).to_dict()
+
+
+def test_daily_series_count_calendar_days(baseline):
+    messages = [conversation.Message("a", "late", "2020-01-01T23:00:00", None),
+                conversation.Message("a", "early", "2020-01-02T01:00:00", None),
+                conversation.Message("a", "again", "2020-01-04T00:30:00", None)]
+    analysis = analyser.BasicAnalyser(messages)
+    assert analysis.days_in_range == 4
+    assert analysis.active_days_all_time == [1, 1, 0, 1]
+    assert analysis.messages_said_all_time == [1, 0, 1]
+
+    # Every series uses the same days, messages_said_all_time
+    # has one entry per day except the last one
+    for analysis in [baseline.analysis] + [user.analysis for user in baseline.persons.values()]:
+        assert len(analysis.active_days_all_time) == analysis.days_in_range
+        assert len(analysis.messages_said_all_time) == analysis.days_in_range - 1
+        assert sum(analysis.messages_said_all_time) == sum(analysis.active_days_all_time[:-1])
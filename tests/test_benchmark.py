@@ -0,0 +1,43 @@
+"""
+Tests of the log generator and of the benchmark stages
+"""
+
+import os
+import tracemalloc
+
+import generate
+import run
+from conftest import extract
+from src import conversation
+from src import profiler
+
+
+def test_generate_is_deterministic(log_dir, tmp_path):
+    paths = generate.generate(str(tmp_path), users=6, messages_per_day=20, years=0.25, url_rate=0.2,
+                              vocabulary=300, seed=1)
+    for path in paths:
+        with open(path, "rb") as generated, open(os.path.join(log_dir, os.path.basename(path)), "rb") as f_obj:
+            assert generated.read() == f_obj.read()
+
+
+def test_run_times_every_stage(logs, baseline):
+    results, count = run.run_once(logs, {"backend": "python"})
+    assert count == len(baseline.messages)
+    assert sorted(results) == sorted(run.STAGES)
+    assert all(result["seconds"] >= 0 and "peak_bytes" not in result for result in results.values())
+
+    tracemalloc.start()
+    try:
+        results, count = run.run_once(logs, {"backend": "python"})
+    finally:
+        tracemalloc.stop()
+    assert all(result["peak_bytes"] >= 0 for result in results.values())
+
+
+def test_profiler_without_callbacks(logs):
+    profile = profiler.Profiler(callbacks=False)
+    c = conversation.Conversation(logs, extract, backend="python", profiler=profile)
+    assert c.extract is extract
+    stages = profile.to_dict()
+    assert "extract" not in stages
+    assert stages["load"]["runs"] == stages["sort"]["runs"] == stages["analyse"]["runs"] == 1
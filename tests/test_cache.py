@@ -0,0 +1,108 @@
+"""
+Tests of the message cache and of the identity of
+the extract functions it is invalidated with
+"""
+
+import os
+import subprocess
+import sys
+
+from conftest import ROOT, analysis_dict, extract
+from src import cache
+from src import conversation
+
+
+def make_extract(separator, strip=True):
+    def extract_with(line):
+        parts = line.split(separator)
+        return [part.strip() if strip else part for part in parts]
+    return extract_with
+
+
+def make_extract_defaults(separator=">"):
+    def extract_with(line, separator=separator):
+        return line.split(separator)
+    return extract_with
+
+
+def test_function_identity_includes_closures_and_defaults():
+    identity = cache.function_identity
+    assert identity(make_extract(">")) == identity(make_extract(">"))
+    assert identity(make_extract(">")) != identity(make_extract("<"))
+    assert identity(make_extract(">")) != identity(make_extract(">", strip=False))
+
+    assert identity(make_extract_defaults()) == identity(make_extract_defaults())
+    assert identity(make_extract_defaults()) != identity(make_extract_defaults("<"))
+    assert identity(extract) == identity(extract)
+
+
+def test_function_identity_includes_nested_functions():
+    def outer(key):
+        return lambda line: line.split(key)
+
+    def other(key):
+        return lambda line: line.rsplit(key)
+
+    assert cache.function_identity(outer) != cache.function_identity(other)
+    assert cache.function_identity(outer(">")) != cache.function_identity(outer("<"))
+
+
+def test_function_identity_of_recursive_closures():
+    def make():
+        def recurse(line):
+            return recurse(line[1:]) if line else []
+        return recurse
+
+    assert cache.function_identity(make()) == cache.function_identity(make())
+
+
+# Prints the identity of functions using sets, whose order
+# depends on the hash seed of the process
+IDENTITY_SCRIPT = """
+from src import cache
+
+
+def extract(line):
+    if line[:1] in {"-", "#", "*", "!"}:
+        return False
+    return line.split(" ", 2)
+
+
+def make(markers=frozenset(["-", "#"]), names=("a", {"b", "c", "d"})):
+    return lambda line: line[:1] in markers and line not in names[1]
+
+
+print(cache.function_identity(extract), cache.function_identity(make()))
+"""
+
+
+def test_function_identity_does_not_depend_on_the_hash_seed():
+    identities = set()
+    for seed in ["0", "1", "2", "3"]:
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        identities.add(subprocess.check_output([sys.executable, "-c", IDENTITY_SCRIPT], cwd=ROOT, env=env))
+    assert len(identities) == 1
+
+
+def test_stable_repr():
+    assert cache.stable_repr(frozenset(["b", "a", "c"])) == "frozenset({'a', 'b', 'c'})"
+    assert cache.stable_repr(({2, 1}, [frozenset([3])], {"k": (1,)})) == \
+        "(set({1, 2}), [frozenset({3})], {'k': (1,)})"
+    assert cache.stable_repr("text") == repr("text")
+
+
+def test_cached_conversation_matches_baseline(logs, baseline_dict, tmp_path):
+    directory = str(tmp_path / "cache")
+    first = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python",
+                                      cache_dir=directory)
+    assert analysis_dict(first) == baseline_dict
+    entries = os.listdir(directory)
+    assert len(entries) == len(first.files)
+
+    for path in first.files:
+        assert first.cache.load(path, first.parser_identity) is not None
+
+    second = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python",
+                                       cache_dir=directory)
+    assert analysis_dict(second) == baseline_dict
+    assert sorted(os.listdir(directory)) == sorted(entries)
@@ -0,0 +1,114 @@
+"""
+Tests of checkpoints and refresh: a conversation restored from a
+checkpoint and refreshed must match the baseline conversation
+"""
+
+import glob
+import os
+import shutil
+
+from conftest import analysis_dict, extract
+from src import conversation
+
+
+def copy_logs(logs, directory):
+    """Copies the logs to a directory, returns the paths of the copies in order"""
+    paths = []
+    for path in sorted(glob.glob(logs)):
+        paths.append(shutil.copy(path, directory))
+    return paths
+
+
+def load(directory, checkpoint):
+    return conversation.Conversation(os.path.join(directory, "chat-*.txt"), extract, name_map={"user5": "user4"},
+                                     backend="python", checkpoint=checkpoint)
+
+
+def test_checkpoint_resumes_with_appended_lines(logs, baseline_dict, tmp_path):
+    paths = copy_logs(logs, str(tmp_path))
+    checkpoint = str(tmp_path / "checkpoint.gz")
+
+    # Start with half of the last file, cut before a line break
+    with open(paths[-1], "rb") as f_obj:
+        data = f_obj.read() + b"\n"
+    cut = data.index(b"\n", len(data) // 2)
+    with open(paths[-1], "wb") as f_obj:
+        f_obj.write(data[:cut])
+    first = load(str(tmp_path), checkpoint)
+    with open(checkpoint + ".messages", "rb") as f_obj:
+        saved = f_obj.read()
+
+    with open(paths[-1], "ab") as f_obj:
+        f_obj.write(data[cut:])
+    second = load(str(tmp_path), checkpoint)
+    assert analysis_dict(second) == baseline_dict
+
+    # Only the new messages were appended to the messages file
+    assert len(second.messages) > len(first.messages)
+    assert second.checkpoint_messages["id"] == first.checkpoint_messages["id"]
+    with open(checkpoint + ".messages", "rb") as f_obj:
+        assert f_obj.read(len(saved)) == saved
+
+    assert analysis_dict(load(str(tmp_path), checkpoint)) == baseline_dict
+
+
+def test_checkpoint_rewritten_after_older_messages(logs, baseline_dict, tmp_path):
+    paths = copy_logs(logs, str(tmp_path))
+    checkpoint = str(tmp_path / "checkpoint.gz")
+
+    # The first file appears after the others
+    os.rename(paths[0], paths[0] + ".later")
+    first = load(str(tmp_path), checkpoint)
+    os.rename(paths[0] + ".later", paths[0])
+
+    second = load(str(tmp_path), checkpoint)
+    assert second.checkpoint_messages["id"] != first.checkpoint_messages["id"]
+    assert analysis_dict(second) == baseline_dict
+    assert analysis_dict(load(str(tmp_path), checkpoint)) == baseline_dict
+
+
+def test_refresh_only_parses_complete_lines(logs, tmp_path):
+    paths = copy_logs(logs, str(tmp_path))
+    c = conversation.Conversation(os.path.join(str(tmp_path), "chat-*.txt"), extract, backend="python")
+    count = len(c.messages)
+
+    line = "\n2030-01-01T00:00:00 <user0> a message written in two parts"
+    with open(paths[-1], "a") as f_obj:
+        f_obj.write(line[:30])
+    assert c.refresh() == 0
+
+    with open(paths[-1], "a") as f_obj:
+        f_obj.write(line[30:])
+    # The line is complete once followed by a line break
+    assert c.refresh() == 0
+    with open(paths[-1], "a") as f_obj:
+        f_obj.write("\n")
+    assert c.refresh() == 1
+    assert len(c.messages) == count + 1
+    assert c.messages[-1].content == "a message written in two parts"
+
+
+def test_rest_of_partial_line(logs, tmp_path):
+    paths = copy_logs(logs, str(tmp_path))
+    checkpoint = str(tmp_path / "checkpoint.gz")
+
+    # The files are loaded while a line is being written
+    line = "\n2030-01-01T00:00:00 <user0> a message written in two parts"
+    with open(paths[-1], "a") as f_obj:
+        f_obj.write(line[:40])
+    c = conversation.Conversation(os.path.join(str(tmp_path), "chat-*.txt"), extract, backend="python")
+    load(str(tmp_path), checkpoint)
+    count = len(c.messages)
+    assert c.messages[-1].content == "a message w"
+
+    with open(paths[-1], "a") as f_obj:
+        f_obj.write(line[40:] + "\n")
+    assert c.refresh() == 1
+    assert len(c.messages) == count
+    assert c.messages[-1].content == "a message written in two parts"
+
+    expected = analysis_dict(conversation.Conversation(os.path.join(str(tmp_path), "chat-*.txt"), extract,
+                                                       backend="python"))
+    assert analysis_dict(c) == expected
+    resumed = load(str(tmp_path), checkpoint)
+    assert [str(message) for message in resumed.messages] == [str(message) for message in c.messages]
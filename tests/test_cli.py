@@ -0,0 +1,65 @@
+"""
+Tests of the batch command line, against the
+baseline conversation
+"""
+
+import json
+import os
+
+from src import cli
+
+KILLER = """
+import os
+import signal
+
+
+def extract(line):
+    os.kill(os.getpid(), signal.SIGKILL)
+"""
+
+
+def write_manifest(tmp_path, logs, conversations):
+    with open(str(tmp_path / "killer.py"), "w") as f_obj:
+        f_obj.write(KILLER)
+    path = str(tmp_path / "manifest.json")
+    with open(path, "w") as f_obj:
+        json.dump({
+            "jobs": 2,
+            "defaults": {"path": logs, "parser": "example", "name_map": {"user5": "user4"},
+                         "options": {"backend": "python"}},
+            "conversations": conversations
+        }, f_obj)
+    return path
+
+
+def test_run_jobs(logs, baseline, tmp_path):
+    path = write_manifest(tmp_path, logs, [
+        {"name": "single", "output_dir": "single"},
+        {"name": "workers", "output_dir": "workers", "options": {"workers": 2}},
+        {"name": "killed", "output_dir": "killed", "parser": "killer:extract"},
+        {"name": "missing", "output_dir": "missing", "parser": "killer:missing"}
+    ])
+    summary = str(tmp_path / "summary.json")
+    assert cli.main([path, "--summary", summary]) == 1
+
+    with open(summary) as f_obj:
+        results = {result["name"]: result for result in json.load(f_obj)["conversations"]}
+    for name in ["single", "workers"]:
+        assert results[name]["status"] == "ok"
+        assert results[name]["messages"] == len(baseline.messages)
+        with open(str(tmp_path / name / "stats.json")) as f_obj:
+            assert json.load(f_obj)["analysis"] == json.loads(json.dumps(baseline.analysis.to_dict()))
+
+    assert results["killed"]["status"] == "killed"
+    assert results["killed"]["error"] == "process killed by signal 9"
+    assert results["missing"]["status"] == "error"
+    assert "AttributeError" in results["missing"]["error"]
+
+
+def test_load_manifest_defaults(logs, tmp_path):
+    path = write_manifest(tmp_path, logs, [{"output_dir": "out", "options": {"keep_raw": False}}])
+    manifest, jobs = cli.load_manifest(path)
+    assert manifest["jobs"] == 2
+    assert jobs[0]["name"] == "conversation-0"
+    assert jobs[0]["options"] == {"backend": "python", "keep_raw": False}
+    assert jobs[0]["output_dir"] == os.path.join(str(tmp_path), "out")
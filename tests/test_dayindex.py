@@ -0,0 +1,69 @@
+"""
+Tests of date range and per person queries, against
+an analyser of the selected messages
+"""
+
+import datetime
+
+import pytest
+
+from conftest import extract
+from src import analyser
+from src import conversation
+from src import store
+from src import timestamps
+
+D = datetime.date
+QUERIES = [
+    (None, None, None),
+    (D(2015, 1, 10), D(2015, 2, 20), None),
+    (D(2015, 2, 1), None, ["user1"]),
+    (None, D(2015, 3, 1), ["user0", "user4", "user3"]),
+    (D(2015, 1, 5), D(2015, 1, 6), ["user2"]),
+    (D(2016, 1, 1), None, None),
+    (D(2015, 3, 1), D(2015, 2, 1), None)
+]
+
+
+def expected(c, start, end, users):
+    selected = []
+    for message in c.messages:
+        day = message.timestamp.date()
+        if (start is None or day >= start) and (end is None or day < end) \
+                and (users is None or c.persons_by_username[message.username].name in users):
+            selected.append(message)
+    return analyser.BasicAnalyser(selected, word_capacity=c.word_capacity,
+                                  url_sample_size=c.url_sample_size).to_dict()
+
+
+def check_queries(c):
+    for start, end, users in QUERIES:
+        assert c.slice(start, end, users).to_dict() == expected(c, start, end, users)
+
+
+@pytest.mark.parametrize("index_days", [False, True])
+def test_slice_matches_analyser(logs, index_days):
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, index_days=index_days)
+    assert (c.day_index is not None) == index_days
+    check_queries(c)
+    # From the cache
+    check_queries(c)
+
+
+@pytest.mark.parametrize("index_days", [False, True])
+def test_slice_after_new_messages(logs, index_days):
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, index_days=index_days)
+    c.slice()
+
+    messages = store.MessageStore()
+    last = c.messages.epochs[-1]
+    for i in range(5):
+        messages.append("user1", "new message lol http://example.com/{}".format(i),
+                        last + i * timestamps.SECONDS_PER_HOUR * 10)
+    c.add_messages(messages)
+    check_queries(c)
+
+
+def test_slice_unknown_user(baseline):
+    with pytest.raises(KeyError):
+        baseline.slice(users=["nobody"])
@@ -0,0 +1,42 @@
+"""
+Tests of the single pass analysis, against analysing the
+messages of the conversation and of every person separately
+"""
+
+from conftest import extract
+from src import analyser
+from src import conversation
+from src import person
+
+
+def test_global_analysis_matches_separate(baseline):
+    expected = analyser.BasicAnalyser(list(baseline.messages))
+    assert baseline.analysis.to_dict() == expected.to_dict()
+
+
+def test_person_analysis_matches_separate(baseline):
+    names = {}
+    for message in baseline.messages:
+        names.setdefault(baseline.name_map.get(message.username, message.username), []).append(message)
+    assert sorted(baseline.persons) == sorted(names)
+
+    for name, user in baseline.persons.items():
+        assert [str(message) for message in user.messages] == [str(message) for message in names[name]]
+        assert user.analysis.to_dict() == analyser.BasicAnalyser(names[name]).to_dict()
+
+
+def test_person_built_from_messages_matches(baseline):
+    for name, user in baseline.persons.items():
+        rebuilt = person.Person(name, list(user.messages))
+        assert rebuilt.analysis.to_dict() == user.analysis.to_dict()
+        assert rebuilt.common_responses == user.common_responses
+
+
+def test_persons_without_messages_match(logs, baseline):
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python",
+                                  keep_person_messages=False)
+    for name, user in baseline.persons.items():
+        other = c.persons[name]
+        assert len(other.messages) == 0
+        assert other.analysis.to_dict() == user.analysis.to_dict()
+        assert other.common_responses == list(dict.fromkeys(user.common_responses))
@@ -0,0 +1,94 @@
+"""
+Tests of the statistics against golden output written by the first
+release of chat-stats (the first commit of the repository) on the logs
+of the log_dir fixture, with name_map={"user5": "user4"}. The random
+quotes are left out, and the lists of messages are stored as the
+sha256 of their lines joined with "\n".
+
+The first release counted the daily series in 24 hour periods from the
+time of the first message. They now count calendar days, so they are
+checked against the calendar days of the messages instead.
+"""
+
+import collections
+import hashlib
+import json
+import os.path
+
+import pytest
+
+from conftest import analysis_dict, extract
+from src import conversation
+
+GOLDEN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "golden_stats.json")
+
+# Keys of the daily series, in the analysis and in the users
+DAILY_ANALYSIS_KEYS = ["days_in_range", "active_days_all_time", "messages_said_all_time"]
+DAILY_USER_KEYS = ["messages_all_time"]
+
+
+def digest(lines):
+    return hashlib.sha256("\n".join(lines).encode("utf8")).hexdigest()
+
+
+def without_daily_series(stats):
+    """Returns the JSON of the statistics without the daily series,
+       and with the messages replaced by their digest"""
+    stats = json.loads(json.dumps(stats))
+    if isinstance(stats["messages"], list):
+        stats["messages"] = digest(stats["messages"])
+    for analysis in [stats["analysis"]] + [user["analysis"] for user in stats["users"].values()]:
+        for key in DAILY_ANALYSIS_KEYS:
+            analysis.pop(key)
+    for user in stats["users"].values():
+        if isinstance(user["messages"], list):
+            user["messages"] = digest(user["messages"])
+        for key in DAILY_USER_KEYS:
+            user.pop(key)
+    return stats
+
+
+def calendar_series(days):
+    """
+    Returns the daily series of messages said on the given
+    days, see BasicAnalyser
+
+    :param days: Day index of each message
+    :return: (days_in_range, active_days_all_time, messages_said_all_time)
+    """
+    counts = collections.Counter(days)
+    active = sorted(counts)
+    said = []
+    for previous, day in zip(active, active[1:]):
+        said += [0] * (day - previous - 1) + [counts[previous]]
+    return active[-1] - active[0] + 1, [counts[day] for day in range(active[0], active[-1] + 1)], said
+
+
+@pytest.fixture(scope="module")
+def golden():
+    with open(GOLDEN, encoding="utf8") as f_obj:
+        return json.load(f_obj)
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_statistics_match_first_release(logs, golden, backend):
+    if backend == "numpy":
+        pytest.importorskip("numpy")
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend=backend)
+    stats = analysis_dict(c)
+    assert without_daily_series(stats) == without_daily_series(golden)
+
+    first_day = c.messages[0].day
+    analysers = [(stats["analysis"], c.messages)] + [(stats["users"][name]["analysis"], user.messages)
+                                                    for name, user in c.persons.items()]
+    for analysis, messages in analysers:
+        assert [analysis[key] for key in DAILY_ANALYSIS_KEYS] == \
+            list(calendar_series([message.day for message in messages]))
+
+    for name, user in c.persons.items():
+        counts = collections.Counter(message.day for message in user.messages)
+        active = sorted(counts)
+        expected = [0] * stats["analysis"]["days_in_range"]
+        for previous, day in zip(active, active[1:]):
+            expected[day - first_day] = counts[previous]
+        assert stats["users"][name]["messages_all_time"] == expected
@@ -0,0 +1,73 @@
+"""
+Tests of the vectorized time statistics, against the
+statistics computed message by message
+"""
+
+import random
+
+import pytest
+
+from conftest import analysis_dict, extract
+from src import analyser
+from src import conversation
+from src import histograms
+from src import store
+from src import timestamps
+
+numpy = pytest.importorskip("numpy")
+
+KEYS = ["days_in_range", "active_days", "active_hours", "active_days_of_week", "active_weekly_hours",
+        "active_days_all_time", "messages_said_all_time", "most_messages_said"]
+
+
+def test_numpy_backend_matches_baseline(logs, baseline_dict):
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="numpy")
+    assert analysis_dict(c) == baseline_dict
+
+
+def test_numpy_backend_after_new_messages(logs):
+    results = []
+    for backend in ["python", "numpy"]:
+        c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend=backend)
+        last = c.messages.epochs[-1]
+        for hours in [[1, 30, 31], [200, 200]]:
+            messages = store.MessageStore()
+            for i, hour in enumerate(hours):
+                messages.append("user{}".format(i), "message {}".format(hour),
+                                last + hour * timestamps.SECONDS_PER_HOUR)
+            c.add_messages(messages)
+        results.append(analysis_dict(c))
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_compute_matches_analyser(seed):
+    rng = random.Random(seed)
+    messages = store.MessageStore()
+    for i in range(rng.randint(1, 300)):
+        messages.append("user{}".format(rng.randrange(5)), "",
+                        rng.randrange(40 * timestamps.SECONDS_PER_DAY) - 10 * timestamps.SECONDS_PER_DAY)
+    messages.sort()
+    # Group of each user id, user1 and user2 are in the same group
+    groups = [[0, 1, 1, 2, 3][int(username[4:])] for username in messages.usernames]
+
+    total, statistics = histograms.compute(messages.epochs, messages.user_ids, groups, 5)
+    assert len(statistics) == 5
+    for stats, group in [(total, None)] + list(zip(statistics, range(5))):
+        group_messages = [message for message in messages
+                          if group is None or groups[messages.user_index[message.username]] == group]
+        if not group_messages:
+            assert stats.active_days == 0
+            continue
+        expected = analyser.BasicAnalyser(group_messages)
+        for key in KEYS:
+            assert getattr(stats, key) == getattr(expected, key), key
+        assert stats.most_active_epoch == expected.most_active_epoch
+
+
+def test_use_numpy():
+    assert histograms.use_numpy("numpy")
+    assert histograms.use_numpy("auto")
+    assert not histograms.use_numpy("python")
+    with pytest.raises(ValueError):
+        histograms.use_numpy("fortran")
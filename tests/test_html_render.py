@@ -0,0 +1,73 @@
+"""
+Tests of the HTML report: written section by section,
+and in compact and lazy modes, against the default page
+"""
+
+import datetime
+import io
+import json
+
+import pytest
+
+from src import html_render
+
+
+def stats_block(page):
+    start = page.index("var STATS = ") + len("var STATS = ")
+    return json.loads(page[start:page.index(";\n", start)].replace("<\\/", "</"))
+
+
+@pytest.mark.parametrize("compact,lazy", [(False, False), (True, False), (False, True), (True, True)])
+def test_render_to_matches_render(baseline, compact, lazy):
+    f_obj = io.StringIO()
+    baseline.write_html(f_obj, compact, lazy)
+    assert f_obj.getvalue() == baseline.generate_html(compact, lazy) == html_render.render(baseline, compact, lazy)
+
+
+def test_default_page(baseline):
+    page = baseline.generate_html()
+    assert "var STATS = " not in page
+    assert html_render.LAZY_SCRIPT not in page
+    for user in baseline.persons.values():
+        assert str(user.messages_all_time) in page
+        assert str(user.analysis.active_weekly_hours) in page
+
+
+def test_compact_data(baseline):
+    page = baseline.generate_html(compact=True)
+    default = baseline.generate_html()
+    assert len(page) < len(default)
+    assert page.count("Plotly.newPlot") == default.count("Plotly.newPlot")
+
+    stats = stats_block(page)
+    start = datetime.datetime.strptime(stats["start"], "%Y-%m-%d")
+    assert html_render.generate_date_range(baseline.analysis.first_message_timestamp,
+                                           baseline.analysis.days_in_range) == \
+        [str((start + datetime.timedelta(days=i)).date()) for i in range(stats["days"])]
+
+    assert len(stats["persons"]) == len(baseline.persons)
+    for data, user in zip(stats["persons"], baseline.persons.values()):
+        days = [0] * stats["days"]
+        for i, value in zip(*data["days"]):
+            days[i] = value
+        assert days[:len(user.messages_all_time)] == user.messages_all_time
+        assert not any(days[len(user.messages_all_time):])
+        assert data["daysOfWeek"] == user.analysis.active_days_of_week
+        assert data["hours"] == user.analysis.active_hours
+        assert data["weeklyHours"] == user.analysis.active_weekly_hours
+
+
+def test_sparse_series():
+    assert html_render.sparse_series([0, 3, 0, 0, 1]) == [[1, 4], [3, 1]]
+    assert html_render.sparse_series([]) == [[], []]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_lazy_page(baseline, compact):
+    page = baseline.generate_html(compact, lazy=True)
+    default = baseline.generate_html(compact)
+    assert page.count(html_render.LAZY_SCRIPT) == 1
+    assert page.count("Plotly.newPlot") == default.count("Plotly.newPlot")
+    assert page.count("<details>") == len(baseline.persons)
+    for name in baseline.persons:
+        assert page.count("statsLazy(" + json.dumps(name) + ", function () {") == 1
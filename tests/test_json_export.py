@@ -0,0 +1,76 @@
+"""
+Tests of the streamed JSON export, against json.dumps
+of the statistics of the baseline conversation
+"""
+
+import io
+import json
+
+from conftest import extract
+from src import conversation
+from src import json_export
+
+
+def expected_value(c):
+    return {
+        "analysis": c.analysis.to_dict(),
+        "users": {name: user.to_dict() for name, user in c.persons.items()},
+        "messages": [str(message) for message in c.messages]
+    }
+
+
+def export(c, format="pretty", messages="all"):
+    f_obj = io.StringIO()
+    json_export.write_json(c, f_obj, format, messages)
+    return f_obj.getvalue()
+
+
+def test_pretty_and_compact_match_json_dumps(baseline):
+    value = expected_value(baseline)
+    assert baseline.generate_json() == json.dumps(value, sort_keys=True, indent=4)
+    assert export(baseline, "compact") == json.dumps(value, sort_keys=True, separators=(",", ":"))
+
+
+def test_messages_once_and_none(baseline):
+    value = json.loads(json.dumps(expected_value(baseline)))
+    for user in value["users"].values():
+        user.pop("messages")
+
+    once = json.loads(export(baseline, "compact", "once"))
+    assert once["users"] == value["users"]
+    assert [" ".join(message[:2]) + ": " + message[2] for message in once["messages"]] == \
+        [str(message).replace(message.username, baseline.persons_by_username[message.username].name, 1)
+         for message in baseline.messages]
+
+    value.pop("messages")
+    assert json.loads(export(baseline, "pretty", "none")) == value
+
+
+def test_ndjson(baseline):
+    value = json.loads(json.dumps(expected_value(baseline)))
+    lines = [json.loads(line) for line in export(baseline, "ndjson").splitlines()]
+    assert lines[0] == {"type": "analysis", "analysis": value["analysis"]}
+    users = lines[1:1 + len(baseline.persons)]
+    assert {line["name"]: line["user"] for line in users} == value["users"]
+    assert [line["message"] for line in lines[1 + len(users):]] == value["messages"]
+
+
+def test_object_marker():
+    expected = {"b": {"a": 1, "c": [1, {"x": 2}]}, "a": {}}
+    for indent, separators in [(None, (",", ":")), (4, (",", ": "))]:
+        value = {"b": json_export.Object(iter([("a", 1), ("c", json_export.Stream(iter([1, {"x": 2}])))])),
+                 "a": json_export.Object([])}
+        assert "".join(json_export.iter_json(value, indent, separators)) == \
+            json.dumps(expected, sort_keys=True, indent=indent, separators=separators)
+
+
+def test_persons_without_messages(logs):
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python",
+                                  keep_person_messages=False)
+    value = json.loads(export(c))
+    assert len(value["messages"]) == len(c.messages)
+    for name, user in value["users"].items():
+        assert "messages" not in user
+        assert user == json.loads(json.dumps(c.persons[name].to_dict()))
+    assert [json.loads(line)["user"] for line in export(c, "ndjson").splitlines()[1:1 + len(c.persons)]] == \
+        [value["users"][name] for name in c.persons]
@@ -0,0 +1,51 @@
+"""
+Tests of the phrase matcher, against checking every
+phrase with the in operator
+"""
+
+import random
+
+import pytest
+
+from src import data
+from src import matcher
+
+PHRASES = ["lol", "good job", "good one", "oh no no", " spaced", "trailing ", "a  b", "?!"]
+
+
+def slow_matches(phrases, text):
+    return any(" " + phrase + " " in " " + text + " " for phrase in phrases)
+
+
+def texts(phrases, count, seed):
+    """Random texts made of words of the phrases and of other words"""
+    rng = random.Random(seed)
+    words = [word for phrase in phrases for word in phrase.split(" ")] + ["", "x", "Lol", "GOOD", "job!", "no"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(0, 8))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("phrases,lowercase", [(data.SWEARS, False), (data.RESPONSES, True),
+                                               (PHRASES, False), (PHRASES, True), ([], False)])
+def test_matches_like_in(phrases, lowercase):
+    compiled = matcher.PhraseMatcher(phrases, lowercase=lowercase)
+    for text in texts(phrases or ["x"], 2000, 1) + ["", " ", "lol", "good  job", "oh no no no", "a  b", "xa  b"]:
+        expected = slow_matches(phrases, text.lower() if lowercase else text)
+        assert compiled.matches(text) == expected, text
+
+
+def test_default_matchers():
+    assert matcher.SWEARS.matches("what the hell")
+    assert not matcher.SWEARS.matches("hello there")
+    assert matcher.RESPONSES.matches("Good Job mate")
+    assert not matcher.RESPONSES.matches("good jobs")
+
+
+def test_findall():
+    compiled = matcher.PhraseMatcher(PHRASES)
+    assert sorted(compiled.findall("lol good job lol oh no no")) == ["good job", "lol", "lol", "oh no no"]
+    assert sorted(compiled.findall("x  spaced ?!")) == [" spaced", "?!"]
+
+
+def test_compile_phrases():
+    assert matcher.compile_phrases(matcher.SWEARS) is matcher.SWEARS
+    assert matcher.compile_phrases(["lol"], lowercase=True).matches("LOL")
@@ -0,0 +1,114 @@
+"""
+Tests of the built-in bulk parsers, against the baseline
+conversation and against small logs of each format
+"""
+
+import ast
+import os.path
+
+import pytest
+
+from conftest import ROOT, analysis_dict
+from src import conversation
+from src import parsers
+from src import reader
+from src import store
+
+EXAMPLE_SCRIPT = os.path.join(ROOT, "example", "example.py")
+
+
+def parse(parser, text, path=None):
+    messages = store.MessageStore()
+    parser.parse(text, messages, path)
+    return [(message.username, message.content, str(message.timestamp)) for message in messages]
+
+
+def test_parser_is_abstract():
+    with pytest.raises(TypeError):
+        parsers.Parser()
+
+    class Incomplete(parsers.Parser):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize("options", [{}, {"chunk_size": 1000}, {"workers": 2, "range_size": 5000},
+                                     {"pipeline": True, "chunk_size": 3000}])
+def test_example_parser_matches_baseline(logs, baseline_dict, options):
+    c = conversation.Conversation(logs, parsers.EXAMPLE, name_map={"user5": "user4"}, backend="python",
+                                  **options)
+    assert analysis_dict(c) == baseline_dict
+
+
+def reference_extract():
+    """Returns the extract function of example/example.py, without running the script"""
+    with open(EXAMPLE_SCRIPT, encoding="utf8") as f_obj:
+        tree = ast.parse(f_obj.read())
+    node = next(node for node in tree.body if isinstance(node, ast.FunctionDef) and node.name == "extract")
+    namespace = {}
+    exec(compile(ast.Module(body=[node], type_ignores=[]), EXAMPLE_SCRIPT, "exec"), namespace)
+    return namespace["extract"]
+
+
+def test_example_parser_matches_example_script():
+    with open(os.path.join(ROOT, "example", "sample_conversation.txt"), encoding="utf8") as f_obj:
+        text = f_obj.read()
+    text += "\n".join([
+        "",
+        "2018-03-27T10:00:00 <Alice> quoting> with a break> and more",
+        "2018-03-27T10:01:00 <Bob> a <b> tag",
+        "2018-03-27T10:02:00 <Carl> ends with>",
+        "2018-03-27T10:03:00 <Alice> ",
+        "2018-03-27T10:04:00 <Bob> 1 >2 and 3>  4"
+    ])
+
+    expected = store.MessageStore()
+    conversation.parse_text(text, reference_extract(), reader.split_text, expected)
+    messages = store.MessageStore()
+    parsers.EXAMPLE.parse(text, messages)
+    assert [(message.username, message.content, message.epoch, message.raw) for message in messages] == \
+        [(message.username, message.content, message.epoch, message.raw) for message in expected]
+
+
+def test_irc_parser():
+    text = "[12:00:01] <@alice> hello\r\n" \
+           "[12:00:05] *** Joins: bob (bob@host)\r\n" \
+           "[12:01:00] * bob waves\r\n" \
+           "[12:02:00] <+bob> hi <3\r\n"
+    assert parse(parsers.IRC, text, "logs/2019-01-31.log") == [
+        ("alice", "hello", "2019-01-31 12:00:01"),
+        ("bob", "hi <3", "2019-01-31 12:02:00")
+    ]
+    assert parse(parsers.IrcParser(actions=True), text, "logs/20190131.log")[1] == \
+        ("bob", "* waves", "2019-01-31 12:01:00")
+    assert parse(parsers.IRC, "[2020-02-01 08:00] <carol> dated\n") == [("carol", "dated", "2020-02-01 08:00:00")]
+    with pytest.raises(ValueError):
+        parse(parsers.IRC, text, "logs/channel.log")
+
+
+def test_whatsapp_parser():
+    android = "12/31/19, 9:41 PM - Messages are end-to-end encrypted.\n" \
+              "12/31/19, 9:41 PM - Alice: first line\n" \
+              "second line\n" \
+              "1/1/20, 12:05 AM - Bob: happy new year\n"
+    assert parse(parsers.WHATSAPP, android) == [
+        ("Alice", "first line\nsecond line", "2019-12-31 21:41:00"),
+        ("Bob", "happy new year", "2020-01-01 00:05:00")
+    ]
+
+    ios = "[31/12/2019, 21:41:05] Alice: hello\n[01/01/2020, 00:00:10] Bob: hi\n"
+    assert parse(parsers.PARSERS["whatsapp-dayfirst"], ios) == [
+        ("Alice", "hello", "2019-12-31 21:41:05"),
+        ("Bob", "hi", "2020-01-01 00:00:10")
+    ]
+
+
+def test_parse_chunks_splits_on_messages():
+    text = "12/31/19, 9:41 PM - Alice: first line\nsecond line\nthird line\n1/1/20, 12:05 AM - Bob: hi\n"
+    expected = parse(parsers.WHATSAPP, text)
+    for size in [1, 7, 20, len(text)]:
+        messages = store.MessageStore()
+        parsers.WHATSAPP.parse_chunks([text[i:i + size] for i in range(0, len(text), size)], messages)
+        assert [(message.username, message.content, str(message.timestamp)) for message in messages] == expected
@@ -0,0 +1,75 @@
+"""
+Tests of the ingest pipeline, and of conversations loaded
+through it against the baseline conversation
+"""
+
+import threading
+import time
+
+import pytest
+
+from conftest import analysis_dict, extract
+from src import conversation
+from src import pipeline
+
+
+def double(items):
+    for item in items:
+        yield item * 2
+
+
+def pairs(items):
+    items = iter(items)
+    for item in items:
+        yield (item, next(items, None))
+
+
+def test_run_keeps_order():
+    assert list(pipeline.run(range(100))) == list(range(100))
+    assert list(pipeline.run(range(5), [double, pairs], queue_size=1)) == [(0, 2), (4, 6), (8, None)]
+    assert list(pipeline.run([], [double])) == []
+
+
+def test_run_raises_stage_errors():
+    def fail(items):
+        for item in items:
+            if item == 4:
+                raise KeyError(item)
+            yield item
+
+    with pytest.raises(KeyError):
+        list(pipeline.run(range(10), [double, fail, double]))
+    with pytest.raises(ZeroDivisionError):
+        list(pipeline.run(1 // item for item in [1, 0]))
+
+
+def test_run_backpressure():
+    produced = []
+
+    def source():
+        for i in range(1000):
+            produced.append(i)
+            yield i
+
+    items = pipeline.run(source(), [double], queue_size=2)
+    assert next(items) == 0
+    time.sleep(0.3)
+    # Two queues of 2 items, and one item held by each thread
+    assert len(produced) <= 8
+
+    before = threading.active_count()
+    items.close()
+    assert threading.active_count() < before
+    assert len(produced) < 1000
+
+
+@pytest.mark.parametrize("options", [{}, {"chunk_size": 500, "queue_size": 1}, {"chunk_size": 1}])
+def test_pipeline_matches_baseline(logs, baseline_dict, options):
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python", pipeline=True,
+                                  **options)
+    assert analysis_dict(c) == baseline_dict
+
+
+def test_pipeline_without_workers(logs):
+    with pytest.raises(ValueError):
+        conversation.Conversation(logs, extract, pipeline=True, workers=2)
@@ -0,0 +1,106 @@
+"""
+Tests of the profiler, and of a conversation
+analysed with one against the baseline
+"""
+
+import json
+import time
+import tracemalloc
+
+import pytest
+
+from conftest import analysis_dict, extract
+from src import cache
+from src import conversation
+from src import profiler
+
+
+def test_conversation_stages(logs, baseline, baseline_dict):
+    records = []
+    profile = profiler.Profiler()
+    profile.subscribe(records.append)
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python", profiler=profile)
+    assert analysis_dict(c) == baseline_dict
+    assert cache.function_identity(c.extract) == cache.function_identity(extract)
+
+    stages = profile.to_dict()
+    for name in ["load", "sort", "analyse_messages", "finish_analysis", "analyse"]:
+        assert stages[name]["runs"] == 1
+        assert stages[name]["wall"] >= 0 and stages[name]["cpu"] >= 0
+    assert stages["load"]["counts"]["messages"] == stages["analyse_messages"]["counts"]["messages"] == \
+        len(baseline.messages)
+    assert stages["extract"]["counts"]["calls"] == stages["extract_messages"]["counts"]["items"]
+    assert stages["analyse"]["wall"] >= stages["analyse_messages"]["wall"]
+    assert sorted(set(record.name for record in records)) == sorted(name for name in stages if stages[name]["runs"])
+    assert all("peak_bytes" not in stage for stage in stages.values())
+
+
+def test_stage_counts_and_nesting():
+    profile = profiler.Profiler()
+    for i in range(3):
+        with profile.stage("outer") as outer:
+            outer.count(items=2)
+            with profile.stage("inner") as inner:
+                inner.count(items=1, bytes=10)
+                time.sleep(0.01)
+
+    stages = profile.to_dict()
+    assert stages["outer"]["runs"] == stages["inner"]["runs"] == 3
+    assert stages["outer"]["counts"] == {"items": 6}
+    assert stages["inner"]["counts"] == {"items": 3, "bytes": 30}
+    assert stages["outer"]["wall"] >= stages["inner"]["wall"] >= 0.03
+
+    # The stage is recorded even if it raises
+    with pytest.raises(KeyError):
+        with profile.stage("failing"):
+            raise KeyError()
+    assert profile.to_dict()["failing"]["runs"] == 1
+
+
+def test_memory_peaks():
+    tracing = tracemalloc.is_tracing()
+    profile = profiler.Profiler(memory=True)
+    try:
+        with profile.stage("outer"):
+            with profile.stage("inner"):
+                data = bytearray(1000000)
+                del data
+            with profile.stage("small"):
+                data = bytearray(10)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    stages = profile.to_dict()
+    assert stages["inner"]["peak_bytes"] >= 1000000
+    assert stages["small"]["peak_bytes"] < 1000000
+    assert stages["outer"]["peak_bytes"] >= stages["inner"]["peak_bytes"]
+
+
+def test_wrap():
+    profile = profiler.Profiler()
+    wrapped = profile.wrap("double", lambda x: x * 2)
+    assert [wrapped(i) for i in range(4)] == [0, 2, 4, 6]
+    assert profiler.unwrap(wrapped) is wrapped.func
+    assert profiler.unwrap(extract) is extract
+
+    lines = profile.wrap("lines", lambda text: iter(text.split("\n")), stream=True)
+    assert list(lines("a\nb\nc")) == ["a", "b", "c"]
+
+    stages = profile.to_dict()
+    assert stages["double"]["counts"] == {"calls": 4}
+    assert stages["lines"]["counts"] == {"calls": 1, "items": 3}
+    assert stages["double"]["runs"] == 0
+
+
+def test_write_and_null_stage(tmp_path):
+    with profiler.stage(None, "nothing") as record:
+        record.count(items=1)
+
+    profile = profiler.Profiler()
+    with profiler.stage(profile, "something") as record:
+        record.count(items=1)
+    path = str(tmp_path / "profile.json")
+    profile.write(path)
+    with open(path) as f_obj:
+        assert json.load(f_obj) == {"stages": profile.to_dict()}
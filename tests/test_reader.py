@@ -0,0 +1,48 @@
+"""
+Tests of chunked reading, against reading and
+splitting whole files
+"""
+
+import io
+
+import pytest
+
+from conftest import analysis_dict, extract
+from src import conversation
+from src import reader
+
+TEXT = "first line\nsecond line é\n\nthird line\r\nlast line without break"
+
+
+def chunks_of(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("text", [TEXT, TEXT + "\n", "", "\n", "no break"])
+def test_split_lines_matches_split(text):
+    for size in [1, 2, 5, 11, len(text) + 1]:
+        assert list(reader.split_lines(chunks_of(text, size))) == text.split("\n")
+
+
+def test_read_chunks():
+    chunks = list(reader.read_chunks(io.StringIO(TEXT), 7))
+    assert "".join(chunks) == TEXT
+    assert all(len(chunk) <= 7 for chunk in chunks)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1024])
+def test_last_line_start(tmp_path, monkeypatch, chunk_size):
+    monkeypatch.setattr(reader, "DEFAULT_CHUNK_SIZE", chunk_size)
+    path = str(tmp_path / "log.txt")
+    for data in [TEXT.encode("utf8"), b"ab\n", b"no break", b"", b"\n" + b"x" * 10]:
+        with open(path, "wb") as f_obj:
+            f_obj.write(data)
+        assert reader.last_line_start(path, len(data)) == data.rfind(b"\n") + 1
+        assert reader.last_line_start(path, 2) == data.rfind(b"\n", 0, 2) + 1
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100, 4096])
+def test_chunked_conversation_matches_baseline(logs, baseline_dict, chunk_size):
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python",
+                                  chunk_size=chunk_size)
+    assert analysis_dict(c) == baseline_dict
@@ -0,0 +1,110 @@
+"""
+Tests of the reservoir sample, and of the random
+quotes of the persons sampled with it
+"""
+
+import collections
+import random
+
+import pytest
+
+from src import person
+from src import sampling
+from src import store
+from src import tokenizer
+
+
+def sample_counts(runs, make):
+    counts = collections.Counter()
+    for _ in range(runs):
+        counts.update(make().items)
+    return counts
+
+
+@pytest.fixture
+def seeded():
+    state = random.getstate()
+    random.seed(1)
+    yield
+    random.setstate(state)
+
+
+def test_reservoir_is_uniform(seeded):
+    def make():
+        reservoir = sampling.Reservoir(3)
+        for i in range(12):
+            reservoir.add(i)
+        assert reservoir.seen == 12 and len(reservoir.items) == 3
+        return reservoir
+
+    counts = sample_counts(4000, make)
+    # Each item is sampled with probability 3 / 12
+    assert all(800 < counts[i] < 1200 for i in range(12))
+
+
+def test_reservoir_merge_is_uniform(seeded):
+    def make():
+        left = sampling.Reservoir(2)
+        right = sampling.Reservoir(2)
+        for i in range(3):
+            left.add(i)
+        for i in range(3, 12):
+            right.add(i)
+        merged = left.merge(right)
+        assert merged.seen == 12 and len(merged.items) == 2
+        return merged
+
+    counts = sample_counts(6000, make)
+    # Each item is sampled with probability 2 / 12
+    assert all(800 < counts[i] < 1200 for i in range(12))
+
+
+def test_reservoir_state():
+    reservoir = sampling.Reservoir(2)
+    for i in range(5):
+        reservoir.add(str(i))
+    copy = sampling.Reservoir.from_state(reservoir.to_state())
+    assert (copy.size, copy.seen, copy.items) == (reservoir.size, reservoir.seen, reservoir.items)
+
+
+def person_of(contents, keep_messages=True):
+    messages = store.MessageStore()
+    for i, content in enumerate(contents):
+        messages.append("alice", content, i)
+    user = person.Person("alice", [], keep_messages=keep_messages)
+    for message in messages:
+        user.add(message)
+    user.finish()
+    return user
+
+
+@pytest.mark.parametrize("keep_messages", [True, False])
+def test_random_quote(seeded, keep_messages):
+    short = ["hi", "good job", "what is up with you"]
+    long = ["this message is long enough to be quoted", "so is this one, it has many words"]
+    assert all(len(tokenizer.tokenize(content).words) >= person.QUOTE_MIN_WORDS for content in long)
+
+    quotes = collections.Counter(person_of(short + long + short, keep_messages).random_quote for _ in range(2000))
+    assert set(quotes) == set(long)
+    assert all(900 < count < 1100 for count in quotes.values())
+
+    quotes = collections.Counter(person_of(short, keep_messages).random_quote for _ in range(3000))
+    assert set(quotes) == set(short)
+
+    user = person.Person("alice", [], keep_messages=keep_messages)
+    user.finish()
+    assert user.random_quote is None
+
+
+def test_responses_without_messages():
+    contents = ["lol", "thanks", "lol", "this is not a response lol", "LOL", "thanks"] * 3
+    kept = person_of(contents)
+    bounded = person_of(contents, keep_messages=False)
+    assert len(bounded.messages) == 0
+    assert kept.common_responses == [content for content in contents if content != "this is not a response lol"]
+    assert bounded.common_responses == ["lol", "thanks", "LOL"]
+    assert bounded.response_counts.counts == {"lol": 6, "thanks": 6, "LOL": 3}
+
+    restored = person.Person.from_state(bounded.to_state(), [])
+    assert restored.response_counts.counts == bounded.response_counts.counts
+    assert restored.quotes.seen == bounded.quotes.seen
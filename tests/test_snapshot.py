@@ -0,0 +1,56 @@
+"""
+Tests of the binary snapshot, against the
+statistics of the conversation
+"""
+
+import pytest
+
+from src import histograms
+from src import snapshot
+from src import timestamps
+
+
+def check_snapshot(c, path):
+    analysis = c.analysis
+    with snapshot.Snapshot(path) as snap:
+        assert snap.users == list(c.persons)
+        assert snap.date(0) == timestamps.from_epoch(analysis.first_epoch // timestamps.SECONDS_PER_DAY
+                                                     * timestamps.SECONDS_PER_DAY)
+        for name, expected in [(None, analysis)] + [(name, user.analysis) for name, user in c.persons.items()]:
+            days = list(snap.days(name))
+            start = expected.first_epoch // timestamps.SECONDS_PER_DAY - snap.first_day
+            assert len(days) == analysis.days_in_range
+            assert days[start:start + expected.days_in_range] == expected.active_days_all_time
+            assert sum(days) == expected.total_messages
+            assert list(snap.hours(name)) == expected.active_hours
+            assert list(snap.weekdays(name)) == expected.active_days_of_week
+            assert snap.totals(name) == dict(zip(snapshot.TOTALS, snapshot.analyser_totals(expected)))
+
+        with pytest.raises(KeyError):
+            snap.days("nobody")
+
+
+@pytest.mark.parametrize("vectorized", [True, False])
+def test_snapshot_matches_statistics(baseline, tmp_path, monkeypatch, vectorized):
+    if vectorized:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(histograms, "numpy", None)
+    path = str(tmp_path / "stats.snapshot")
+    baseline.write_snapshot(path)
+    check_snapshot(baseline, path)
+
+
+def test_invalid_snapshot(baseline, tmp_path):
+    path = str(tmp_path / "stats.snapshot")
+    baseline.write_snapshot(path)
+    with open(path, "rb") as f_obj:
+        data = f_obj.read()
+
+    for name, content in [("other", b"not a snapshot"), ("truncated", data[:-8]),
+                          ("version", data.replace(b'"version": 1', b'"version": 9'))]:
+        other = str(tmp_path / name)
+        with open(other, "wb") as f_obj:
+            f_obj.write(content)
+        with pytest.raises(ValueError):
+            snapshot.Snapshot(other)
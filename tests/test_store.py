@@ -0,0 +1,128 @@
+"""
+Tests of the columnar message store, against
+a list of Message objects
+"""
+
+import io
+import random
+
+import pytest
+
+from src import conversation
+from src import store
+from src import timestamps
+
+
+def random_messages(count, seed):
+    rng = random.Random(seed)
+    users = ["alice", "bob", "çarol", "\U0001f600"]
+    words = ["hi", "héllo", "?", "", "a b", "naïve", "\U0001f600"]
+    return [(rng.choice(users), " ".join(rng.choice(words) for _ in range(rng.randint(0, 4))),
+             rng.randrange(10) * timestamps.SECONDS_PER_DAY, "raw {}".format(i)) for i in range(count)]
+
+
+def rows(messages):
+    return [(message.username, message.content, message.epoch, message.raw) for message in messages]
+
+
+def filled(items, keep_raw=True):
+    messages = store.MessageStore(keep_raw)
+    for username, content, epoch, raw in items:
+        messages.append(username, content, epoch, raw)
+    return messages
+
+
+@pytest.mark.parametrize("keep_raw", [True, False])
+def test_append(keep_raw):
+    items = random_messages(200, 1)
+    messages = filled(items, keep_raw)
+    expected = [item if keep_raw else item[:3] + (None,) for item in items]
+    assert len(messages) == len(items)
+    assert rows(messages) == expected
+    assert rows([messages[i] for i in range(-len(items), len(items))]) == expected * 2
+    assert rows(messages[10:20:3]) == expected[10:20:3]
+    with pytest.raises(IndexError):
+        messages[len(items)]
+
+    bulk = store.MessageStore(keep_raw)
+    bulk.append_all(*zip(*items[:100]))
+    bulk.append_all([item[0] for item in items[100:]], [item[1] for item in items[100:]],
+                    [item[2] for item in items[100:]])
+    assert rows(bulk)[:100] == expected[:100]
+    assert rows(bulk)[100:] == [item[:3] + ("" if keep_raw else None,) for item in items[100:]]
+
+
+def test_message_view_matches_message():
+    message = conversation.Message("alice", "héllo", "2019-05-06T07:08:09", "raw")
+    view = filled([("alice", "héllo", message.epoch, "raw")])[0]
+    for key in ["username", "content", "raw", "epoch", "timestamp", "day", "weekday", "hour"]:
+        assert getattr(view, key) == getattr(message, key)
+    assert str(view) == str(message)
+
+
+@pytest.mark.parametrize("keep_raw,other_keep_raw", [(True, True), (True, False), (False, True)])
+def test_extend_and_tail(keep_raw, other_keep_raw):
+    items = random_messages(300, 2)
+    messages = filled(items[:100], keep_raw)
+    messages.extend(filled(items[100:], other_keep_raw))
+    expected = rows(filled(items, keep_raw))
+    if keep_raw and not other_keep_raw:
+        expected = expected[:100] + [row[:3] + ("",) for row in expected[100:]]
+    assert rows(messages) == expected
+
+    for start in [0, 1, 150, 300]:
+        tail = messages.tail(start)
+        assert rows(tail) == expected[start:]
+        assert len(tail.usernames) == len(set(row[0] for row in expected[start:]))
+
+
+def test_sort_is_stable():
+    items = random_messages(500, 3)
+    messages = filled(items)
+    messages.sort()
+    assert rows(messages) == sorted(items, key=lambda item: item[2])
+
+    # Already sorted stores are left as is
+    content = messages.content
+    messages.sort()
+    assert messages.content is content
+
+
+@pytest.mark.parametrize("keep_raw", [True, False])
+def test_remove(keep_raw):
+    items = random_messages(200, 5) + [("nobody else", "only message", 0, "raw")]
+    messages = filled(items, keep_raw)
+    expected = rows(filled(items, keep_raw))
+    removed = {0, 17, 99, 200}
+    messages.remove(removed)
+    assert rows(messages) == [row for i, row in enumerate(expected) if i not in removed]
+    assert sorted(messages.usernames) == sorted(set(item[0] for item in items[:200]))
+
+    messages.append("nobody else", "again", 0, "raw")
+    assert rows(messages)[-1][:3] == ("nobody else", "again", 0)
+
+
+@pytest.mark.parametrize("keep_raw", [True, False])
+def test_write_read(keep_raw):
+    messages = filled(random_messages(100, 4), keep_raw)
+    f_obj = io.BytesIO()
+    messages.write(f_obj)
+    data = f_obj.getvalue()
+
+    read = store.MessageStore.read(io.BytesIO(data))
+    assert read.keep_raw == keep_raw
+    assert rows(read) == rows(messages)
+    assert read.user_id("alice") == messages.user_id("alice")
+    with pytest.raises(ValueError):
+        store.MessageStore.read(io.BytesIO(data[:-1]))
+
+
+def test_subset():
+    messages = filled(random_messages(50, 5))
+    subset = messages.subset([3, 1, 4])
+    subset.append(messages[10])
+    assert len(subset) == 4
+    assert rows(subset) == rows([messages[i] for i in [3, 1, 4, 10]])
+    assert rows(subset[1:3]) == rows([messages[1], messages[4]])
+    assert rows([subset[-1]]) == rows([messages[10]])
+    assert len(messages.subset()) == 0
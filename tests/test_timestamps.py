@@ -0,0 +1,47 @@
+"""
+Tests of the timestamp helpers, against datetime
+"""
+
+import datetime
+import random
+
+import pytest
+
+from src import conversation
+from src import timestamps
+
+
+def random_datetimes(count, seed):
+    rng = random.Random(seed)
+    start = datetime.datetime(1960, 1, 1)
+    return [start + datetime.timedelta(seconds=rng.randrange(100 * 365 * 24 * 3600)) for _ in range(count)]
+
+
+@pytest.mark.parametrize("moment", random_datetimes(500, 1) + [datetime.datetime(1970, 1, 1),
+                                                                datetime.datetime(2000, 2, 29, 23, 59, 59),
+                                                                datetime.datetime(1969, 12, 31, 0, 0, 1)])
+def test_parse_matches_datetime(moment):
+    text = moment.strftime(timestamps.TIMESTAMP_FORMAT)
+    epoch = timestamps.parse(text)
+    assert epoch == timestamps.to_epoch(datetime.datetime.strptime(text, timestamps.TIMESTAMP_FORMAT))
+    assert timestamps.from_epoch(epoch) == moment
+    assert timestamps.parse(text + ".123456") == epoch
+
+    message = conversation.Message("user", "content", text, "raw")
+    assert message.timestamp == moment
+    assert message.day == (moment.date() - datetime.date(1970, 1, 1)).days == timestamps.day(epoch)
+    assert message.weekday == moment.weekday()
+    assert message.hour == moment.hour
+
+
+def test_parse_falls_back_to_strptime():
+    # Not zero padded, which strptime accepts
+    assert timestamps.parse("2019-1-2T3:04:05") == timestamps.to_epoch(datetime.datetime(2019, 1, 2, 3, 4, 5))
+
+
+@pytest.mark.parametrize("text", ["", "2019-01-01", "2019-01-01 00:00:00", "2019-13-01T00:00:00",
+                                  "2019-02-30T00:00:00", "2019-01-01T24:00:00", "2019-01-01T00:60:00",
+                                  "2019-01-01T00:00:61", "abcd-ef-ghTij:kl:mn", "2019-01-01T00:00:00Z"])
+def test_parse_invalid(text):
+    with pytest.raises(ValueError):
+        timestamps.parse(text)
@@ -0,0 +1,61 @@
+"""
+Tests of the tokenizer, against the analysis of a
+message done word by word with regular expressions
+"""
+
+import random
+import re
+
+import pytest
+
+from src import data
+from src import matcher
+from src import tokenizer
+
+CONTENTS = ["", " ", "hello world", "Hello,  World!", "what?", "don't stop", "see http://a.b/c?d=1 now",
+            "HTTPS://X.Y caps", "xhttp://inside.word", "https://a.b", "café naïve Über",
+            "Kelvin İstanbul", "tab\tseparated\nlines", "lol", "good job mate", "what the hell",
+            "1234 56", "a b", "\U0001f600 emoji"]
+
+
+def slow_tokens(content):
+    words = content.split(" ")
+    word_types = []
+    for word in words:
+        word = word.lower()
+        if "http://" in word or "https://" in word:
+            continue
+        word = re.sub("[^a-zA-Z]+", "", word)
+        if len(word) == 0:
+            continue
+        word_types.append(word)
+    return {
+        "words": words,
+        "word_types": word_types,
+        "urls": re.findall(tokenizer.URL_PATTERN, content),
+        "total_characters": len(content),
+        "total_characters_without_spaces": len(content.replace(" ", "")),
+        "question": "?" in content,
+        "swear": any(" " + swear + " " in " " + content + " " for swear in data.SWEARS),
+        "response": len(words) < 5 and any(" " + d + " " in " " + content.lower() + " " for d in data.RESPONSES)
+    }
+
+
+def random_contents(count, seed):
+    rng = random.Random(seed)
+    pieces = [word for content in CONTENTS for word in content.split(" ")] + data.SWEARS[:20] + data.RESPONSES
+    return [" ".join(rng.choice(pieces) for _ in range(rng.randint(0, 7))) for _ in range(count)]
+
+
+@pytest.mark.parametrize("content", CONTENTS + random_contents(500, 1))
+def test_tokenize_matches_regex(content):
+    tokens = tokenizer.tokenize(content)
+    assert {key: getattr(tokens, key) for key in tokenizer.Tokens.__slots__} == slow_tokens(content)
+
+
+def test_custom_dictionaries():
+    custom = tokenizer.Tokenizer(swears=matcher.PhraseMatcher(["heck"]),
+                                 responses=matcher.PhraseMatcher(["yay"], lowercase=True))
+    tokens = custom.tokenize("Yay heck")
+    assert tokens.swear and tokens.response
+    assert not tokenizer.tokenize("Yay heck").swear
@@ -0,0 +1,67 @@
+"""
+Tests of the bounded memory url statistics, against
+the urls of the baseline conversation
+"""
+
+import collections
+
+from conftest import analysis_dict, extract
+from src import analyser
+from src import conversation
+from src import sampling
+from src import urlstats
+
+
+def test_url_stats_only_in_bounded_mode(baseline):
+    assert baseline.analysis.url_stats is None
+    assert baseline.analysis.url_count == len(baseline.analysis.urls)
+    assert "url_stats" not in baseline.analysis.to_dict()
+    assert baseline.analysis.to_state()["url_stats"] is None
+
+
+def test_bounded_urls_match_baseline(logs, baseline, baseline_dict):
+    bounded = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python",
+                                        url_sample_size=5)
+    urls = baseline.analysis.urls
+    stats = bounded.analysis.url_stats
+    assert bounded.analysis.urls == urls[:5]
+    assert bounded.analysis.url_count == stats.total == len(urls)
+    assert len(stats.sample) == 5 and set(stats.sample) <= set(urls)
+
+    distinct = len(set(urls))
+    assert abs(stats.distinct_count - distinct) <= 0.05 * distinct
+    domains = collections.Counter(urlstats.domain(url) for url in urls)
+    assert dict(stats.top_domains(10)) == dict(domains.most_common(10))
+
+    # The other statistics do not change
+    expected = analysis_dict(baseline)
+    result = analysis_dict(bounded)
+    for statistics in [expected["analysis"]] + [user["analysis"] for user in expected["users"].values()]:
+        statistics["urls"] = statistics["urls"][:5]
+    for statistics in [result["analysis"]] + [user["analysis"] for user in result["users"].values()]:
+        statistics.pop("url_stats")
+    assert result == expected
+
+
+def test_merge_bounded_and_unbounded(baseline):
+    messages = list(baseline.messages)
+    half = len(messages) // 2
+    bounded = analyser.BasicAnalyser(messages[:half], url_sample_size=5)
+    unbounded = analyser.BasicAnalyser(messages[half:])
+
+    merged = analyser.merge([unbounded, bounded])
+    assert merged.url_sample_size == 5
+    assert merged.urls == baseline.analysis.urls[:5]
+    assert merged.url_count == len(baseline.analysis.urls)
+
+
+def test_reservoir_keeps_at_most_its_size():
+    reservoir = sampling.Reservoir(10)
+    for i in range(1000):
+        reservoir.add(i)
+    other = sampling.Reservoir(10)
+    for i in range(1000, 1005):
+        other.add(i)
+    assert len(reservoir.items) == 10 and set(reservoir.items) <= set(range(1000))
+    reservoir.merge(other)
+    assert len(reservoir.items) == 10 and reservoir.seen == 1005
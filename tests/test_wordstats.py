@@ -0,0 +1,79 @@
+"""
+Tests of the word statistics helpers, against sorting
+the whole vocabulary and counting every word exactly
+"""
+
+import collections
+import random
+
+import pytest
+
+from conftest import extract
+from src import conversation
+from src import data
+from src import wordstats
+
+
+def random_words(count, seed, vocabulary=200):
+    """Words with a skewed distribution, so some are frequent"""
+    rng = random.Random(seed)
+    return ["w{}".format(int(rng.paretovariate(1.2)) % vocabulary) for _ in range(count)]
+
+
+@pytest.mark.parametrize("k", [0, 1, 5, 50, 1000])
+def test_top_k_matches_sort(k):
+    counts = dict(collections.Counter(random_words(2000, 1)))
+    counts.update({"the": 50, "a": 50, "and": 3})
+    expected = sorted(counts.items(), key=lambda x: x[1], reverse=True)
+    assert wordstats.top_k(counts, k) == expected[:k]
+
+    filtered = [(word, count) for word, count in expected if len(word) >= 3 and word not in data.STOPWORD_SET]
+    assert wordstats.top_k(counts, k, data.STOPWORD_SET, 3) == filtered[:k]
+
+
+def test_top_words_matches_word_freq(baseline):
+    assert baseline.analysis.top_words(20) == baseline.analysis.word_freq_sorted[:20]
+    for user in baseline.persons.values():
+        assert user.analysis.top_words(10, min_length=4) == \
+            [item for item in user.analysis.word_freq_sorted if len(item[0]) >= 4][:10]
+
+
+@pytest.mark.parametrize("capacity", [1, 10, 50])
+def test_space_saving_bounds(capacity):
+    words = random_words(5000, 2)
+    exact = collections.Counter(words)
+    counter = wordstats.SpaceSaving(capacity)
+    for word in words:
+        counter.add(word)
+
+    assert len(counter.counts) == min(capacity, len(exact))
+    assert sum(counter.counts.values()) == len(words)
+    for word, count in counter.counts.items():
+        assert count - counter.errors[word] <= exact[word] <= count
+    for word, count in exact.items():
+        if count > len(words) / capacity:
+            assert word in counter.counts
+
+
+def test_space_saving_from_counts():
+    counts = dict(collections.Counter(random_words(1000, 3)))
+    counter = wordstats.SpaceSaving.from_counts(counts, 5, {"w1": 2})
+    assert counter.counts == dict(wordstats.top_k(counts, 5))
+    assert counter.errors["w1"] == 2
+
+    # The rebuilt heap evicts the least frequent word
+    least = min(counter.counts, key=counter.counts.get)
+    assert counter.add("new") == least
+    with pytest.raises(ValueError):
+        wordstats.SpaceSaving(0)
+
+
+def test_word_capacity(logs, baseline):
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python", word_capacity=50)
+    exact = baseline.analysis.word_count
+    assert len(c.analysis.word_count) == 50
+    assert c.analysis.total_words == baseline.analysis.total_words
+    for word, count in c.analysis.word_count.items():
+        assert count - c.analysis.word_sketch.errors[word] <= exact[word] <= count
+    assert [word for word, count in c.analysis.top_words(5)] == \
+        [word for word, count in baseline.analysis.top_words(5)]
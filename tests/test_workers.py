@@ -0,0 +1,35 @@
+"""
+Tests of parsing files on a process pool, whole or
+split into byte ranges, against the baseline conversation
+"""
+
+import pytest
+
+from conftest import analysis_dict, extract
+from src import conversation
+from src import reader
+
+
+@pytest.mark.parametrize("options", [{"workers": 2}, {"workers": 3, "range_size": 2000},
+                                     {"workers": 2, "range_size": 1500, "chunk_size": 100}])
+def test_workers_match_baseline(logs, baseline_dict, options):
+    c = conversation.Conversation(logs, extract, name_map={"user5": "user4"}, backend="python", **options)
+    assert analysis_dict(c) == baseline_dict
+
+
+@pytest.mark.parametrize("data", [b"a\nbb\r\nccc\n\ndddd\r\n\xc3\xa9e\nlast",
+                                  b"a\r\nb\r\n", b"single line", b"\n\n\n"])
+def test_split_ranges_matches_lines(tmp_path, data):
+    path = str(tmp_path / "log.txt")
+    with open(path, "wb") as f_obj:
+        f_obj.write(data)
+    with open(path, encoding="utf8") as f_obj:
+        expected = f_obj.read().split("\n")
+
+    for range_size in [1, 2, 3, 5, len(data) + 1]:
+        ranges = reader.split_ranges(path, range_size)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(data)
+        lines = []
+        for start, end in ranges:
+            lines += reader.split_lines(reader.read_range_chunks(path, start, end, 2))
+        assert lines == expected